@@ -6,7 +6,7 @@ a = Analysis(
     pathex=['src'],
     binaries=[],
     datas=[],
-    hiddenimports=['metadata_handler', 'templates', 'piexif', 'libxmp'],
+    hiddenimports=['metadata_handler', 'templates', 'instrumentation', 'png_metadata', 'tiff_metadata', 'xmp_scan', 'batch_rename', 'catalog', 'duplicates', 'bulk_metadata', 'xmp_sidecar', 'container_metadata', 'io_scheduler', 'prefetch', 'metadata_view', 'facets', 'geo', 'capture_index', 'time_shift', 'piexif', 'libxmp'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
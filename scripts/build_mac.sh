@@ -80,7 +80,7 @@ else
 fi
 
 # Hidden imports: always include local modules, plus optional external ones
-HIDDEN_ARGS=(--hidden-import metadata_handler --hidden-import templates)
+HIDDEN_ARGS=(--hidden-import metadata_handler --hidden-import templates --hidden-import instrumentation --hidden-import png_metadata --hidden-import tiff_metadata --hidden-import xmp_scan --hidden-import batch_rename --hidden-import catalog --hidden-import duplicates --hidden-import bulk_metadata --hidden-import xmp_sidecar --hidden-import container_metadata --hidden-import io_scheduler --hidden-import prefetch --hidden-import metadata_view --hidden-import facets --hidden-import geo --hidden-import capture_index --hidden-import time_shift)
 while read -r mod; do
   [[ -z "$mod" ]] && continue
   HIDDEN_ARGS+=(--hidden-import "$mod")
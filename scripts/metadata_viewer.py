@@ -25,6 +25,7 @@ import os
 import re
 import sys
 import binascii
+import mmap
 from pathlib import Path
 from typing import Any, Dict, Optional
 
@@ -190,6 +191,50 @@ def read_exif(path: str) -> Dict[str, Any]:
         return exif
 
 
+def find_xmp_packet(path: str) -> Optional[bytes]:
+    """Find the <x:xmpmeta> packet via mmap: JPEG APP1 segments first, then the
+    first MB, then the whole file. Only the packet itself is copied."""
+    start_tag, end_tag = b"<x:xmpmeta", b"</x:xmpmeta>"
+
+    def find_in(mm, lo: int, hi: int) -> Optional[bytes]:
+        start = mm.find(start_tag, lo, hi)
+        if start == -1:
+            return None
+        end = mm.find(end_tag, start, min(len(mm), start + 16 * 1024 * 1024))
+        return mm[start:end + len(end_tag)] if end != -1 else None
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # JPEG: walk header segments up to SOS looking for the XMP APP1
+            if mm[:2] == b"\xff\xd8":
+                ns = b"http://ns.adobe.com/xap/1.0/\x00"
+                pos = 2
+                while pos + 4 <= size and mm[pos] == 0xFF:
+                    marker = mm[pos + 1]
+                    if marker == 0xFF:
+                        pos += 1
+                        continue
+                    if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                        pos += 2
+                        continue
+                    if marker in (0xDA, 0xD9):
+                        break
+                    seg_end = pos + 2 + ((mm[pos + 2] << 8) | mm[pos + 3])
+                    if marker == 0xE1 and mm[pos + 4:pos + 4 + len(ns)] == ns:
+                        packet = find_in(mm, pos + 4, min(size, seg_end))
+                        if packet:
+                            return packet
+                    pos = seg_end
+            head = min(size, 1024 * 1024)
+            packet = find_in(mm, 0, head)
+            if packet or head == size:
+                return packet
+            return find_in(mm, max(0, head - len(start_tag)), size)
+
+
 def read_xmp(path: str) -> Dict[str, Any]:
     xmp: Dict[str, Any] = {}
 
@@ -251,11 +296,8 @@ def read_xmp(path: str) -> Dict[str, Any]:
     # Fallback: scan file for XMP packet
     if not xmp:
         try:
-            data = Path(path).read_bytes()
-            start = data.find(b"<x:xmpmeta")
-            end = data.find(b"</x:xmpmeta>")
-            if start != -1 and end != -1 and end > start:
-                packet = data[start:end+12]
+            packet = find_xmp_packet(path)
+            if packet:
                 packet_str = packet.decode('utf-8', errors='replace')
                 # Parse packet to structured fields
                 xmp = parse_xmp_xml(packet_str)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Scale Benchmark (GUI-free)
+
+Runs the batch scenarios of the app end to end over a generated corpus and
+compares the measurements against the baseline stored in the repository.
+
+Usage:
+  python3 scripts/scale_benchmark.py [--files 10000] [--threshold 0.25] [--update-baseline]
+
+Scenarios (run in this order on a working copy of the corpus):
+- ingest          copy supported files from the corpus into the work folder
+- read_all        read_metadata() for every file
+- apply_template  load a template and edit_metadata() every file with it
+- strip           delete_all_metadata() for every file
+- rename          pattern rename of every file
+- export          export_metadata_json() for every file
+
+Metrics per scenario: wall time, CPU time, I/O bytes (read/write, where the
+platform exposes them) and peak Python memory (tracemalloc).
+
+The exit status is 1 when any scenario regresses beyond the threshold, so the
+script can gate CI. The same check runs from tests/test_scale_benchmark.py when
+PMM_BENCHMARK=1 is set.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from PIL import Image
+import piexif
+
+from metadata_handler import MetadataHandler
+from templates import TemplateManager
+
+
+BASELINE_PATH = Path(__file__).with_name('benchmark_baseline.json')
+DEFAULT_FILES = 10000
+DEFAULT_THRESHOLD = 0.25
+FILES_PER_FOLDER = 250
+
+SCENARIOS = ['ingest', 'read_all', 'apply_template', 'strip', 'rename', 'export']
+METRICS = ['wall_s', 'cpu_s', 'io_read_bytes', 'io_write_bytes', 'peak_mem_bytes']
+
+# Differences below these absolute amounts never count as a regression, so that
+# tiny scenarios are not failed by timer noise.
+MIN_ABS_DELTA = {
+    'wall_s': 0.05,
+    'cpu_s': 0.05,
+    'io_read_bytes': 64 * 1024,
+    'io_write_bytes': 64 * 1024,
+    'peak_mem_bytes': 1024 * 1024,
+}
+
+TEMPLATE_METADATA = {
+    'headline': 'Benchmark Headline',
+    'description': 'Generated by scripts/scale_benchmark.py',
+    'creator': 'Bench Creator',
+    'subject': 'bench, scale, regression',
+    'rights': '© Benchmark',
+}
+
+
+# -------------------- Measurement helpers --------------------
+
+def _read_io_counters() -> Optional[Dict[str, int]]:
+    """Return bytes read/written by this process, or None if unavailable."""
+    try:
+        counters: Dict[str, int] = {}
+        with open('/proc/self/io', 'r', encoding='ascii') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                counters[key.strip()] = int(value.strip())
+        # rchar/wchar count bytes passed to read()/write(), independent of the page cache
+        return {'read': counters['rchar'], 'write': counters['wchar']}
+    except Exception:
+        return None
+
+
+def measure(fn: Callable[[], Any]) -> Dict[str, Any]:
+    """Run fn() once and return its wall/CPU time, I/O bytes and peak memory."""
+    io_before = _read_io_counters()
+    tracemalloc.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    try:
+        fn()
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    io_after = _read_io_counters()
+
+    result: Dict[str, Any] = {
+        'wall_s': round(wall, 4),
+        'cpu_s': round(cpu, 4),
+        'io_read_bytes': None,
+        'io_write_bytes': None,
+        'peak_mem_bytes': peak,
+    }
+    if io_before and io_after:
+        result['io_read_bytes'] = io_after['read'] - io_before['read']
+        result['io_write_bytes'] = io_after['write'] - io_before['write']
+    return result
+
+
+# -------------------- Corpus --------------------
+
+def generate_corpus(corpus_dir: Path, count: int) -> List[str]:
+    """Create (or reuse) a corpus of small JPEGs with camera EXIF."""
+    marker = corpus_dir / '.complete'
+    paths = [str(corpus_dir / f"card_{i // FILES_PER_FOLDER:03d}" / f"IMG_{i:05d}.jpg") for i in range(count)]
+    if marker.exists():
+        return paths
+
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    for i, p in enumerate(paths):
+        Path(p).parent.mkdir(parents=True, exist_ok=True)
+        exif = {
+            '0th': {
+                piexif.ImageIFD.Make: b'BenchCam',
+                piexif.ImageIFD.Model: f'Model {i % 7}'.encode('ascii'),
+                piexif.ImageIFD.Artist: b'Original Artist',
+            },
+            'Exif': {
+                piexif.ExifIFD.DateTimeOriginal: f'2024:05:{1 + i % 28:02d} 12:{i % 60:02d}:{(i * 7) % 60:02d}'.encode('ascii'),
+                piexif.ExifIFD.ExposureTime: (1, 125),
+                piexif.ExifIFD.FNumber: (28, 10),
+            },
+            'GPS': {}, '1st': {}, 'thumbnail': None,
+        }
+        img = Image.new('RGB', (64, 48), ((i * 37) % 256, (i * 91) % 256, (i * 13) % 256))
+        img.save(p, 'JPEG', quality=85, exif=piexif.dump(exif))
+    marker.write_text(str(count), encoding='utf-8')
+    return paths
+
+
+# -------------------- Scenarios --------------------
+
+def run_benchmark(count: int = DEFAULT_FILES, corpus_dir: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Run all scenarios over a corpus of `count` files and return metrics per scenario."""
+    corpus = Path(corpus_dir) if corpus_dir else Path(tempfile.gettempdir()) / f"pmm_bench_corpus_{count}"
+    sources = generate_corpus(corpus, count)
+
+    work_root = Path(tempfile.mkdtemp(prefix='pmm_bench_'))
+    work_dir = work_root / 'work'
+    export_dir = work_root / 'export'
+    templates_dir = work_root / 'templates'
+    export_dir.mkdir(parents=True)
+
+    handler = MetadataHandler()
+    files: List[str] = []
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def ingest():
+        for src in sources:
+            if not handler.is_supported(src):
+                continue
+            rel = Path(src).relative_to(corpus)
+            dst = work_dir / rel
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(src, dst)
+            files.append(str(dst))
+
+    def read_all():
+        for p in files:
+            handler.read_metadata(p)
+
+    def apply_template():
+        manager = TemplateManager(str(templates_dir))
+        manager.create_template('Benchmark', TEMPLATE_METADATA, 'Template: Benchmark')
+        metadata = manager.get_template_metadata('Benchmark') or {}
+        for p in files:
+            handler.edit_metadata(p, metadata, None)
+
+    def strip():
+        for p in files:
+            handler.delete_all_metadata(p, p)
+
+    def rename():
+        for i, p in enumerate(files):
+            old_path = Path(p)
+            new_path = old_path.with_name(f"bench_{i + 1:05d}{old_path.suffix}")
+            old_path.rename(new_path)
+            files[i] = str(new_path)
+
+    def export():
+        for i, p in enumerate(files):
+            handler.export_metadata_json(p, str(export_dir / f"{i:05d}.json"))
+
+    steps = {
+        'ingest': ingest,
+        'read_all': read_all,
+        'apply_template': apply_template,
+        'strip': strip,
+        'rename': rename,
+        'export': export,
+    }
+    try:
+        for name in SCENARIOS:
+            results[name] = measure(steps[name])
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+    return results
+
+
+# -------------------- Baseline / regression gate --------------------
+
+def load_baseline(count: int, path: Path = BASELINE_PATH) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Return the stored scenario metrics for a corpus size, or None."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('corpus_files', {}).get(str(count))
+    except Exception:
+        return None
+
+
+def save_baseline(count: int, results: Dict[str, Dict[str, Any]], path: Path = BASELINE_PATH) -> None:
+    """Store scenario metrics for a corpus size, keeping other sizes intact."""
+    data: Dict[str, Any] = {}
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    data.setdefault('corpus_files', {})[str(count)] = results
+    data['recorded_on'] = f"{platform.system()} {platform.machine()}, Python {platform.python_version()}"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Return a description of every metric that regressed beyond threshold (a fraction)."""
+    regressions: List[str] = []
+    for scenario in SCENARIOS:
+        current = results.get(scenario) or {}
+        base = baseline.get(scenario) or {}
+        for metric in METRICS:
+            now, before = current.get(metric), base.get(metric)
+            if now is None or before is None:
+                continue
+            limit = before * (1.0 + threshold)
+            if now > limit and now - before > MIN_ABS_DELTA[metric]:
+                pct = ((now / before) - 1.0) * 100 if before else float('inf')
+                regressions.append(f"{scenario}.{metric}: {now} vs baseline {before} (+{pct:.1f}%)")
+    return regressions
+
+
+def format_results(results: Dict[str, Dict[str, Any]]) -> str:
+    """Render results as a fixed-width table."""
+    lines = [f"{'scenario':<16}{'wall_s':>10}{'cpu_s':>10}{'read_MB':>10}{'write_MB':>10}{'peak_MB':>10}"]
+
+    def mb(v):
+        return f"{v / 1e6:.1f}" if isinstance(v, (int, float)) else '-'
+
+    for name in SCENARIOS:
+        r = results.get(name, {})
+        lines.append(f"{name:<16}{r.get('wall_s', 0):>10.2f}{r.get('cpu_s', 0):>10.2f}"
+                     f"{mb(r.get('io_read_bytes')):>10}{mb(r.get('io_write_bytes')):>10}{mb(r.get('peak_mem_bytes')):>10}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GUI-free scale benchmark with a regression gate.")
+    parser.add_argument('--files', type=int, default=int(os.environ.get('PMM_BENCH_FILES', DEFAULT_FILES)),
+                        help="number of files in the generated corpus")
+    parser.add_argument('--threshold', type=float,
+                        default=float(os.environ.get('PMM_BENCH_THRESHOLD', DEFAULT_THRESHOLD)),
+                        help="allowed slowdown as a fraction of the baseline (0.25 = 25%%)")
+    parser.add_argument('--corpus-dir', default=None, help="where to generate/reuse the corpus")
+    parser.add_argument('--update-baseline', action='store_true', help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.files, args.corpus_dir)
+    print(format_results(results))
+
+    if args.update_baseline:
+        save_baseline(args.files, results)
+        print(f"\nBaseline updated: {BASELINE_PATH}")
+        return
+
+    baseline = load_baseline(args.files)
+    if baseline is None:
+        print(f"\nNo baseline for {args.files} files; run with --update-baseline to record one.")
+        return
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"  {r}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Batch Rename Module
+Target-name computation for BatchRenameDialog, including metadata tokens.
+
+Patterns may use {index} and metadata tokens such as {Model}, {LensModel},
+{Headline} or {DateTimeOriginal:%Y%m%d_%H%M%S}. The fields a pattern needs
+are fetched for the whole queue up front by prefetch_fields(): in parallel,
+read-only and header-only, so computing names never touches the files.
+
+RenamePlanner validates the whole queue before anything is renamed
+(duplicate targets, existing files, invalid names) and executes swaps and
+cycles safely through temporary names.
+"""
+
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+
+from io_scheduler import HEADER_READAHEAD_BYTES, ordered_parallel_map, schedule, with_readahead
+from xmp_sidecar import SIDECAR_EXT, find_sidecar, sidecar_path
+
+# Rename modes (in the order shown by BatchRenameDialog)
+MODES = ('pattern', 'prefix', 'suffix', 'replace', 'increment')
+CASES = ('as-is', 'lower', 'upper', 'title')
+
+# Accepted date layouts (EXIF and XMP/ISO) with the length of text they consume
+DATE_FORMATS = (('%Y:%m:%d %H:%M:%S', 19), ('%Y-%m-%dT%H:%M:%S', 19), ('%Y-%m-%d %H:%M:%S', 19),
+                ('%Y:%m:%d', 10), ('%Y-%m-%d', 10))
+# Characters replaced in token values so metadata cannot introduce path separators
+UNSAFE_VALUE_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+_TOKEN_RE = re.compile(r'\{([A-Za-z][A-Za-z0-9_]*)(?::([^{}]*))?\}')
+
+
+class RenameOptions:
+    """Settings of one rename run (mirrors the BatchRenameDialog fields)."""
+
+    def __init__(self, mode: str = 'pattern', pattern: str = 'photo_{index}', prefix: str = '',
+                 suffix: str = '', find: str = '', replace: str = '', start: int = 1,
+                 pad: int = 0, case: str = 'as-is'):
+        self.mode = mode
+        self.pattern = pattern
+        self.prefix = prefix
+        self.suffix = suffix
+        self.find = find
+        self.replace = replace
+        self.start = start
+        self.pad = pad
+        self.case = case
+
+
+class RenamePattern:
+    """A rename pattern split once into literals, {index} and metadata tokens."""
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.segments: List[Any] = []  # str literals or (name, format_spec) tuples
+        pos = 0
+        for m in _TOKEN_RE.finditer(pattern):
+            if m.start() > pos:
+                self.segments.append(pattern[pos:m.start()])
+            self.segments.append((m.group(1), m.group(2)))
+            pos = m.end()
+        if pos < len(pattern):
+            self.segments.append(pattern[pos:])
+
+    @property
+    def fields(self) -> List[str]:
+        """Metadata field names the pattern needs (excluding {index})."""
+        seen: List[str] = []
+        for seg in self.segments:
+            if isinstance(seg, tuple) and seg[0] != 'index' and seg[0] not in seen:
+                seen.append(seg[0])
+        return seen
+
+    def render(self, index: int, pad: int, values: Dict[str, Any]) -> str:
+        parts = []
+        for seg in self.segments:
+            if isinstance(seg, str):
+                parts.append(seg)
+                continue
+            name, spec = seg
+            if name == 'index':
+                parts.append(format(index, spec) if spec else str(index).zfill(pad))
+            else:
+                parts.append(format_token(values.get(name), spec))
+        return ''.join(parts)
+
+
+def _parse_date(text: str) -> Optional[datetime]:
+    text = text.strip()
+    for fmt, width in DATE_FORMATS:
+        try:
+            return datetime.strptime(text[:width], fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def format_token(value: Any, spec: Optional[str]) -> str:
+    """Render a metadata value for a file name; dates accept strftime specs."""
+    if value is None or value == '':
+        return ''
+    if isinstance(value, (list, tuple)):
+        text = '-'.join(str(v) for v in value)
+    elif isinstance(value, float):
+        text = f"{value:g}"
+    else:
+        text = str(value)
+    if spec:
+        if '%' in spec:
+            parsed = _parse_date(text)
+            if parsed is not None:
+                text = parsed.strftime(spec)
+        else:
+            try:
+                text = format(value, spec)
+            except (ValueError, TypeError):
+                pass
+    return UNSAFE_VALUE_CHARS.sub('_', text).strip()
+
+
+def new_stem(stem: str, position: int, options: RenameOptions, pattern: Optional[RenamePattern] = None,
+             values: Optional[Dict[str, Any]] = None) -> str:
+    """Compute the new file name (without extension) for the file at queue position."""
+    index = options.start + position
+    if options.mode == 'pattern':
+        pattern = pattern or RenamePattern(options.pattern)
+        base = pattern.render(index, options.pad, values or {})
+    elif options.mode == 'prefix':
+        base = options.prefix + stem
+    elif options.mode == 'suffix':
+        base = stem + options.suffix
+    elif options.mode == 'replace':
+        base = stem.replace(options.find, options.replace) if options.find else stem
+    elif options.mode == 'increment':
+        base = stem + "_" + str(index).zfill(options.pad)
+    else:
+        raise ValueError(f"Unknown rename mode: {options.mode}")
+
+    if options.case == 'lower':
+        base = base.lower()
+    elif options.case == 'upper':
+        base = base.upper()
+    elif options.case == 'title':
+        base = base.title()
+    return base
+
+
+def required_fields(options: RenameOptions) -> List[str]:
+    """Metadata fields needed to compute names with these options."""
+    if options.mode != 'pattern':
+        return []
+    return RenamePattern(options.pattern).fields
+
+
+def compute_new_names(paths: Sequence[str], options: RenameOptions,
+                      field_values: Optional[Dict[str, Dict[str, Any]]] = None) -> List[str]:
+    """Target base names (with the original extension) for the whole queue, in order."""
+    pattern = RenamePattern(options.pattern) if options.mode == 'pattern' else None
+    field_values = field_values or {}
+    names = []
+    for i, path in enumerate(paths):
+        orig = Path(path)
+        base = new_stem(orig.stem, i, options, pattern, field_values.get(path))
+        names.append(f"{base}{orig.suffix}")
+    return names
+
+
+def prefetch_fields(handler, paths: Sequence[str], fields: Sequence[str],
+                    max_workers: Optional[int] = None,
+                    progress: Optional[Callable[[int, int], None]] = None,
+                    cancel: Optional[threading.Event] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the given fields for every path in parallel (header-only, read-only).
+    Returns path -> {field: value}; unreadable files map to {}.
+    progress(done, total) is called from the calling thread; setting cancel
+    stops early and returns what was read so far.
+    """
+    result: Dict[str, Dict[str, Any]] = {}
+    if not fields or not paths:
+        return result
+    fields = list(fields)
+
+    def read(path: str) -> Dict[str, Any]:
+        if cancel is not None and cancel.is_set():
+            return {}
+        try:
+            return handler.read_fields(path, fields)
+        except Exception:
+            return {}
+
+    workers = max_workers or min(32, (os.cpu_count() or 4) * 4)
+    total = len(paths)
+    # Visit files in on-disk order with header readahead; results are keyed by path
+    ordered = [paths[i] for i in schedule(paths)]
+    hinted = with_readahead(ordered, nbytes=HEADER_READAHEAD_BYTES)
+    for done, (path, values) in enumerate(ordered_parallel_map(read, hinted, workers, cancel=cancel), start=1):
+        result[path] = values
+        if progress is not None and (done % 256 == 0 or done == total):
+            progress(done, total)
+    return result
+
+
+# -------------------- Planning and execution --------------------
+
+# Characters not allowed in target names (portable across macOS, Windows and Linux)
+INVALID_NAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+MAX_NAME_BYTES = 255
+TEMP_PREFIX = '.pmm_rename_'
+
+
+def name_problem(name: str, suffix: str = '') -> Optional[str]:
+    """Return why a target file name (ending in suffix) is unusable, or None if it is fine."""
+    stem = name[:len(name) - len(suffix)] if suffix and name.endswith(suffix) else name
+    if not stem.strip() or name in ('.', '..'):
+        return "empty name"
+    bad = INVALID_NAME_CHARS.findall(name)
+    if bad:
+        return "invalid characters: " + ' '.join(sorted(set(repr(c)[1:-1] for c in bad)))
+    if name != name.rstrip(' .'):
+        return "ends with a space or dot"
+    if len(name.encode('utf-8')) > MAX_NAME_BYTES:
+        return "name too long"
+    return None
+
+
+def _collision_key(path: str) -> str:
+    """Key under which two paths name the same file (case-insensitive where the OS usually is)."""
+    key = os.path.normcase(os.path.abspath(path))
+    return key.casefold() if sys.platform == 'darwin' else key
+
+
+class RenamePlan:
+    """Validated targets for a whole queue."""
+
+    def __init__(self, sources: List[str], targets: List[str], problems: Dict[int, str]):
+        self.sources = sources
+        self.targets = targets
+        self.problems = problems  # queue position -> reason
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+    @property
+    def moves(self) -> List[Tuple[int, str, str]]:
+        """(position, source, target) for files whose path actually changes."""
+        return [(i, src, dst) for i, (src, dst) in enumerate(zip(self.sources, self.targets)) if src != dst]
+
+
+class RenamePlanner:
+    """
+    Computes every target for the queue in one pass, checks them against each
+    other and against the directories with hash sets, and executes the plan
+    with a two-phase temp-name move where targets overlap sources (swaps, cycles).
+    """
+
+    def __init__(self, paths: Sequence[str], options: RenameOptions,
+                 field_values: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.paths = [str(p) for p in paths]
+        self.options = options
+        self.field_values = field_values or {}
+
+    def plan(self) -> RenamePlan:
+        """Build and validate the plan without touching any file. Safe off the UI thread."""
+        names = compute_new_names(self.paths, self.options, self.field_values)
+        targets = [os.path.join(os.path.dirname(src), name) for src, name in zip(self.paths, names)]
+        problems: Dict[int, str] = {}
+
+        source_keys = {_collision_key(p) for p in self.paths}
+        first_claim: Dict[str, int] = {}
+        dir_listing: Dict[str, set] = {}
+        for i, (src, dst, name) in enumerate(zip(self.paths, targets, names)):
+            problem = name_problem(name, os.path.splitext(src)[1])
+            if problem:
+                problems[i] = problem
+                continue
+            key = _collision_key(dst)
+            if key in first_claim:
+                other = first_claim[key]
+                problems[i] = f"same target as {os.path.basename(self.paths[other])}"
+                problems.setdefault(other, f"same target as {os.path.basename(src)}")
+                continue
+            first_claim[key] = i
+            if key == _collision_key(src) or key in source_keys:
+                continue  # unchanged, or the target is vacated by another move in this plan
+            folder = os.path.dirname(dst)
+            if folder not in dir_listing:
+                try:
+                    dir_listing[folder] = {_collision_key(os.path.join(folder, n)) for n in os.listdir(folder)}
+                except OSError:
+                    dir_listing[folder] = set()
+            if key in dir_listing[folder]:
+                problems[i] = "a file with this name already exists"
+        return RenamePlan(self.paths, targets, problems)
+
+    def execute(self, plan: RenamePlan,
+                progress: Optional[Callable[[int, int], None]] = None) -> Dict[int, str]:
+        """
+        Apply a validated plan. Returns position -> new path for renamed files.
+        Moves whose target is another file's source go through a temporary name
+        first; on any failure completed moves are rolled back and OSError is raised.
+        """
+        if not plan.ok:
+            raise ValueError("Rename plan has problems; nothing was renamed")
+        moves = plan.moves
+        source_keys = {_collision_key(src) for _, src, _ in moves}
+        staged = [m for m in moves if _collision_key(m[2]) in source_keys]
+        direct = [m for m in moves if _collision_key(m[2]) not in source_keys]
+
+        done: List[Tuple[str, str]] = []  # journal of completed (from, to) moves
+        total = len(moves)
+        count = 0
+        sidecars: List[Tuple[str, str]] = []  # XMP sidecars that follow their image
+        for _, src, dst in moves:
+            side = find_sidecar(src)
+            if side:
+                sidecars.append((side, dst + SIDECAR_EXT if side == src + SIDECAR_EXT else sidecar_path(dst)))
+        token = f"{os.getpid()}_{threading.get_ident()}"
+
+        def move(src: str, dst: str):
+            if os.path.lexists(dst) and _collision_key(src) != _collision_key(dst):
+                raise FileExistsError(f"Target appeared during rename: {dst}")
+            os.rename(src, dst)
+            done.append((src, dst))
+
+        try:
+            temps = []
+            for n, (i, src, dst) in enumerate(staged):
+                tmp = os.path.join(os.path.dirname(src), f"{TEMP_PREFIX}{token}_{n}")
+                move(src, tmp)
+                temps.append((i, tmp, dst))
+            for i, src, dst in direct:
+                move(src, dst)
+                count += 1
+                if progress is not None:
+                    progress(count, total)
+            for i, tmp, dst in temps:
+                move(tmp, dst)
+                count += 1
+                if progress is not None:
+                    progress(count, total)
+        except OSError:
+            for src, dst in reversed(done):
+                try:
+                    os.rename(dst, src)
+                except OSError:
+                    pass
+            raise
+        self._move_sidecars(sidecars, token)
+        return {i: dst for i, _, dst in moves}
+
+    @staticmethod
+    def _move_sidecars(sidecars: List[Tuple[str, str]], token: str):
+        """Best-effort: move XMP sidecars after their images (via temp names, so swaps work)."""
+        temps = []
+        for n, (src, dst) in enumerate(sidecars):
+            tmp = os.path.join(os.path.dirname(src), f"{TEMP_PREFIX}{token}_xmp_{n}")
+            try:
+                os.rename(src, tmp)
+                temps.append((tmp, src, dst))
+            except OSError:
+                pass
+        for tmp, src, dst in temps:
+            for target in (dst, src):
+                if not os.path.lexists(target):
+                    try:
+                        os.rename(tmp, target)
+                    except OSError:
+                        pass
+                    break
@@ -0,0 +1,309 @@
+"""
+Bulk Metadata Module
+Whole-queue / whole-directory metadata export to JSON Lines or CSV, and
+per-file metadata import from CSV or JSON Lines manifests.
+
+Files are read by a bounded pool of worker threads while results are written
+strictly in input order; at most a fixed window of reads is in flight, so
+memory stays flat regardless of how many files are exported.
+
+Columns are "path", "<section>.<key>" (e.g. "exif.Model", "xmp.Headline",
+"general.size") or a bare key, which is looked up in exif, then xmp, then
+general. JSON Lines without columns writes the full read_metadata() record.
+
+Manifests are streamed row by row and applied on the same ordered pool, so
+neither side ever holds the whole manifest in memory.
+"""
+
+import csv
+import json
+import os
+import threading
+from typing import Dict, Any, Callable, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+from io_scheduler import HEADER_READAHEAD_BYTES, ordered_parallel_map, with_readahead
+from metadata_handler import MetadataHandler
+
+DEFAULT_COLUMNS = [
+    'path', 'general.format', 'general.size', 'general.file_size',
+    'exif.DateTimeOriginal', 'exif.Make', 'exif.Model', 'exif.LensModel',
+    'exif.Artist', 'exif.Copyright', 'exif.ImageDescription',
+    'xmp.Headline', 'xmp.creator', 'xmp.description', 'xmp.rights', 'xmp.subject',
+]
+SECTIONS = ('exif', 'xmp', 'general', 'iptc')
+LIST_SEPARATOR = '; '
+
+
+def iter_image_paths(root: str, recursive: bool = True) -> Iterator[str]:
+    """Yield supported image files under root in sorted, stable order."""
+    supported = MetadataHandler.SUPPORTED_FORMATS
+    try:
+        entries = sorted(os.scandir(root), key=lambda e: e.name)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            if recursive:
+                yield from iter_image_paths(entry.path, recursive)
+        elif os.path.splitext(entry.name)[1].lower() in supported:
+            yield entry.path
+
+
+def lookup_column(record: Dict[str, Any], column: str) -> Any:
+    """Value of one column in a {'path', 'exif', 'xmp', 'general', ...} record."""
+    if column == 'path':
+        return record.get('path')
+    section, _, key = column.partition('.')
+    if key and section in SECTIONS:
+        return (record.get(section) or {}).get(key)
+    for section in ('exif', 'xmp', 'general'):
+        values = record.get(section) or {}
+        if column in values:
+            return values[column]
+    return None
+
+
+def _cell(value: Any) -> str:
+    """Render a value for a CSV cell."""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return LIST_SEPARATOR.join(_cell(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, default=str, ensure_ascii=False)
+    return str(value)
+
+
+def export_metadata_bulk(paths: Iterable[str], output_path: str, fmt: Optional[str] = None,
+                         columns: Optional[Sequence[str]] = None, max_workers: Optional[int] = None,
+                         progress: Optional[Callable[[int], None]] = None,
+                         cancel: Optional[threading.Event] = None) -> Dict[str, int]:
+    """
+    Stream read_metadata() results for many files into one JSON Lines or CSV file.
+    fmt: 'jsonl' or 'csv' (default: from the output extension).
+    columns: column set (required shape for CSV; DEFAULT_COLUMNS if omitted).
+    progress(n) is called with the number of files written so far.
+    Returns {'written': n, 'errors': m}.
+    """
+    fmt = (fmt or os.path.splitext(output_path)[1].lstrip('.') or 'jsonl').lower()
+    if fmt in ('json', 'ndjson'):
+        fmt = 'jsonl'
+    if fmt not in ('jsonl', 'csv'):
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == 'csv' and not columns:
+        columns = DEFAULT_COLUMNS
+    columns = list(columns) if columns else None
+
+    local = threading.local()
+
+    def read(path: str) -> Dict[str, Any]:
+        handler = getattr(local, 'handler', None)
+        if handler is None:
+            handler = local.handler = MetadataHandler()
+        handler.last_error = None
+        try:
+            metadata = handler.read_metadata(path)
+            error = None if metadata else handler.last_error
+        except Exception as e:
+            metadata, error = {}, str(e)
+        record = {'path': path}
+        record.update(metadata)
+        if error:
+            record['error'] = error
+        return record
+
+    workers = max_workers or min(16, (os.cpu_count() or 4) * 2)
+    written = errors = 0
+    with open(output_path, 'w', encoding='utf-8', newline='') as out:
+        writer = None
+        if fmt == 'csv':
+            writer = csv.writer(out)
+            writer.writerow(columns + ['error'])
+        hinted = with_readahead(paths, nbytes=HEADER_READAHEAD_BYTES)
+        for _path, record in ordered_parallel_map(read, hinted, workers, cancel=cancel):
+            if record.get('error'):
+                errors += 1
+            if writer is not None:
+                writer.writerow([_cell(lookup_column(record, c)) for c in columns] + [record.get('error') or ''])
+            else:
+                if columns:
+                    row = {c: lookup_column(record, c) for c in columns}
+                    if record.get('error'):
+                        row['error'] = record['error']
+                    record = row
+                out.write(json.dumps(record, default=str, ensure_ascii=False) + '\n')
+            written += 1
+            if progress is not None and written % 100 == 0:
+                progress(written)
+    if progress is not None:
+        progress(written)
+    return {'written': written, 'errors': errors}
+
+
+MANIFEST_FIELDS = ('headline', 'description', 'creator', 'subject', 'rights', 'date_created')
+MANIFEST_PATH_KEYS = ('path', 'file', 'filename', 'sourcefile')
+
+
+class ImportResult(NamedTuple):
+    """Outcome of one manifest row."""
+    line: int
+    path: str
+    ok: bool
+    message: str
+
+
+def _manifest_format(manifest_path: str, fmt: Optional[str]) -> str:
+    fmt = (fmt or os.path.splitext(manifest_path)[1].lstrip('.') or 'csv').lower()
+    if fmt in ('json', 'ndjson'):
+        fmt = 'jsonl'
+    if fmt not in ('jsonl', 'csv'):
+        raise ValueError(f"Unsupported manifest format: {fmt}")
+    return fmt
+
+
+def _manifest_row(line: int, row: Dict[str, Any], base_dir: str) -> Tuple[int, str, Dict[str, Any], Optional[str]]:
+    """Normalize one manifest row to (line, path, updates, error)."""
+    lowered = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+    path = next((str(lowered[k]).strip() for k in MANIFEST_PATH_KEYS if lowered.get(k)), '')
+    if not path:
+        return line, '', {}, "Missing path"
+    path = os.path.join(base_dir, os.path.expanduser(path))
+    updates: Dict[str, Any] = {}
+    for field in MANIFEST_FIELDS:
+        value = lowered.get(field)
+        if isinstance(value, (list, tuple)):
+            value = LIST_SEPARATOR.join(str(v) for v in value if str(v).strip())
+        if value is not None and str(value).strip():
+            updates[field] = str(value).strip()
+    if not updates:
+        return line, path, {}, "No metadata fields in row"
+    return line, path, updates, None
+
+
+def iter_manifest(manifest_path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, str, Dict[str, Any], Optional[str]]]:
+    """
+    Stream (line, path, updates, error) from a CSV or JSON Lines manifest.
+    Rows need a path column ("path", "file", "filename" or "SourceFile") and any
+    of MANIFEST_FIELDS (case-insensitive); relative paths are resolved against
+    the manifest's folder. Malformed rows are yielded with an error, not raised.
+    """
+    fmt = _manifest_format(manifest_path, fmt)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield _manifest_row(reader.line_num, row, base_dir)
+            return
+        for line, text in enumerate(f, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                yield line, '', {}, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield line, '', {}, "Row is not a JSON object"
+                continue
+            yield _manifest_row(line, row, base_dir)
+
+
+def iter_import_results(manifest_path: str, fmt: Optional[str] = None, max_workers: Optional[int] = None,
+                        sidecar: bool = False,
+                        cancel: Optional[threading.Event] = None) -> Iterator[ImportResult]:
+    """
+    Apply a manifest with edit_metadata on a thread pool, yielding one
+    ImportResult per row in manifest order. Rows naming the same file are
+    applied one after another in manifest order, so the last row wins.
+    sidecar: write XMP sidecars instead of modifying the images.
+    """
+    local = threading.local()
+    order_lock = threading.Lock()
+    # Completion event of the latest row still in flight for each file
+    last_done: Dict[str, threading.Event] = {}
+
+    def chained(rows):
+        """Attach to each row the completion event of the previous row for the same file."""
+        for row in rows:
+            key = os.path.normcase(os.path.abspath(row[1])) if row[1] else ''
+            done = threading.Event()
+            with order_lock:
+                before = last_done.get(key) if key else None
+                if key:
+                    last_done[key] = done
+            yield row, key, before, done
+
+    def edit(row) -> ImportResult:
+        line, path, updates, error = row
+        if error:
+            return ImportResult(line, path, False, error)
+        handler = getattr(local, 'handler', None)
+        if handler is None:
+            handler = local.handler = MetadataHandler()
+        if not handler.is_supported(path):
+            return ImportResult(line, path, False, "Unsupported file format")
+        handler.last_error = None
+        try:
+            ok = handler.edit_metadata(path, updates, sidecar=sidecar)
+        except Exception as e:
+            ok, handler.last_error = False, str(e)
+        return ImportResult(line, path, ok, handler.last_error or '')
+
+    def apply(item) -> ImportResult:
+        row, key, before, done = item
+        try:
+            # Rows are submitted in manifest order, so the earlier row is already running or done
+            # (or was cancelled, in which case this one is dropped too)
+            while before is not None and not before.wait(0.1):
+                if cancel is not None and cancel.is_set():
+                    return ImportResult(row[0], row[1], False, "Cancelled")
+            return edit(row)
+        finally:
+            done.set()
+            with order_lock:
+                if last_done.get(key) is done:
+                    del last_done[key]
+
+    workers = max_workers or min(8, os.cpu_count() or 4)
+    sizer = MetadataHandler()
+    rows = with_readahead(iter_manifest(manifest_path, fmt), path_of=lambda row: row[1],
+                          nbytes=lambda path: sizer.readahead_bytes(path, sidecar=sidecar))
+    for _item, result in ordered_parallel_map(apply, chained(rows), workers, cancel=cancel):
+        yield result
+
+
+def import_metadata_bulk(manifest_path: str, fmt: Optional[str] = None, results_path: Optional[str] = None,
+                         max_workers: Optional[int] = None, sidecar: bool = False,
+                         progress: Optional[Callable[[int], None]] = None,
+                         cancel: Optional[threading.Event] = None) -> Dict[str, int]:
+    """
+    Apply a CSV/JSON Lines manifest of per-file metadata (see iter_manifest).
+    results_path: optional CSV receiving one "line,path,status,message" row per manifest row.
+    sidecar: write XMP sidecars instead of modifying the images.
+    progress(n) is called with the number of rows processed so far.
+    Returns {'applied': n, 'failed': m}.
+    """
+    applied = failed = 0
+    out = open(results_path, 'w', encoding='utf-8', newline='') if results_path else None
+    try:
+        writer = csv.writer(out) if out else None
+        if writer:
+            writer.writerow(['line', 'path', 'status', 'message'])
+        for done, result in enumerate(iter_import_results(manifest_path, fmt, max_workers, sidecar, cancel), start=1):
+            if result.ok:
+                applied += 1
+            else:
+                failed += 1
+            if writer:
+                writer.writerow([result.line, result.path, 'ok' if result.ok else 'error', result.message])
+            if progress is not None and done % 100 == 0:
+                progress(done)
+    finally:
+        if out:
+            out.close()
+    if progress is not None:
+        progress(applied + failed)
+    return {'applied': applied, 'failed': failed}
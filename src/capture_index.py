@@ -0,0 +1,216 @@
+"""
+Capture Index Module
+Capture times of a whole queue for chronological sorting, event grouping and
+time-range selection.
+
+build_capture_index() reads only the date fields of every file (header-only
+read_fields(), or the catalog when a file is unchanged since the last read)
+on the same ordered thread pool as bulk export, and keeps one timestamp per
+file in a typed array('d'). Capture times are used in this order:
+DateTimeOriginal (+ SubSecTimeOriginal), XMP xmp:CreateDate,
+photoshop:DateCreated, then DateTimeDigitized (+ SubSecTimeDigitized).
+
+Timestamps are the camera's wall-clock time expressed as seconds (time zone
+offsets are ignored, as cameras in one shoot share a clock); files without a
+usable date hold NaN. The sorted order is computed once, so sorting, gap
+grouping and range selection afterwards only walk the array.
+"""
+
+import calendar
+import datetime
+import math
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from catalog import metadata_stamp
+from io_scheduler import HEADER_READAHEAD_BYTES, ordered_parallel_map, with_readahead
+from metadata_handler import MetadataHandler
+
+# (date field, sub-second field or None), most reliable first
+CAPTURE_SOURCES = [('DateTimeOriginal', 'SubSecTimeOriginal'), ('CreateDate', None),
+                   ('DateCreated', None), ('DateTimeDigitized', 'SubSecTimeDigitized')]
+CAPTURE_FIELDS = [name for pair in CAPTURE_SOURCES for name in pair if name]
+# Default gap that starts a new event (2 hours)
+EVENT_GAP_SECONDS = 2 * 3600
+# Catalog rows are written in batches of this many files
+CATALOG_BATCH = 500
+
+# EXIF "YYYY:MM:DD HH:MM:SS" or ISO 8601 "YYYY-MM-DDTHH:MM:SS.ff+hh:mm" (offset ignored)
+_DATE_RE = re.compile(r'(\d{4})[:\-](\d{2})[:\-](\d{2})(?:[ T](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d+))?)?)?')
+
+
+def parse_capture_time(value: Any, subsec: Any = None) -> Optional[float]:
+    """
+    Seconds since 1970-01-01 of an EXIF or XMP date (wall-clock, offset ignored),
+    plus an optional SubSecTime* digit string. None for missing or invalid dates
+    such as "0000:00:00 00:00:00".
+    """
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    if not isinstance(value, str):
+        return None
+    match = _DATE_RE.match(value.strip())
+    if not match:
+        return None
+    year, month, day, hour, minute, second, fraction = match.groups()
+    parts = (int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    try:
+        datetime.datetime(*parts)
+    except ValueError:
+        return None
+    seconds = float(calendar.timegm(parts + (0, 0, 0)))
+    if fraction is None and subsec is not None:
+        fraction = re.sub(r'\D', '', str(subsec))
+    if fraction:
+        seconds += float('0.' + fraction)
+    return seconds
+
+
+def capture_time(values: Dict[str, Any]) -> Optional[float]:
+    """Capture timestamp from read_fields() values, using the first usable CAPTURE_SOURCES entry."""
+    for date_name, subsec_name in CAPTURE_SOURCES:
+        seconds = parse_capture_time(values.get(date_name), values.get(subsec_name) if subsec_name else None)
+        if seconds is not None:
+            return seconds
+    return None
+
+
+def format_capture_time(seconds: float) -> str:
+    """'YYYY-MM-DD HH:MM:SS' for a timestamp from this module ('' for NaN)."""
+    if math.isnan(seconds):
+        return ''
+    return datetime.datetime.fromtimestamp(int(seconds), datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class CaptureEvent:
+    """A run of files shot without a gap longer than the grouping threshold."""
+
+    def __init__(self, indices: List[int], start: float, end: float):
+        self.indices = indices
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    @property
+    def label(self) -> str:
+        start, end = format_capture_time(self.start), format_capture_time(self.end)
+        if end[:10] == start[:10]:
+            end = end[11:]
+        return f"{start} - {end} ({len(self)} photos)"
+
+
+class CaptureIndex:
+    """Capture timestamps of a set of files as one array('d'), NaN where a file has no date."""
+
+    def __init__(self, paths: Sequence[str], times: array):
+        self.paths = list(paths)
+        self.times = times
+        # Dated files in time order (ties keep queue order), then undated files in queue order
+        dated = [i for i in range(len(times)) if not math.isnan(times[i])]
+        dated.sort(key=times.__getitem__)
+        self._order = array('l', dated)
+        self._sorted_times = array('d', (times[i] for i in dated))
+        self.undated = [i for i in range(len(times)) if math.isnan(times[i])]
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def dated_count(self) -> int:
+        return len(self._order)
+
+    @property
+    def span(self) -> Optional[Tuple[float, float]]:
+        """(earliest, latest) capture time, or None if no file is dated."""
+        if not self._order:
+            return None
+        return self._sorted_times[0], self._sorted_times[-1]
+
+    def sorted_indices(self) -> List[int]:
+        """Indices in capture-time order; undated files last, in their original order."""
+        return list(self._order) + self.undated
+
+    def sorted_paths(self) -> List[str]:
+        return [self.paths[i] for i in self.sorted_indices()]
+
+    def group_events(self, gap_seconds: float = EVENT_GAP_SECONDS) -> List[CaptureEvent]:
+        """Split the dated files into events wherever consecutive captures are more than gap_seconds apart."""
+        events: List[CaptureEvent] = []
+        start = 0
+        times = self._sorted_times
+        for k in range(1, len(times) + 1):
+            if k == len(times) or times[k] - times[k - 1] > gap_seconds:
+                events.append(CaptureEvent(list(self._order[start:k]), times[start], times[k - 1]))
+                start = k
+        return events
+
+    def select_range(self, start: Optional[float] = None, end: Optional[float] = None) -> List[int]:
+        """Indices of files captured in [start, end] (either bound may be None), in time order."""
+        lo = 0 if start is None else bisect_left(self._sorted_times, start)
+        hi = len(self._sorted_times) if end is None else bisect_right(self._sorted_times, end)
+        return list(self._order[lo:hi])
+
+    def select_paths(self, indices: Iterable[int]) -> List[str]:
+        return [self.paths[i] for i in indices]
+
+
+def build_capture_index(paths: Iterable[str], catalog=None, max_workers: Optional[int] = None,
+                        progress: Optional[Callable[[int], None]] = None,
+                        cancel: Optional[threading.Event] = None) -> CaptureIndex:
+    """
+    Read the capture time of every path into a CaptureIndex.
+    catalog: optional MetadataCatalog; unchanged files are served from it and
+    newly read values are stored back. progress(n) gets the files done so far.
+    """
+    paths = list(paths)
+    times = array('d', [math.nan]) * len(paths)
+    local = threading.local()
+
+    def read(path: str):
+        if catalog is not None:
+            cached = catalog.get_field_values(path, CAPTURE_FIELDS)
+            if cached is not None:
+                return cached, None
+        try:
+            stamp = metadata_stamp(path)
+        except OSError:
+            return None, None
+        handler = getattr(local, 'handler', None)
+        if handler is None:
+            handler = local.handler = MetadataHandler()
+        if not handler.is_supported(path):
+            return None, None
+        try:
+            return handler.read_fields(path, CAPTURE_FIELDS), stamp
+        except Exception:
+            return None, None
+
+    pending: List[Tuple[str, int, int, List[str], Dict[str, Any]]] = []
+    done = 0
+    workers = max_workers or min(16, (os.cpu_count() or 4) * 2)
+    hinted = with_readahead(enumerate(paths), nbytes=HEADER_READAHEAD_BYTES, path_of=lambda item: item[1])
+    for (i, path), (values, stamp) in ordered_parallel_map(lambda item: read(item[1]), hinted, workers,
+                                                           cancel=cancel):
+        if values is not None:
+            seconds = capture_time(values)
+            if seconds is not None:
+                times[i] = seconds
+            if stamp is not None and catalog is not None:
+                pending.append((path, stamp[0], stamp[1], CAPTURE_FIELDS, values))
+                if len(pending) >= CATALOG_BATCH:
+                    catalog.put_field_values(pending)
+                    pending = []
+        done += 1
+        if progress is not None and done % 100 == 0:
+            progress(done)
+    if pending:
+        catalog.put_field_values(pending)
+    if progress is not None:
+        progress(done)
+    return CaptureIndex(paths, times)
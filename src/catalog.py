@@ -0,0 +1,195 @@
+"""
+Metadata Catalog Module
+Persistent per-file cache of derived data, validated by size and mtime.
+
+Entries are keyed by absolute path and are only returned while the file's
+size and mtime_ns still match what was recorded, so stale values are never
+served after a file changes. Cached metadata values also track the mtime of
+the file's XMP sidecar. Stored in SQLite next to the templates
+(~/.metadata_manipulator/catalog.sqlite).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from xmp_sidecar import find_sidecar
+
+# Bumped when cached field values were derived incorrectly; older field caches are dropped
+CATALOG_VERSION = 1
+
+
+def file_stamp(file_path: str) -> Tuple[int, int]:
+    """(size, mtime_ns) used to validate catalog entries."""
+    st = os.stat(file_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def metadata_stamp(file_path: str) -> Tuple[int, int]:
+    """
+    (size, mtime_ns) for cached metadata values: the mtime is the later of the
+    image's and its XMP sidecar's, so editing or removing a sidecar also
+    invalidates the entry.
+    """
+    size, mtime_ns = file_stamp(file_path)
+    sidecar = find_sidecar(file_path)
+    if sidecar is not None:
+        try:
+            mtime_ns = max(mtime_ns, os.stat(sidecar).st_mtime_ns)
+        except OSError:
+            pass
+    return size, mtime_ns
+
+
+class MetadataCatalog:
+    """SQLite-backed cache of per-file values (content hashes, editor field summaries, ...)."""
+
+    def __init__(self, db_path: str = None):
+        """
+        Initialize the catalog.
+        db_path: SQLite file (default ~/.metadata_manipulator/catalog.sqlite); ':memory:' for tests.
+        """
+        if db_path is None:
+            db_dir = Path.home() / '.metadata_manipulator'
+            db_dir.mkdir(parents=True, exist_ok=True)
+            db_path = str(db_dir / 'catalog.sqlite')
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < CATALOG_VERSION:
+                # Version 0 stored UserComment with its charset prefix
+                self._conn.execute("DROP TABLE IF EXISTS editor_fields")
+                self._conn.execute("DROP TABLE IF EXISTS field_values")
+                self._conn.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS content_hash ("
+                " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+                " hash TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS editor_fields ("
+                " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+                " fields TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS field_values ("
+                " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+                " names TEXT NOT NULL, field_values TEXT NOT NULL)")
+        self.last_error = None
+
+    def get_hashes(self, stamps: Dict[str, Tuple[int, int]]) -> Dict[str, str]:
+        """Return cached content hashes for paths whose (size, mtime_ns) still match."""
+        found: Dict[str, str] = {}
+        paths = list(stamps)
+        with self._lock:
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT path, size, mtime_ns, hash FROM content_hash WHERE path IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall()
+                for path, size, mtime_ns, digest in rows:
+                    if stamps.get(path) == (size, mtime_ns):
+                        found[path] = digest
+        return found
+
+    def put_hashes(self, entries: Iterable[Tuple[str, int, int, str]]):
+        """Store (path, size, mtime_ns, hash) rows, replacing older entries."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO content_hash (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)",
+                list(entries))
+
+    def get_hash(self, file_path: str) -> Optional[str]:
+        """Cached content hash for one file, if still valid."""
+        path = os.path.abspath(file_path)
+        try:
+            stamp = file_stamp(path)
+        except OSError:
+            return None
+        return self.get_hashes({path: stamp}).get(path)
+
+    def get_editor_fields(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Cached editor field summary for one file, if still valid."""
+        path = os.path.abspath(file_path)
+        try:
+            stamp = metadata_stamp(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, fields FROM editor_fields WHERE path = ?", (path,)).fetchone()
+        if row is None or (row[0], row[1]) != stamp:
+            return None
+        return json.loads(row[2])
+
+    def put_editor_fields(self, file_path: str, fields: Dict[str, Any]):
+        """Store the editor field summary of a file under its current (size, mtime_ns)."""
+        path = os.path.abspath(file_path)
+        try:
+            size, mtime_ns = metadata_stamp(path)
+        except OSError:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO editor_fields (path, size, mtime_ns, fields) VALUES (?, ?, ?, ?)",
+                (path, size, mtime_ns, json.dumps(fields, ensure_ascii=False)))
+
+    def get_field_values(self, file_path: str, names: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """
+        Cached read_fields() result for one file, if still valid and recorded for
+        (at least) the requested names. Only those names are returned.
+        """
+        path = os.path.abspath(file_path)
+        try:
+            stamp = metadata_stamp(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, names, field_values FROM field_values WHERE path = ?", (path,)).fetchone()
+        if row is None or (row[0], row[1]) != stamp or not set(names) <= set(json.loads(row[2])):
+            return None
+        values = json.loads(row[3])
+        return {name: values[name] for name in names if name in values}
+
+    def put_field_values(self, entries: Iterable[Tuple[str, int, int, List[str], Dict[str, Any]]]):
+        """
+        Store (path, size, mtime_ns, names read, values found) rows. Names and
+        values are merged into an existing row for the same (size, mtime_ns),
+        so callers reading different fields of one file share its entry.
+        """
+        entries = [(os.path.abspath(path), size, mtime_ns, names, values)
+                   for path, size, mtime_ns, names, values in entries]
+        with self._lock, self._conn:
+            existing: Dict[str, Tuple[int, int, str, str]] = {}
+            paths = [entry[0] for entry in entries]
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                for path, *row in self._conn.execute(
+                        "SELECT path, size, mtime_ns, names, field_values FROM field_values"
+                        f" WHERE path IN ({','.join('?' * len(chunk))})", chunk):
+                    existing[path] = tuple(row)
+            rows = []
+            for path, size, mtime_ns, names, values in entries:
+                merged_names, merged_values = set(names), {}
+                old = existing.get(path)
+                if old is not None and (old[0], old[1]) == (size, mtime_ns):
+                    merged_names.update(json.loads(old[2]))
+                    merged_values = json.loads(old[3])
+                    for name in names:
+                        merged_values.pop(name, None)
+                merged_values.update(values)
+                row = (path, size, mtime_ns, json.dumps(sorted(merged_names)),
+                       json.dumps(merged_values, default=str, ensure_ascii=False))
+                existing[path] = row[1:]
+                rows.append(row)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO field_values (path, size, mtime_ns, names, field_values)"
+                " VALUES (?, ?, ?, ?, ?)", rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
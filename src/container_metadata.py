@@ -0,0 +1,296 @@
+"""
+Container Metadata Module
+Box/chunk-level location of Exif and XMP in HEIC/HEIF/AVIF and WebP files.
+
+HEIC, HEIF and AVIF are ISO-BMFF files: metadata items are listed in the
+'iinf' box of the top-level 'meta' box and located by the 'iloc' box, as
+extents either in the file or in the 'meta'/'idat' box. WebP is RIFF: Exif
+and XMP live in 'EXIF' and 'XMP ' chunks. Only box/chunk headers and the
+metadata byte ranges are read. Coded image data is skipped by seeking and is
+never decoded.
+"""
+
+import struct
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+BMFF_BRANDS = {
+    b'heic': 'HEIC', b'heix': 'HEIC', b'heim': 'HEIC', b'heis': 'HEIC', b'hevc': 'HEIC',
+    b'mif1': 'HEIF', b'msf1': 'HEIF', b'avif': 'AVIF', b'avis': 'AVIF',
+}
+XMP_MIME_TYPES = (b'application/rdf+xml', b'application/xmp+xml')
+
+# Metadata items larger than this are ignored (guards against corrupt lengths)
+MAX_ITEM_BYTES = 16 * 1024 * 1024
+# 'meta' boxes larger than this are not parsed
+MAX_META_BYTES = 4 * 1024 * 1024
+
+
+# -------------------- ISO-BMFF (HEIC/HEIF/AVIF) --------------------
+
+def _iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload_start, payload_end) for the boxes in data[start:end]."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, btype = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield btype, pos + header, pos + size
+        pos += size
+
+
+def _iter_file_boxes(f) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload_offset, payload_size) for the top-level boxes of an open file."""
+    f.seek(0, 2)
+    file_size = f.tell()
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        head = f.read(16)
+        size, btype = struct.unpack('>I4s', head[:8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', head[8:16])[0]
+            header = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header:
+            return
+        yield btype, pos + header, size - header
+        pos += size
+
+
+def _uint(data: bytes, pos: int, size: int) -> int:
+    return int.from_bytes(data[pos:pos + size], 'big') if size else 0
+
+
+def _parse_iinf(data: bytes, start: int, end: int) -> Dict[int, Tuple[bytes, bytes]]:
+    """item_ID -> (item_type, content_type) from an 'iinf' box payload."""
+    version = data[start]
+    pos = start + 4 + (2 if version == 0 else 4)
+    items: Dict[int, Tuple[bytes, bytes]] = {}
+    for btype, b_start, b_end in _iter_boxes(data, pos, end):
+        if btype != b'infe' or b_end - b_start < 8:
+            continue
+        infe_version = data[b_start]
+        if infe_version < 2:
+            continue
+        p = b_start + 4
+        id_size = 2 if infe_version == 2 else 4
+        item_id = _uint(data, p, id_size)
+        p += id_size + 2  # item_protection_index
+        item_type = data[p:p + 4]
+        p += 4
+        content_type = b''
+        if item_type == b'mime':
+            _name, _, rest = data[p:b_end].partition(b'\x00')
+            content_type = rest.partition(b'\x00')[0]
+        items[item_id] = (item_type, content_type)
+    return items
+
+
+def _parse_iloc(data: bytes, start: int, end: int) -> Dict[int, Tuple[int, List[Tuple[int, int]]]]:
+    """item_ID -> (construction_method, [(offset, length), ...]) from an 'iloc' box payload."""
+    version = data[start]
+    pos = start + 4
+    offset_size, length_size = data[pos] >> 4, data[pos] & 0x0F
+    base_offset_size = data[pos + 1] >> 4
+    index_size = data[pos + 1] & 0x0F if version in (1, 2) else 0
+    pos += 2
+    if version < 2:
+        count, pos = _uint(data, pos, 2), pos + 2
+    else:
+        count, pos = _uint(data, pos, 4), pos + 4
+    locations: Dict[int, Tuple[int, List[Tuple[int, int]]]] = {}
+    for _ in range(count):
+        id_size = 2 if version < 2 else 4
+        item_id, pos = _uint(data, pos, id_size), pos + id_size
+        method = 0
+        if version in (1, 2):
+            method, pos = _uint(data, pos, 2) & 0x0F, pos + 2
+        pos += 2  # data_reference_index
+        base, pos = _uint(data, pos, base_offset_size), pos + base_offset_size
+        extent_count, pos = _uint(data, pos, 2), pos + 2
+        extents = []
+        for _ in range(extent_count):
+            pos += index_size
+            offset, pos = _uint(data, pos, offset_size), pos + offset_size
+            length, pos = _uint(data, pos, length_size), pos + length_size
+            extents.append((base + offset, length))
+        if pos > end:
+            break
+        locations[item_id] = (method, extents)
+    return locations
+
+
+def _bmff_layout(f) -> Dict[str, Any]:
+    """Locate Exif/XMP items and image extents in an ISO-BMFF file."""
+    brand = None
+    layout: Dict[str, Any] = {'format': None, 'dimensions': None, 'exif': [], 'xmp': []}
+    for btype, offset, size in _iter_file_boxes(f):
+        if btype == b'ftyp':
+            f.seek(offset)
+            head = f.read(min(size, 64))
+            brands = [head[0:4]] + [head[i:i + 4] for i in range(8, len(head) - 3, 4)]
+            brand = next((BMFF_BRANDS[b] for b in brands if b in BMFF_BRANDS), None)
+        elif btype == b'meta':
+            if size > MAX_META_BYTES:
+                break
+            f.seek(offset)
+            data = f.read(size)
+            items: Dict[int, Tuple[bytes, bytes]] = {}
+            locations: Dict[int, Tuple[int, List[Tuple[int, int]]]] = {}
+            idat = None
+            largest = (0, 0)
+            for child, c_start, c_end in _iter_boxes(data, 4):
+                if child == b'iinf':
+                    items = _parse_iinf(data, c_start, c_end)
+                elif child == b'iloc':
+                    locations = _parse_iloc(data, c_start, c_end)
+                elif child == b'idat':
+                    idat = offset + c_start
+                elif child == b'iprp':
+                    for prop, p_start, p_end in _iter_boxes(data, c_start, c_end):
+                        if prop != b'ipco':
+                            continue
+                        for ispe, s_start, s_end in _iter_boxes(data, p_start, p_end):
+                            if ispe == b'ispe' and s_end - s_start >= 12:
+                                w, h = struct.unpack('>II', data[s_start + 4:s_start + 12])
+                                if w * h > largest[0] * largest[1]:
+                                    largest = (w, h)
+            if largest[0]:
+                layout['dimensions'] = largest
+            for item_id, (item_type, content_type) in items.items():
+                if item_type == b'Exif':
+                    key = 'exif'
+                elif item_type == b'mime' and content_type in XMP_MIME_TYPES:
+                    key = 'xmp'
+                else:
+                    continue
+                method, extents = locations.get(item_id, (None, []))
+                if method == 1 and idat is not None:
+                    extents = [(idat + o, n) for o, n in extents]
+                elif method != 0:
+                    continue
+                layout[key].append(extents)
+            break
+    layout['format'] = brand
+    return layout
+
+
+# -------------------- RIFF (WebP) --------------------
+
+def _webp_layout(f) -> Dict[str, Any]:
+    """Locate EXIF/XMP chunks and the canvas size in a WebP file."""
+    layout: Dict[str, Any] = {'format': 'WEBP', 'dimensions': None, 'exif': [], 'xmp': []}
+    f.seek(4)
+    riff_end = 8 + struct.unpack('<I', f.read(4))[0]
+    pos = 12
+    while pos + 8 <= riff_end:
+        f.seek(pos)
+        head = f.read(8)
+        if len(head) < 8:
+            break
+        ctype, size = head[:4], struct.unpack('<I', head[4:])[0]
+        data_pos = pos + 8
+        if ctype == b'EXIF':
+            layout['exif'].append([(data_pos, size)])
+        elif ctype == b'XMP ':
+            layout['xmp'].append([(data_pos, size)])
+        elif ctype in (b'VP8X', b'VP8 ', b'VP8L') and layout['dimensions'] is None:
+            body = f.read(min(size, 30))
+            layout['dimensions'] = _webp_dimensions(ctype, body)
+        pos = data_pos + size + (size & 1)
+    return layout
+
+
+def _webp_dimensions(ctype: bytes, body: bytes) -> Optional[Tuple[int, int]]:
+    """Canvas size from the first VP8X/VP8/VP8L chunk header."""
+    try:
+        if ctype == b'VP8X':
+            return (int.from_bytes(body[4:7], 'little') + 1, int.from_bytes(body[7:10], 'little') + 1)
+        if ctype == b'VP8 ' and body[3:6] == b'\x9d\x01\x2a':
+            w, h = struct.unpack('<HH', body[6:10])
+            return (w & 0x3FFF, h & 0x3FFF)
+        if ctype == b'VP8L' and body[0] == 0x2F:
+            bits = int.from_bytes(body[1:5], 'little')
+            return ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    except (IndexError, struct.error):
+        pass
+    return None
+
+
+# -------------------- Public API --------------------
+
+def container_format(f) -> Optional[str]:
+    """'isobmff' or 'riff' (WebP) for a supported container, else None."""
+    f.seek(0)
+    head = f.read(12)
+    if head[4:8] == b'ftyp':
+        return 'isobmff'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'riff'
+    return None
+
+
+def read_container_layout(f) -> Dict[str, Any]:
+    """
+    Locate metadata in an open HEIC/HEIF/AVIF/WebP file.
+    Returns {'format': 'HEIC'/'HEIF'/'AVIF'/'WEBP'/None, 'dimensions': (w, h) or None,
+    'exif': [extents, ...], 'xmp': [extents, ...]} where extents is a list of
+    (file offset, length). Raises ValueError for other files.
+    """
+    kind = container_format(f)
+    if kind == 'isobmff':
+        return _bmff_layout(f)
+    if kind == 'riff':
+        return _webp_layout(f)
+    raise ValueError("Not an ISO-BMFF or WebP file")
+
+
+def _read_extents(f, extents: List[Tuple[int, int]]) -> Optional[bytes]:
+    if sum(n for _, n in extents) > MAX_ITEM_BYTES:
+        return None
+    parts = []
+    for offset, length in extents:
+        f.seek(offset)
+        parts.append(f.read(length))
+    return b''.join(parts)
+
+
+def read_container_metadata(file_path: str) -> Dict[str, Any]:
+    """
+    Read the Exif and XMP payloads of a HEIC/HEIF/AVIF/WebP file.
+    Returns {'format', 'dimensions', 'exif': TIFF-structured bytes or None,
+    'xmp': packet bytes or None}. Only the metadata byte ranges are read.
+    """
+    with open(file_path, 'rb') as f:
+        layout = read_container_layout(f)
+        result: Dict[str, Any] = {'format': layout['format'], 'dimensions': layout['dimensions'],
+                                  'exif': None, 'xmp': None}
+        for extents in layout['exif']:
+            data = _read_extents(f, extents)
+            if not data:
+                continue
+            if layout['format'] != 'WEBP' and len(data) >= 4:
+                # HEIF Exif items start with a 4-byte offset to the TIFF header
+                data = data[4 + struct.unpack('>I', data[:4])[0]:]
+            if data.startswith(b'Exif\x00\x00'):
+                data = data[6:]
+            if data[:2] in (b'II', b'MM'):
+                result['exif'] = data
+                break
+        for extents in layout['xmp']:
+            data = _read_extents(f, extents)
+            if data:
+                result['xmp'] = data
+                break
+    return result
@@ -0,0 +1,182 @@
+"""
+Duplicates Module
+Finds copies of the same shot by hashing only the image payload.
+
+The payload is the JPEG entropy-coded data from the SOS marker on, the PNG
+IDAT chunk data, or the TIFF strips/tiles of IFD0, so files that differ only
+in metadata (or name) hash the same. Files are read in streaming blocks;
+hashing runs in a process pool, and results are cached in the
+MetadataCatalog keyed by size/mtime.
+"""
+
+import hashlib
+import os
+import struct
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from catalog import MetadataCatalog, file_stamp
+from io_scheduler import HEADER_READAHEAD_BYTES, ordered_parallel_map, schedule, with_readahead
+from png_metadata import iter_chunks, PNG_SIGNATURE
+from tiff_metadata import TiffFile
+
+READ_BLOCK = 1024 * 1024
+HASH_VERSION = 'p1'  # bump when payload extraction changes, invalidating cached hashes
+
+
+def _jpeg_payload(f, size: int) -> List[Tuple[int, int]]:
+    """Range from the first SOS marker to the end of the file."""
+    f.seek(0)
+    if f.read(2) != b'\xff\xd8':
+        raise ValueError("Not a JPEG")
+    pos = 2
+    while pos + 4 <= size:
+        f.seek(pos)
+        head = f.read(4)
+        if head[0] != 0xFF:
+            break
+        marker = head[1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            pos += 2
+            continue
+        if marker == 0xDA:
+            return [(pos, size - pos)]
+        pos += 2 + struct.unpack('>H', head[2:4])[0]
+    return [(0, size)]
+
+
+def _png_payload(f) -> List[Tuple[int, int]]:
+    """Data ranges of the IDAT chunks."""
+    return [(start + 8, length) for ctype, length, start in iter_chunks(f) if ctype == b'IDAT']
+
+
+def _tiff_payload(f) -> List[Tuple[int, int]]:
+    """Strip or tile ranges of IFD0."""
+    tf = TiffFile(f)
+    entries, _ = tf.read_ifd(tf.first_ifd)
+    for offsets_tag, counts_tag in ((273, 279), (324, 325)):
+        if offsets_tag in entries and counts_tag in entries:
+            offsets = tf.read_value(entries[offsets_tag], max_bytes=None)
+            counts = tf.read_value(entries[counts_tag], max_bytes=None)
+            if isinstance(offsets, int):
+                offsets, counts = (offsets,), (counts,)
+            return [(tf.base + o, c) for o, c in zip(offsets, counts)]
+    raise ValueError("TIFF without strips or tiles")
+
+
+def payload_ranges(file_path: str) -> List[Tuple[int, int]]:
+    """(offset, length) ranges holding the image payload; the whole file for unknown formats."""
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        head = f.read(8)
+        try:
+            if head[:2] == b'\xff\xd8':
+                return _jpeg_payload(f, size)
+            if head == PNG_SIGNATURE:
+                return _png_payload(f)
+            if head[:2] in (b'II', b'MM'):
+                return _tiff_payload(f)
+        except Exception:
+            pass
+    return [(0, size)]
+
+
+def _iter_blocks(f, ranges: List[Tuple[int, int]]) -> Iterator[bytes]:
+    for offset, length in ranges:
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def content_hash(file_path: str) -> str:
+    """BLAKE2b digest of the image payload, read in streaming blocks."""
+    ranges = payload_ranges(file_path)
+    h = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for block in _iter_blocks(f, ranges):
+            h.update(block)
+    return f"{HASH_VERSION}:{h.hexdigest()}"
+
+
+def _payload_size(file_path: str) -> int:
+    return sum(length for _, length in payload_ranges(file_path))
+
+
+def find_duplicates(paths: Sequence[str], catalog: Optional[MetadataCatalog] = None,
+                    max_workers: Optional[int] = None,
+                    progress: Optional[Callable[[int, int], None]] = None) -> List[List[str]]:
+    """
+    Group paths whose image payloads are identical. Returns groups of 2+ paths
+    (as given, in queue order). Only files sharing a payload size with another
+    file are hashed; cached hashes from the catalog are reused while files are
+    unchanged. progress(done, total) reports hashing progress.
+    """
+    originals: Dict[str, str] = {}
+    for p in paths:
+        originals.setdefault(os.path.abspath(p), p)
+    stamps: Dict[str, Tuple[int, int]] = {}
+    for path in originals:
+        try:
+            stamps[path] = file_stamp(path)
+        except OSError:
+            continue
+
+    # Header-only pass: a file can only duplicate another with the same payload size
+    by_size: Dict[int, List[str]] = defaultdict(list)
+    candidates = list(stamps)
+    candidates = [candidates[i] for i in schedule(candidates)]
+    hinted = with_readahead(candidates, nbytes=HEADER_READAHEAD_BYTES)
+    for path, size in ordered_parallel_map(lambda p: _safe(_payload_size, p), hinted,
+                                           min(32, (os.cpu_count() or 4) * 4)):
+        if size is not None:
+            by_size[size].append(path)
+    shared = [p for group in by_size.values() if len(group) > 1 for p in group]
+    shared_set = set(shared)
+
+    hashes: Dict[str, str] = {}
+    if catalog is not None and shared:
+        cached = catalog.get_hashes({p: stamps[p] for p in shared})
+        hashes = {p: h for p, h in cached.items() if h.startswith(HASH_VERSION + ':')}
+    to_hash = [p for p in candidates if p in shared_set and p not in hashes]
+
+    total = len(to_hash)
+    if to_hash:
+        new_rows = []
+        workers = max_workers or os.cpu_count() or 2
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for done, (path, digest) in enumerate(zip(to_hash, pool.map(_safe_hash, to_hash, chunksize=8)), start=1):
+                if digest is not None:
+                    hashes[path] = digest
+                    size, mtime_ns = stamps[path]
+                    new_rows.append((path, size, mtime_ns, digest))
+                if progress is not None:
+                    progress(done, total)
+        if catalog is not None and new_rows:
+            catalog.put_hashes(new_rows)
+
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for path, original in originals.items():
+        if path in hashes:
+            groups[hashes[path]].append(original)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def _safe(fn, path):
+    try:
+        return fn(path)
+    except Exception:
+        return None
+
+
+def _safe_hash(path: str) -> Optional[str]:
+    """Process-pool entry point (must be a module-level function)."""
+    return _safe(content_hash, path)
@@ -0,0 +1,198 @@
+"""
+Facets Module
+Cross-file value distribution and consistency report for a queue.
+
+build_facet_report() reads a fixed set of fields (header-only read_fields(),
+or the catalog when a file is unchanged since the last report) for every
+file and folds them into per-field value counts in one pass. For every field
+the report lists how many distinct values occur and which files lack it.
+It also lists files whose XMP and EXIF copies of the same information
+disagree (dc:creator vs Artist, dc:rights vs Copyright, dc:subject vs
+XPKeywords), which a template would overwrite with one value.
+
+Files are read on the same bounded, ordered thread pool as bulk export.
+Reports can be written as JSON or CSV.
+"""
+
+import csv
+import json
+import os
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from catalog import metadata_stamp
+from io_scheduler import HEADER_READAHEAD_BYTES, ordered_parallel_map, with_readahead
+from metadata_handler import MetadataHandler
+
+FACET_FIELDS = ['Artist', 'creator', 'Copyright', 'rights', 'Headline', 'description',
+                'subject', 'XPKeywords', 'Make', 'Model', 'LensModel']
+# (XMP field, EXIF field) pairs holding the same information
+CONFLICT_PAIRS = [('creator', 'Artist'), ('rights', 'Copyright'), ('subject', 'XPKeywords')]
+# Catalog rows are written in batches of this many files
+CATALOG_BATCH = 500
+
+
+def _terms(value: Any) -> List[str]:
+    """Non-empty string values of a field (one per list item)."""
+    if value is None:
+        return []
+    items = value if isinstance(value, (list, tuple)) else [value]
+    return [text for text in (str(item).strip() for item in items) if text]
+
+
+class FieldFacet:
+    """Value counts and missing files of one field."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counts: Counter = Counter()  # value (or keyword, for list fields) -> files
+        self.present = 0
+        self.missing: List[str] = []
+
+    @property
+    def distinct(self) -> int:
+        return len(self.counts)
+
+    @property
+    def consistent(self) -> bool:
+        """True when every file has the field and all share one value."""
+        return not self.missing and self.distinct <= 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'field': self.name, 'present': self.present, 'distinct': self.distinct,
+                'values': dict(self.counts.most_common()), 'missing': self.missing}
+
+
+class FacetReport:
+    """Per-field distributions, missing fields and XMP/EXIF conflicts for a set of files."""
+
+    def __init__(self, fields: Sequence[str] = FACET_FIELDS):
+        self.fields = list(fields)
+        self.facets = {name: FieldFacet(name) for name in self.fields}
+        self.pairs = [(a, b) for a, b in CONFLICT_PAIRS if a in self.facets and b in self.facets]
+        self.conflicts: Dict[str, List[Tuple[str, List[str], List[str]]]] = {f"{a}/{b}": [] for a, b in self.pairs}
+        self.errors: List[Tuple[str, str]] = []
+        self.total = 0
+
+    def add(self, path: str, values: Dict[str, Any]):
+        """Fold one file's field values into the report."""
+        self.total += 1
+        terms = {name: _terms(values.get(name)) for name in self.fields}
+        for name, found in terms.items():
+            facet = self.facets[name]
+            if found:
+                facet.present += 1
+                facet.counts.update(set(found))
+            else:
+                facet.missing.append(path)
+        for a, b in self.pairs:
+            if terms[a] and terms[b] and {t.casefold() for t in terms[a]} != {t.casefold() for t in terms[b]}:
+                self.conflicts[f"{a}/{b}"].append((path, terms[a], terms[b]))
+
+    def add_error(self, path: str, message: str):
+        self.total += 1
+        self.errors.append((path, message))
+
+    def summary_lines(self, top: int = 5) -> List[str]:
+        """Human-readable summary, one line per field plus conflict counts."""
+        lines = [f"{self.total} file(s), {len(self.errors)} unreadable"]
+        for name in self.fields:
+            facet = self.facets[name]
+            state = "consistent" if facet.consistent else f"{facet.distinct} distinct, {len(facet.missing)} missing"
+            common = ', '.join(f"{value} ({count})" for value, count in facet.counts.most_common(top))
+            lines.append(f"{name}: {state}" + (f" - {common}" if common else ''))
+        for label, rows in self.conflicts.items():
+            if rows:
+                lines.append(f"{label}: {len(rows)} file(s) disagree")
+        return lines
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'files': self.total,
+            'fields': [self.facets[name].to_dict() for name in self.fields],
+            'conflicts': {label: [{'path': p, 'xmp': a, 'exif': b} for p, a, b in rows]
+                          for label, rows in self.conflicts.items()},
+            'errors': [{'path': p, 'error': e} for p, e in self.errors],
+        }
+
+
+def build_facet_report(paths: Iterable[str], fields: Sequence[str] = FACET_FIELDS, catalog=None,
+                       max_workers: Optional[int] = None, progress: Optional[Callable[[int], None]] = None,
+                       cancel: Optional[threading.Event] = None) -> FacetReport:
+    """
+    Read fields for every path and aggregate them into a FacetReport.
+    catalog: optional MetadataCatalog; unchanged files are served from it and
+    newly read values are stored back. progress(n) gets the files done so far.
+    """
+    fields = list(fields)
+    local = threading.local()
+
+    def read(path: str):
+        try:
+            stamp = metadata_stamp(path)
+        except OSError as e:
+            return None, None, str(e)
+        if catalog is not None:
+            cached = catalog.get_field_values(path, fields)
+            if cached is not None:
+                return cached, None, None
+        handler = getattr(local, 'handler', None)
+        if handler is None:
+            handler = local.handler = MetadataHandler()
+        if not handler.is_supported(path):
+            return None, None, f"Unsupported file format: {handler.get_file_extension(path)}"
+        try:
+            values = handler.read_fields(path, fields)
+        except Exception as e:
+            return None, None, str(e)
+        return values, stamp, None
+
+    report = FacetReport(fields)
+    pending: List[Tuple[str, int, int, List[str], Dict[str, Any]]] = []
+    workers = max_workers or min(16, (os.cpu_count() or 4) * 2)
+    hinted = with_readahead(paths, nbytes=HEADER_READAHEAD_BYTES)
+    for path, (values, stamp, error) in ordered_parallel_map(read, hinted, workers, cancel=cancel):
+        if error is not None:
+            report.add_error(path, error)
+        else:
+            report.add(path, values)
+            if stamp is not None and catalog is not None:
+                pending.append((path, stamp[0], stamp[1], fields, values))
+                if len(pending) >= CATALOG_BATCH:
+                    catalog.put_field_values(pending)
+                    pending = []
+        if progress is not None and report.total % 100 == 0:
+            progress(report.total)
+    if pending:
+        catalog.put_field_values(pending)
+    if progress is not None:
+        progress(report.total)
+    return report
+
+
+def write_facet_report(report: FacetReport, output_path: str, fmt: Optional[str] = None):
+    """
+    Write a report as JSON (the to_dict() structure) or CSV with one row per
+    value, missing file, conflict and error: kind, field, value, count, path.
+    """
+    fmt = (fmt or os.path.splitext(output_path)[1].lstrip('.') or 'json').lower()
+    if fmt not in ('json', 'csv'):
+        raise ValueError(f"Unsupported report format: {fmt}")
+    with open(output_path, 'w', encoding='utf-8', newline='') as out:
+        if fmt == 'json':
+            json.dump(report.to_dict(), out, ensure_ascii=False, indent=2)
+            return
+        writer = csv.writer(out)
+        writer.writerow(['kind', 'field', 'value', 'count', 'path'])
+        for name in report.fields:
+            facet = report.facets[name]
+            for value, count in facet.counts.most_common():
+                writer.writerow(['value', name, value, count, ''])
+            for path in facet.missing:
+                writer.writerow(['missing', name, '', '', path])
+        for label, rows in report.conflicts.items():
+            for path, xmp_terms, exif_terms in rows:
+                writer.writerow(['conflict', label, f"{'; '.join(xmp_terms)} | {'; '.join(exif_terms)}", '', path])
+        for path, error in report.errors:
+            writer.writerow(['error', '', error, '', path])
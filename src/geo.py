@@ -0,0 +1,206 @@
+"""
+Geo Module
+GPS positions for a whole queue, bounding-box / radius filters and GeoJSON export.
+
+collect_gps() reads the raw GPS IFD of every file (header-only, on the same
+ordered thread pool as bulk export) and only copies the rational numerators
+and denominators into preallocated NumPy arrays. The conversion to signed
+decimal degrees (GPSLatitudeRef S / GPSLongitudeRef W are negative, and
+GPSAltitudeRef 1 means below sea level) then runs once over the whole queue.
+Filters work on the same arrays, so even large queues filter at once.
+
+NumPy is imported on first use; without it this module raises ImportError
+with an install hint and the rest of the application is unaffected.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from io_scheduler import HEADER_READAHEAD_BYTES, ordered_parallel_map, with_readahead
+from metadata_handler import MetadataHandler
+
+# piexif.GPSIFD tag ids
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+GPS_ALTITUDE_REF = 5
+GPS_ALTITUDE = 6
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("GPS filtering needs NumPy (pip install numpy)") from e
+    return numpy
+
+
+def _rationals(value: Any, count: int) -> Optional[List[List[int]]]:
+    """[[num, den], ...] for the first count rationals, or None if value has another shape."""
+    if isinstance(value, tuple) and len(value) == 2 and all(isinstance(n, int) for n in value):
+        value = [value]
+    if not isinstance(value, (list, tuple)) or len(value) < count:
+        return None
+    pairs: List[List[int]] = []
+    for pair in value[:count]:
+        if not (isinstance(pair, (list, tuple)) and len(pair) == 2):
+            return None
+        pairs.append([int(pair[0]), int(pair[1])])
+    return pairs
+
+
+def _ref(value: Any) -> str:
+    """GPS*Ref letter ('N', 'S', 'E', 'W') from bytes or str."""
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('ascii', errors='ignore')
+    return str(value or '').strip('\x00 ').upper()
+
+
+def _below_sea_level(value: Any) -> bool:
+    """GPSAltitudeRef 1 (BYTE; read as int, bytes or a 1-tuple)."""
+    if isinstance(value, (bytes, bytearray, tuple, list)):
+        value = value[0] if value else 0
+    return value == 1
+
+
+def dms_to_degrees(rationals, negative):
+    """
+    Signed decimal degrees from an (N, 3, 2) array of degree/minute/second
+    rationals and a boolean (N,) array of south/west flags. Rows with a zero
+    denominator come out as NaN.
+    """
+    np = _numpy()
+    r = np.asarray(rationals, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        parts = r[..., 0] / r[..., 1]
+    degrees = parts[:, 0] + parts[:, 1] / 60.0 + parts[:, 2] / 3600.0
+    degrees[~np.isfinite(degrees)] = np.nan
+    return np.where(negative, -degrees, degrees)
+
+
+class GpsTable:
+    """Positions of a set of files as parallel arrays (NaN where a file has no usable fix)."""
+
+    def __init__(self, paths: Sequence[str], lat, lon, alt):
+        self.paths = list(paths)
+        self.lat = lat
+        self.lon = lon
+        self.alt = alt
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def has_fix(self):
+        """Boolean mask of files with a valid latitude/longitude."""
+        np = _numpy()
+        return np.isfinite(self.lat) & np.isfinite(self.lon)
+
+    def within_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+        """Mask of fixes inside a box; min_lon > max_lon means the box crosses the antimeridian."""
+        in_lat = (self.lat >= min_lat) & (self.lat <= max_lat)
+        if min_lon <= max_lon:
+            in_lon = (self.lon >= min_lon) & (self.lon <= max_lon)
+        else:
+            in_lon = (self.lon >= min_lon) | (self.lon <= max_lon)
+        return in_lat & in_lon
+
+    def within_radius(self, lat: float, lon: float, radius_km: float):
+        """Mask of fixes within radius_km of (lat, lon), by great-circle (haversine) distance."""
+        return self.distances_km(lat, lon) <= radius_km
+
+    def distances_km(self, lat: float, lon: float):
+        """Great-circle distance of every fix from (lat, lon) in km (NaN without a fix)."""
+        np = _numpy()
+        phi1, phi2 = np.radians(lat), np.radians(self.lat)
+        dphi = phi2 - phi1
+        dlmb = np.radians(self.lon - lon)
+        a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def select(self, mask) -> List[str]:
+        """Paths where mask is true, in table order."""
+        np = _numpy()
+        return [self.paths[i] for i in np.flatnonzero(mask)]
+
+    def to_geojson(self, mask=None) -> Dict[str, Any]:
+        """FeatureCollection of Point features for the fixes (optionally only where mask is true)."""
+        np = _numpy()
+        keep = self.has_fix if mask is None else (self.has_fix & mask)
+        features = []
+        for i in np.flatnonzero(keep):
+            coords = [round(float(self.lon[i]), 7), round(float(self.lat[i]), 7)]
+            if np.isfinite(self.alt[i]):
+                coords.append(round(float(self.alt[i]), 2))
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': coords},
+                'properties': {'path': self.paths[i], 'name': os.path.basename(self.paths[i])},
+            })
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def write_geojson(self, output_path: str, mask=None):
+        with open(output_path, 'w', encoding='utf-8') as out:
+            json.dump(self.to_geojson(mask), out, ensure_ascii=False)
+
+
+def collect_gps(paths: Iterable[str], max_workers: Optional[int] = None,
+                progress: Optional[Callable[[int], None]] = None,
+                cancel: Optional[threading.Event] = None) -> GpsTable:
+    """Read the GPS IFD of every path and convert all positions at once into a GpsTable."""
+    np = _numpy()
+    paths = list(paths)
+    n = len(paths)
+    lat_r = np.zeros((n, 3, 2), dtype=np.int64)
+    lon_r = np.zeros((n, 3, 2), dtype=np.int64)
+    alt_r = np.zeros((n, 2), dtype=np.int64)
+    south = np.zeros(n, dtype=bool)
+    west = np.zeros(n, dtype=bool)
+    below = np.zeros(n, dtype=bool)
+    local = threading.local()
+
+    def read(path: str) -> Dict[int, Any]:
+        handler = getattr(local, 'handler', None)
+        if handler is None:
+            handler = local.handler = MetadataHandler()
+        try:
+            return handler.read_gps(path)
+        except Exception:
+            return {}
+
+    workers = max_workers or min(16, (os.cpu_count() or 4) * 2)
+    done = 0
+    hinted = with_readahead(enumerate(paths), nbytes=HEADER_READAHEAD_BYTES, path_of=lambda item: item[1])
+    for (i, _path), gps in ordered_parallel_map(lambda item: read(item[1]), hinted, workers, cancel=cancel):
+        lat = _rationals(gps.get(GPS_LATITUDE), 3)
+        lon = _rationals(gps.get(GPS_LONGITUDE), 3)
+        if lat is not None and lon is not None:
+            lat_r[i] = lat
+            lon_r[i] = lon
+            south[i] = _ref(gps.get(GPS_LATITUDE_REF)) == 'S'
+            west[i] = _ref(gps.get(GPS_LONGITUDE_REF)) == 'W'
+            alt = _rationals(gps.get(GPS_ALTITUDE), 1)
+            if alt is not None:
+                alt_r[i] = alt[0]
+                below[i] = _below_sea_level(gps.get(GPS_ALTITUDE_REF))
+        done += 1
+        if progress is not None and done % 100 == 0:
+            progress(done)
+    if progress is not None:
+        progress(done)
+
+    # Rows never filled keep 0/0 rationals and become NaN
+    lat = dms_to_degrees(lat_r, south)
+    lon = dms_to_degrees(lon_r, west)
+    lat[np.abs(lat) > 90] = np.nan
+    lon[np.abs(lon) > 180] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alt = alt_r[:, 0] / alt_r[:, 1]
+    alt[~np.isfinite(alt)] = np.nan
+    alt = np.where(below, -alt, alt)
+    return GpsTable(paths, lat, lon, alt)
@@ -0,0 +1,252 @@
+"""
+Instrumentation Module
+Optional per-phase timing for MetadataHandler operations.
+
+Each traced operation (read, edit, delete, ...) produces one JSON line with the
+duration and byte count of every phase it went through (Image.open,
+piexif.load, xmp.parse, normalize, Image.decode, piexif.dump, Image.save,
+xmp.inject). Phase durations are also aggregated into histograms.
+
+Tracing is off by default and then costs one attribute lookup per phase.
+Enable it with the PMM_TRACE environment variable or MetadataHandler(trace=...):
+  PMM_TRACE=1             stream JSON lines to stderr
+  PMM_TRACE=/tmp/t.jsonl  append JSON lines to a file
+"""
+
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+TRACE_ENV = 'PMM_TRACE'
+
+# Upper bounds (milliseconds) of the histogram buckets; the last bucket is open-ended.
+HISTOGRAM_BOUNDS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class _NullPhase:
+    """Shared no-op context used when tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add_bytes(self, n: int):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullTracer:
+    """Tracer that records nothing."""
+
+    enabled = False
+
+    def file(self, op: str, file_path: str):
+        return _NULL_PHASE
+
+    def phase(self, name: str):
+        return _NULL_PHASE
+
+    def histograms(self) -> Dict[str, Any]:
+        return {}
+
+
+class _Phase:
+    """Times one phase and attributes it to the current file record."""
+
+    __slots__ = ('tracer', 'name', 'nbytes', 'start')
+
+    def __init__(self, tracer: 'PhaseTracer', name: str):
+        self.tracer = tracer
+        self.name = name
+        self.nbytes = 0
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000.0
+        self.tracer._record_phase(self.name, elapsed_ms, self.nbytes)
+        return False
+
+    def add_bytes(self, n: int):
+        """Attribute n bytes (read or written) to this phase."""
+        try:
+            self.nbytes += int(n)
+        except Exception:
+            pass
+
+
+class _FileRecord:
+    """Collects the phases of one operation on one file and emits it on exit."""
+
+    __slots__ = ('tracer', 'op', 'file_path', 'phases', 'start')
+
+    def __init__(self, tracer: 'PhaseTracer', op: str, file_path: str):
+        self.tracer = tracer
+        self.op = op
+        self.file_path = file_path
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.tracer._stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        total_ms = (time.perf_counter() - self.start) * 1000.0
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        try:
+            file_size = os.path.getsize(self.file_path)
+        except Exception:
+            file_size = None
+        self.tracer._emit({
+            'ts': time.time(),
+            'op': self.op,
+            'file': str(self.file_path),
+            'file_size': file_size,
+            'total_ms': round(total_ms, 3),
+            'phases': {k: {'ms': round(v['ms'], 3), 'bytes': int(v['bytes'])} for k, v in self.phases.items()},
+            'error': repr(exc) if exc is not None else None,
+        })
+        return False
+
+
+class PhaseTracer:
+    """Records per-phase durations and byte counts, streams JSON lines, keeps histograms."""
+
+    enabled = True
+
+    def __init__(self, stream=None, path: Optional[str] = None):
+        """
+        stream: file-like object receiving one JSON object per line (default stderr).
+        path: append JSON lines to this file instead of a stream.
+        """
+        self._own_stream = False
+        if path:
+            stream = open(path, 'a', encoding='utf-8')
+            self._own_stream = True
+        self.stream = stream if stream is not None else sys.stderr
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._hist: Dict[str, Dict[str, Any]] = {}
+
+    def file(self, op: str, file_path: str) -> _FileRecord:
+        """Context manager for one operation on one file."""
+        return _FileRecord(self, op, file_path)
+
+    def phase(self, name: str) -> _Phase:
+        """Context manager timing one phase of the current operation."""
+        return _Phase(self, name)
+
+    def histograms(self) -> Dict[str, Any]:
+        """Return a snapshot of the per-phase duration histograms."""
+        labels = [f"<={b}ms" for b in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        out: Dict[str, Any] = {}
+        with self._lock:
+            for name, h in sorted(self._hist.items()):
+                out[name] = {
+                    'count': h['count'],
+                    'total_ms': round(h['total_ms'], 3),
+                    'max_ms': round(h['max_ms'], 3),
+                    'bytes': h['bytes'],
+                    'buckets': {labels[i]: c for i, c in enumerate(h['buckets']) if c},
+                }
+        return out
+
+    def write_summary(self):
+        """Emit the histograms as a final JSON line."""
+        self._emit({'ts': time.time(), 'op': 'summary', 'histograms': self.histograms()})
+
+    def close(self):
+        """Close the output file if the tracer opened it."""
+        if self._own_stream:
+            try:
+                self.stream.close()
+            except Exception:
+                pass
+
+    # Internal helpers
+
+    def _stack(self) -> List[_FileRecord]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record_phase(self, name: str, elapsed_ms: float, nbytes: int):
+        stack = self._stack()
+        if stack:
+            entry = stack[-1].phases.setdefault(name, {'ms': 0.0, 'bytes': 0})
+            entry['ms'] += elapsed_ms
+            entry['bytes'] += nbytes
+        with self._lock:
+            h = self._hist.get(name)
+            if h is None:
+                h = self._hist[name] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'bytes': 0,
+                                        'buckets': [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)}
+            h['count'] += 1
+            h['total_ms'] += elapsed_ms
+            h['max_ms'] = max(h['max_ms'], elapsed_ms)
+            h['bytes'] += nbytes
+            h['buckets'][bisect.bisect_left(HISTOGRAM_BOUNDS_MS, elapsed_ms)] += 1
+
+    def _emit(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            try:
+                self.stream.write(line + '\n')
+                self.stream.flush()
+            except Exception:
+                pass
+
+
+NULL_TRACER = NullTracer()
+
+
+def make_tracer(trace=None):
+    """
+    Build a tracer from an API flag or the PMM_TRACE environment variable.
+    trace: None (use PMM_TRACE), False, True (stderr), a file path, a stream,
+    or an existing tracer.
+    """
+    if trace is None:
+        env = os.environ.get(TRACE_ENV, '').strip()
+        if not env or env.lower() in ('0', 'false', 'no', 'off'):
+            return NULL_TRACER
+        trace = True if env.lower() in ('1', 'true', 'yes', 'on', 'stderr') else env
+    if trace is False:
+        return NULL_TRACER
+    if trace is True:
+        return PhaseTracer()
+    if isinstance(trace, (PhaseTracer, NullTracer)):
+        return trace
+    if isinstance(trace, (str, os.PathLike)):
+        return PhaseTracer(path=str(trace))
+    return PhaseTracer(stream=trace)
+
+
+def traced(op: str):
+    """Decorator wrapping a MetadataHandler method (first arg file_path) in a file record."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, file_path, *args, **kwargs):
+            with self.tracer.file(op, file_path):
+                return fn(self, file_path, *args, **kwargs)
+        return wrapper
+    return decorator
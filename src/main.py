@@ -5,13 +5,28 @@ Batch metadata editor with template support.
 """
 
 import wx
-import json
+import io
+import multiprocessing
 import os
+import threading
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
 from metadata_handler import MetadataHandler
-from templates import TemplateManager
+from templates import TemplateManager, CompiledTemplate
+from catalog import MetadataCatalog
+from duplicates import find_duplicates
+from facets import build_facet_report, write_facet_report
+from geo import collect_gps
+from capture_index import EVENT_GAP_SECONDS, build_capture_index, format_capture_time, parse_capture_time
+from time_shift import format_time_offset, parse_time_offset, shift_capture_times
+from bulk_metadata import export_metadata_bulk, import_metadata_bulk, iter_image_paths
+from io_scheduler import iter_scheduled
+from metadata_view import LiveMetadataDocument, MetadataRowModel
+from xmp_sidecar import find_sidecar
+from prefetch import NeighbourPrefetcher, editor_fields, load_scaled_preview, read_editor_fields
+from batch_rename import (MODES as RENAME_MODES, CASES as RENAME_CASES, RenameOptions, RenamePlanner,
+                          prefetch_fields, required_fields)
 
 
 class MainFrame(wx.Frame):
@@ -22,6 +37,12 @@ class MainFrame(wx.Frame):
 
         self.metadata_handler = MetadataHandler()
         self.template_manager = TemplateManager()
+        self._catalog = None  # MetadataCatalog, opened on first use
+        self.catalog_error: Optional[str] = None  # why the catalog could not be opened
+        # Rows around the selection are loaded in the background with their own handler
+        self._prefetch_handler = MetadataHandler()
+        self.prefetcher = NeighbourPrefetcher(lambda p: self._load_queue_entry(p, self._prefetch_handler),
+                                              on_loaded=lambda key, entry: wx.CallAfter(self._on_entry_loaded, key, entry))
         
         # Queue of files to process
         self.file_queue: List[str] = []
@@ -51,7 +72,8 @@ class MainFrame(wx.Frame):
         wx.CallAfter(self._finalize_layout)
 
         # Start live metadata refresh timer (every 0.5s)
-        self._meta_display_last_text = ""
+        self._meta_display_doc = LiveMetadataDocument()
+        self._meta_display_stamp = None  # (path, mtime_ns, size) shown in the live view
         self.metadata_timer = wx.Timer(self)
         self.Bind(wx.EVT_TIMER, self.on_metadata_timer, self.metadata_timer)
         self.metadata_timer.Start(500)
@@ -123,6 +145,10 @@ class MainFrame(wx.Frame):
         file_menu = wx.Menu()
         file_menu.Append(wx.ID_OPEN, "Add Photos\tCtrl+O")
         file_menu.AppendSeparator()
+        export_queue_item = file_menu.Append(wx.ID_ANY, "Export Queue Metadata...")
+        export_folder_item = file_menu.Append(wx.ID_ANY, "Export Folder Metadata...")
+        import_manifest_item = file_menu.Append(wx.ID_ANY, "Import Metadata Manifest...")
+        file_menu.AppendSeparator()
         file_menu.Append(wx.ID_EXIT, "Exit\tCtrl+Q")
 
         # Templates menu
@@ -132,12 +158,21 @@ class MainFrame(wx.Frame):
         templates_menu.AppendSeparator()
         templates_menu.Append(wx.ID_ANY, "Load Template")
 
+        # Tools menu
+        tools_menu = wx.Menu()
+        find_dupes_item = tools_menu.Append(wx.ID_ANY, "Find Duplicates in Queue...")
+        consistency_item = tools_menu.Append(wx.ID_ANY, "Queue Consistency Report...")
+        gps_filter_item = tools_menu.Append(wx.ID_ANY, "GPS Filter...")
+        capture_time_item = tools_menu.Append(wx.ID_ANY, "Sort and Group by Capture Time...")
+        time_shift_item = tools_menu.Append(wx.ID_ANY, "Shift Capture Time...")
+
         # Help menu
         help_menu = wx.Menu()
         help_menu.Append(wx.ID_ABOUT, "About")
 
         menu_bar.Append(file_menu, "&File")
         menu_bar.Append(templates_menu, "&Templates")
+        menu_bar.Append(tools_menu, "T&ools")
         menu_bar.Append(help_menu, "&Help")
 
         self.SetMenuBar(menu_bar)
@@ -145,6 +180,14 @@ class MainFrame(wx.Frame):
         # Bind events
         self.Bind(wx.EVT_MENU, self.on_add_photos, id=wx.ID_OPEN)
         self.Bind(wx.EVT_MENU, self.on_exit, id=wx.ID_EXIT)
+        self.Bind(wx.EVT_MENU, self.on_find_duplicates, find_dupes_item)
+        self.Bind(wx.EVT_MENU, self.on_consistency_report, consistency_item)
+        self.Bind(wx.EVT_MENU, self.on_gps_filter, gps_filter_item)
+        self.Bind(wx.EVT_MENU, self.on_capture_time, capture_time_item)
+        self.Bind(wx.EVT_MENU, self.on_shift_capture_time, time_shift_item)
+        self.Bind(wx.EVT_MENU, self.on_export_queue_metadata, export_queue_item)
+        self.Bind(wx.EVT_MENU, self.on_export_folder_metadata, export_folder_item)
+        self.Bind(wx.EVT_MENU, self.on_import_manifest, import_manifest_item)
 
     def create_file_queue_panel(self, parent) -> wx.Panel:
         """Create left panel with file queue list and drag-and-drop."""
@@ -280,6 +323,10 @@ class MainFrame(wx.Frame):
         batch_label.SetFont(font)
         sizer.Add(batch_label, 0, wx.ALL, 5)
 
+        self.cb_sidecar = wx.CheckBox(panel, label="Write XMP sidecars\n(originals untouched)")
+        self.cb_sidecar.SetToolTip("Save edits to <name>.xmp next to each photo instead of into the image file")
+        sizer.Add(self.cb_sidecar, 0, wx.ALL, 5)
+
         # Buttons
         btn_apply = wx.Button(panel, label="Apply Metadata\nto All Photos", size=(140, 60))
         btn_apply.Bind(wx.EVT_BUTTON, self.on_apply_metadata)
@@ -347,7 +394,8 @@ class MainFrame(wx.Frame):
 
     def on_add_photos(self, event):
         """Open file dialog to add photos to queue."""
-        wildcard = "Image files (*.jpg;*.jpeg;*.png;*.tiff;*.tif;*.gif;*.bmp)|*.jpg;*.jpeg;*.png;*.tiff;*.tif;*.gif;*.bmp|All files (*.*)|*.*"
+        patterns = ';'.join(f"*{ext}" for ext in sorted(MetadataHandler.SUPPORTED_FORMATS))
+        wildcard = f"Image files ({patterns})|{patterns}|All files (*.*)|*.*"
         dlg = wx.FileDialog(self, "Add Photos", wildcard=wildcard, style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST | wx.FD_MULTIPLE)
 
         if dlg.ShowModal() == wx.ID_OK:
@@ -373,7 +421,7 @@ class MainFrame(wx.Frame):
         sel = self.file_list.GetSelection()
         if sel != wx.NOT_FOUND:
             file_path = self.file_queue[sel]
-            self.show_metadata_preview(file_path)
+            self.show_metadata_preview(file_path, sel)
 
     def on_file_list_motion(self, event):
         """Show tooltip with metadata preview when hovering over file list."""
@@ -382,8 +430,9 @@ class MainFrame(wx.Frame):
         
         if idx != wx.NOT_FOUND:
             file_path = self.file_queue[idx]
-            # Read metadata
-            metadata = self.metadata_handler.read_metadata(file_path)
+            # Read metadata (prefetched rows are already parsed)
+            entry = self.prefetcher.get(file_path)
+            metadata = entry['metadata'] if entry else self.metadata_handler.read_metadata(file_path)
             
             if metadata and metadata.get('exif'):
                 exif = metadata['exif']
@@ -409,56 +458,93 @@ class MainFrame(wx.Frame):
         
         self.file_list.SetToolTip("")
 
-    def show_metadata_preview(self, file_path: str):
-        """Show metadata preview for a specific file and populate editor with current metadata."""
-        metadata = self.metadata_handler.read_metadata(file_path)
-        if not metadata:
+    def _load_queue_entry(self, file_path: str, handler: MetadataHandler) -> Dict[str, Any]:
+        """Everything the editor shows for one file; safe to run off the GUI thread."""
+        metadata = handler.read_metadata(file_path)
+        entry = {
+            'metadata': metadata,
+            'fields': None,
+            'preview': None,
+            'tooltip': '',
+        }
+        if metadata:
+            entry['fields'] = editor_fields({**(metadata.get('exif') or {}), **(metadata.get('xmp') or {})})
+            entry['preview'] = load_scaled_preview(handler, file_path)
+            entry['tooltip'] = self._build_metadata_tooltip(metadata)
+            catalog = self._catalog
+            if catalog is not None:
+                catalog.put_editor_fields(file_path, entry['fields'])
+        return entry
+
+    def show_metadata_preview(self, file_path: str, index: Optional[int] = None):
+        """
+        Show metadata preview for a specific file and populate editor with current metadata.
+        The editor fields are filled first (prefetched entry, catalog or header-only read);
+        with the queue index, the full metadata, thumbnail and tooltip follow from the
+        background loader via _on_entry_loaded.
+        """
+        entry = self.prefetcher.get(file_path)
+        if entry is None and index is None:
+            entry = self._load_queue_entry(file_path, self.metadata_handler)
+            self.prefetcher.put(file_path, entry)
+        if entry is not None:
+            fields = entry['fields']
+        else:
+            fields = read_editor_fields(self.metadata_handler, file_path, self._get_catalog())
+        if not fields:
             return
-        
-        # Remember current file and metadata for tooltip/context menu
+
+        # Remember current file for tooltip/context menu; full metadata may still be loading
         self.current_file_path = file_path
+        self._last_preview_metadata = None
+
+        # Auto-populate fields (prefer XMP where available, see prefetch.editor_fields)
+        self.tc_headline.SetValue(fields['headline'])
+        self.tc_description.SetValue(fields['description'])
+        self.tc_creator.SetValue(fields['creator'])
+        self.tc_subject.SetValue(fields['subject'])
+        self.tc_rights.SetValue(fields['rights'])
+
+        if entry is not None:
+            self._show_entry_details(file_path, entry)
+        else:
+            self.SetStatusText(f"File: {Path(file_path).name} | loading metadata...")
+        if index is not None:
+            self.prefetcher.focus(self.file_queue, index)
+
+    def _on_entry_loaded(self, key: str, entry: Dict[str, Any]):
+        """Prefetcher callback (via wx.CallAfter): finish the preview if this is the current file."""
+        if self.current_file_path and os.path.abspath(self.current_file_path) == key and entry['metadata']:
+            self._show_entry_details(self.current_file_path, entry)
+
+    def _show_entry_details(self, file_path: str, entry: Dict[str, Any]):
+        """Second stage of the preview: status line, thumbnail and tooltip from a loaded entry."""
+        metadata = entry['metadata']
         self._last_preview_metadata = metadata
 
         # Could display in a status bar or dialog
         exif = metadata.get('exif', {})
-        xmp = metadata.get('xmp', {})
         self.SetStatusText(f"File: {Path(file_path).name} | EXIF fields: {len(exif)}")
 
-        # Auto-populate fields (prefer XMP where available)
-        # Headline: ONLY from XMP photoshop:Headline (do not fall back to EXIF ImageDescription, which is usually Description)
-        headline = xmp.get('Headline', '')
-        
-        # Description: prefer XMP dc:description, then EXIF UserComment, then fallback to EXIF ImageDescription
-        description = xmp.get('description', '') or exif.get('UserComment', '') or exif.get('ImageDescription', '')
-        
-        creator = xmp.get('creator', '') or exif.get('Artist', '')
-        if isinstance(creator, list):
-            creator = '; '.join(str(a) for a in creator)
-        
-        # Subject: prefer XMP dc:subject bag; fall back to EXIF XPKeywords
-        subj_val = xmp.get('subject', []) or exif.get('XPKeywords', []) or exif.get('XPSubject', [])
-        if isinstance(subj_val, list):
-            subject = ', '.join(str(t) for t in subj_val)
-        else:
-            subject = str(subj_val) if subj_val else ''
-        
-        rights = xmp.get('rights', '') or exif.get('Copyright', '')
-
-        self.tc_headline.SetValue(str(headline).strip() if headline else '')
-        self.tc_description.SetValue(str(description).strip() if description else '')
-        self.tc_creator.SetValue(str(creator).strip() if creator else '')
-        self.tc_subject.SetValue(subject.strip() if subject else '')
-        self.tc_rights.SetValue(str(rights).strip() if rights else '')
-        
         # Update thumbnail preview (scaled)
         try:
-            img = wx.Image(file_path)
-            iw, ih = img.GetSize()
-            maxw, maxh = 320, 240
-            scale = min(maxw / iw, maxh / ih, 1.0)
-            nw, nh = int(iw * scale), int(ih * scale)
-            img = img.Scale(nw, nh, wx.IMAGE_QUALITY_HIGH)
-            bmp = wx.Bitmap(img)
+            if entry['preview']:
+                # Already decoded and scaled (RAW: from the embedded JPEG preview)
+                pw, ph, rgb = entry['preview']
+                bmp = wx.Bitmap.FromBuffer(pw, ph, rgb)
+            else:
+                # Formats Pillow cannot open: let wx decode and scale
+                preview = self.metadata_handler.read_preview(file_path)
+                if preview:
+                    img = wx.Image(io.BytesIO(preview), wx.BITMAP_TYPE_JPEG)
+                else:
+                    img = wx.Image(file_path)
+                iw, ih = img.GetSize()
+                maxw, maxh = 320, 240
+                scale = min(maxw / iw, maxh / ih, 1.0)
+                nw, nh = int(iw * scale), int(ih * scale)
+                img = img.Scale(nw, nh, wx.IMAGE_QUALITY_HIGH)
+                bmp = wx.Bitmap(img)
             self.preview_bitmap.SetBitmap(bmp)
         except Exception:
             # clear bitmap on failure
@@ -469,8 +555,7 @@ class MainFrame(wx.Frame):
 
         # Update tooltip on the preview with a concise metadata summary
         try:
-            tip = self._build_metadata_tooltip(metadata)
-            self.preview_bitmap.SetToolTip(tip or "No metadata available")
+            self.preview_bitmap.SetToolTip(entry['tooltip'] or "No metadata available")
         except Exception:
             pass
 
@@ -537,38 +622,60 @@ class MainFrame(wx.Frame):
             return f"Error building metadata text: {e}"
 
     def on_metadata_timer(self, event):
-        """Refresh the live metadata view next to the preview every 0.5 seconds."""
+        """
+        Refresh the live metadata view next to the preview every 0.5 seconds.
+        The file is only re-read when its mtime or size changed, and only the
+        lines of keys whose values changed are replaced in the text control.
+        """
         try:
             # Ensure control exists
             if not hasattr(self, 'tc_meta_display'):
                 return
-            text = ""
-            if self.current_file_path:
-                data = self.metadata_handler.read_metadata(self.current_file_path) or {}
-                # keep the last preview metadata in sync
-                self._last_preview_metadata = data
-                exif = data.get('exif', {}) or {}
-                xmp = data.get('xmp', {}) or {}
-
-                def norm(d: Dict[str, Any]) -> Dict[str, Any]:
-                    out: Dict[str, Any] = {}
-                    for k, v in d.items():
-                        if isinstance(v, (list, tuple)):
-                            out[k] = [self._format_value(i) for i in v]
-                        else:
-                            out[k] = self._format_value(v)
-                    return out
-
-                display_obj = {
-                    'EXIF': norm(exif),
-                    'XMP': norm(xmp),
-                }
-                # Pretty-print similar to scripts/metadata_viewer.py
-                text = json.dumps(display_obj, indent=2, ensure_ascii=False)
-
-            if text != getattr(self, '_meta_display_last_text', ""):
-                self.tc_meta_display.SetValue(text)
-                self._meta_display_last_text = text
+            if not self.current_file_path:
+                if self._meta_display_stamp is not None:
+                    self._meta_display_doc.reset()
+                    self.tc_meta_display.SetValue("")
+                    self._meta_display_stamp = None
+                return
+            # Sidecar edits change what read_metadata returns without touching the image
+            stamp = (self.current_file_path,)
+            for path in (self.current_file_path, find_sidecar(self.current_file_path)):
+                try:
+                    st = os.stat(path) if path else None
+                except OSError:
+                    st = None
+                stamp += (st.st_mtime_ns, st.st_size) if st else (None, None)
+            if stamp == self._meta_display_stamp:
+                return
+
+            data = self.metadata_handler.read_metadata(self.current_file_path) or {}
+            # keep the last preview metadata in sync
+            self._last_preview_metadata = data
+            exif = data.get('exif', {}) or {}
+            xmp = data.get('xmp', {}) or {}
+
+            def norm(d: Dict[str, Any]) -> Dict[str, Any]:
+                out: Dict[str, Any] = {}
+                for k, v in d.items():
+                    if isinstance(v, (list, tuple)):
+                        out[k] = [self._format_value(i) for i in v]
+                    else:
+                        out[k] = self._format_value(v)
+                return out
+
+            # Pretty-printed like scripts/metadata_viewer.py (keys sorted so edits stay local)
+            edits = self._meta_display_doc.update({'EXIF': norm(exif), 'XMP': norm(xmp)})
+            ctrl = self.tc_meta_display
+            if edits:
+                ctrl.Freeze()
+                try:
+                    for first, count, text in reversed(edits):
+                        ctrl.Replace(ctrl.XYToPosition(0, first), ctrl.XYToPosition(0, first + count), text)
+                except Exception:
+                    ctrl.SetValue(self._meta_display_doc.text())
+                finally:
+                    ctrl.Thaw()
+            self._meta_display_stamp = stamp
         except Exception:
             # Avoid timer crashes; ignore errors silently
             pass
@@ -730,7 +837,6 @@ class MainFrame(wx.Frame):
                 'description': f"Updated template: {template_name}",
                 'metadata': metadata
             }
-            self.template_manager.templates[template_name] = template_data
             self.template_manager.save_template(template_name, template_data)
             self.current_template = template_name
             wx.MessageBox(f"Template '{template_name}' updated.", "Success", wx.OK | wx.ICON_INFORMATION)
@@ -801,9 +907,17 @@ class MainFrame(wx.Frame):
             return
 
         metadata = self.collect_editor_metadata()
+        # Placeholders ({filename}, {index}, {exif.Model}, ...) are parsed once here
+        try:
+            template = CompiledTemplate(metadata)
+        except ValueError as e:
+            wx.MessageBox(f"Invalid placeholder: {e}", "Error", wx.OK | wx.ICON_WARNING)
+            return
 
+        sidecar = self.cb_sidecar.GetValue()
+        target = "write XMP sidecar files" if sidecar else "update EXIF and XMP"
         dlg = wx.MessageDialog(self,
-                               f"Apply metadata to {len(self.file_queue)} photo(s)?\n\nThis will update EXIF and XMP.",
+                               f"Apply metadata to {len(self.file_queue)} photo(s)?\n\nThis will {target}.",
                                "Confirm",
                                wx.YES_NO | wx.ICON_QUESTION)
 
@@ -812,30 +926,42 @@ class MainFrame(wx.Frame):
             return
         dlg.Destroy()
 
-        total = len(self.file_queue)
+        paths = list(self.file_queue)
+        total = len(paths)
+        state = {'done': 0, 'applied': 0}
+        failed: List[str] = []
+        cancel = threading.Event()
+
+        def work():
+            # Ordering the queue stats every file, so it runs here rather than on the GUI thread.
+            # Files are visited in on-disk order; {index} still follows the queue order
+            handler = MetadataHandler()
+            readahead = lambda path: handler.readahead_bytes(path, sidecar=sidecar)
+            for done, (pos, file_path) in enumerate(iter_scheduled(paths, nbytes=readahead), start=1):
+                if cancel.is_set():
+                    break
+                if handler.edit_metadata(file_path, template, None, index=pos + 1, sidecar=sidecar):
+                    state['applied'] += 1
+                else:
+                    failed.append(Path(file_path).name)
+                state['done'] = done
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
         prog = wx.ProgressDialog("Applying metadata",
                                  f"Applying metadata to {total} photos...",
                                  maximum=total,
                                  parent=self,
-                                 style=wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME)
-
-        applied = 0
-        failed: List[str] = []
-
-        for idx, file_path in enumerate(list(self.file_queue), start=1):
-            wx.YieldIfNeeded()
-            ok = self.metadata_handler.edit_metadata(file_path, metadata, None)
-            if ok:
-                applied += 1
-            else:
-                failed.append(Path(file_path).name)
-
-            keep_going = prog.Update(idx)[0]
+                                 style=wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME | wx.PD_CAN_ABORT)
+        while worker.is_alive():
+            keep_going, _ = prog.Update(min(state['done'], total - 1))
             if not keep_going:
-                # user cancelled
-                break
-
+                cancel.set()
+            wx.YieldIfNeeded()
+            worker.join(0.1)
         prog.Destroy()
+
+        applied = state['applied']
         summary = f"Applied metadata to {applied}/{total} photos."
         if failed:
             summary += f" Failed: {', '.join(failed)}"
@@ -850,7 +976,11 @@ class MainFrame(wx.Frame):
             return
 
         file_path = self.file_queue[sel]
-        metadata = self.collect_editor_metadata()
+        try:
+            template = CompiledTemplate(self.collect_editor_metadata())
+        except ValueError as e:
+            wx.MessageBox(f"Invalid placeholder: {e}", "Error", wx.OK | wx.ICON_WARNING)
+            return
 
         dlg = wx.MessageDialog(self,
                                f"Apply metadata to selected photo:\n{Path(file_path).name}?",
@@ -866,7 +996,8 @@ class MainFrame(wx.Frame):
                                  maximum=1,
                                  parent=self,
                                  style=wx.PD_ELAPSED_TIME)
-        ok = self.metadata_handler.edit_metadata(file_path, metadata, None)
+        ok = self.metadata_handler.edit_metadata(file_path, template, None, index=sel + 1,
+                                                 sidecar=self.cb_sidecar.GetValue())
         prog.Update(1)
         prog.Destroy()
 
@@ -905,7 +1036,7 @@ class MainFrame(wx.Frame):
         if ok:
             self.SetStatusText(f"Cleared metadata from {Path(file_path).name}")
             # Refresh the preview to show cleared metadata
-            self.show_metadata_preview(file_path)
+            self.show_metadata_preview(file_path, sel)
         else:
             self.SetStatusText(f"Failed to clear metadata from {Path(file_path).name}")
 
@@ -924,32 +1055,439 @@ class MainFrame(wx.Frame):
             return
         dlg.Destroy()
 
-        total = len(self.file_queue)
+        paths = list(self.file_queue)
+        total = len(paths)
+        state = {'done': 0, 'deleted': 0}
+        failed: List[str] = []
+        cancel = threading.Event()
+
+        def work():
+            # Ordering the queue stats every file, so it runs here rather than on the GUI thread
+            handler = MetadataHandler()
+            readahead = lambda path: handler.readahead_bytes(path, delete=True)
+            for done, (_pos, file_path) in enumerate(iter_scheduled(paths, nbytes=readahead), start=1):
+                if cancel.is_set():
+                    break
+                if handler.delete_all_metadata(file_path, file_path):
+                    state['deleted'] += 1
+                else:
+                    failed.append(Path(file_path).name)
+                state['done'] = done
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
         prog = wx.ProgressDialog("Deleting metadata",
                                  f"Removing metadata from {total} photos...",
                                  maximum=total,
                                  parent=self,
-                                 style=wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME)
+                                 style=wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME | wx.PD_CAN_ABORT)
+        while worker.is_alive():
+            keep_going, _ = prog.Update(min(state['done'], total - 1))
+            if not keep_going:
+                cancel.set()
+            wx.YieldIfNeeded()
+            worker.join(0.1)
+        prog.Destroy()
 
-        deleted = 0
-        failed: List[str] = []
+        deleted = state['deleted']
+        summary = f"Deleted metadata from {deleted}/{total} photos."
+        if failed:
+            summary += f" Failed: {', '.join(failed)}"
+        self.SetStatusText(summary)
 
-        for idx, file_path in enumerate(list(self.file_queue), start=1):
-            wx.YieldIfNeeded()
-            ok = self.metadata_handler.delete_all_metadata(file_path, file_path)
-            if ok:
-                deleted += 1
+    def _get_catalog(self):
+        """Open the metadata catalog on first use (None if it cannot be opened)."""
+        if self._catalog is None:
+            if self.catalog_error is not None:
+                return None
+            try:
+                self._catalog = MetadataCatalog()
+            except Exception as e:
+                self.catalog_error = str(e)
+                self.SetStatusText(f"Metadata catalog unavailable: {e}")
+                return None
+        return self._catalog
+
+    def on_find_duplicates(self, event):
+        """Hash image payloads of the queue in worker processes and show duplicate groups."""
+        if len(self.file_queue) < 2:
+            wx.MessageBox("Add at least two photos to the queue.", "Find Duplicates", wx.OK | wx.ICON_INFORMATION)
+            return
+
+        paths = list(self.file_queue)
+        catalog = self._get_catalog()
+        state = {'done': 0, 'total': 0}
+        result = {}
+
+        def progress(done, total):
+            state['done'], state['total'] = done, total
+
+        def work():
+            try:
+                result['groups'] = find_duplicates(paths, catalog, progress=progress)
+            except Exception as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        prog = wx.ProgressDialog("Find Duplicates", f"Comparing {len(paths)} photos...",
+                                 maximum=100, parent=self, style=wx.PD_ELAPSED_TIME)
+        while worker.is_alive():
+            if state['total']:
+                prog.Update(int(99 * state['done'] / state['total']),
+                            f"Hashing {state['done']}/{state['total']} candidate photos...")
             else:
-                failed.append(Path(file_path).name)
+                prog.Pulse()
+            wx.YieldIfNeeded()
+            worker.join(0.1)
+        prog.Destroy()
+
+        if 'error' in result:
+            wx.MessageBox(f"Duplicate search failed: {result['error']}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        groups = result.get('groups', [])
+        if not groups:
+            self.SetStatusText("No duplicates found in queue.")
+            wx.MessageBox("No duplicates found.", "Find Duplicates", wx.OK | wx.ICON_INFORMATION)
+            return
+
+        dlg = DuplicatesDialog(self, groups)
+        if dlg.ShowModal() == wx.ID_OK:
+            extras = {p for group in groups for p in group[1:]}
+            for i in reversed(range(len(self.file_queue))):
+                if self.file_queue[i] in extras:
+                    del self.file_queue[i]
+                    self.file_list.Delete(i)
+            self.SetStatusText(f"Removed {len(extras)} duplicate(s) from queue")
+        dlg.Destroy()
 
-            keep_going = prog.Update(idx)[0]
+    def on_consistency_report(self, event):
+        """Count field values across the queue and show which files are missing or disagree."""
+        if not self.file_queue:
+            wx.MessageBox("No photos in queue.", "Error", wx.OK | wx.ICON_WARNING)
+            return
+
+        paths = list(self.file_queue)
+        catalog = self._get_catalog()
+        state = {'done': 0}
+        result = {}
+        cancel = threading.Event()
+
+        def work():
+            try:
+                result['report'] = build_facet_report(paths, catalog=catalog, cancel=cancel,
+                                                      progress=lambda n: state.update(done=n))
+            except Exception as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        prog = wx.ProgressDialog("Consistency Report", f"Reading {len(paths)} photos...",
+                                 maximum=len(paths), parent=self,
+                                 style=wx.PD_ELAPSED_TIME | wx.PD_CAN_ABORT)
+        while worker.is_alive():
+            keep_going, _ = prog.Update(min(state['done'], len(paths) - 1),
+                                        f"Read {state['done']}/{len(paths)} photos...")
             if not keep_going:
-                break
+                cancel.set()
+            wx.YieldIfNeeded()
+            worker.join(0.1)
+        prog.Destroy()
 
+        if 'error' in result:
+            wx.MessageBox(f"Consistency report failed: {result['error']}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        if cancel.is_set():
+            self.SetStatusText("Consistency report cancelled")
+            return
+        dlg = FacetReportDialog(self, result['report'])
+        dlg.ShowModal()
+        dlg.Destroy()
+
+    def on_gps_filter(self, event):
+        """Read GPS positions of the queue, then filter by area and export GeoJSON."""
+        if not self.file_queue:
+            wx.MessageBox("No photos in queue.", "Error", wx.OK | wx.ICON_WARNING)
+            return
+
+        paths = list(self.file_queue)
+        state = {'done': 0}
+        result = {}
+        cancel = threading.Event()
+
+        def work():
+            try:
+                result['table'] = collect_gps(paths, cancel=cancel, progress=lambda n: state.update(done=n))
+            except Exception as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        prog = wx.ProgressDialog("GPS Filter", f"Reading GPS positions of {len(paths)} photos...",
+                                 maximum=len(paths), parent=self,
+                                 style=wx.PD_ELAPSED_TIME | wx.PD_CAN_ABORT)
+        while worker.is_alive():
+            keep_going, _ = prog.Update(min(state['done'], len(paths) - 1),
+                                        f"Read {state['done']}/{len(paths)} photos...")
+            if not keep_going:
+                cancel.set()
+            wx.YieldIfNeeded()
+            worker.join(0.1)
         prog.Destroy()
-        summary = f"Deleted metadata from {deleted}/{total} photos."
-        if failed:
-            summary += f" Failed: {', '.join(failed)}"
+
+        if 'error' in result:
+            wx.MessageBox(f"Reading GPS positions failed: {result['error']}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        if cancel.is_set():
+            self.SetStatusText("GPS filter cancelled")
+            return
+
+        table = result['table']
+        dlg = GeoFilterDialog(self, table)
+        if dlg.ShowModal() == wx.ID_OK and dlg.mask is not None:
+            keep = set(table.select(dlg.mask))
+            removed = 0
+            for i in reversed(range(len(self.file_queue))):
+                if self.file_queue[i] not in keep:
+                    del self.file_queue[i]
+                    self.file_list.Delete(i)
+                    removed += 1
+            self.SetStatusText(f"Removed {removed} photo(s) outside the filter; {len(self.file_queue)} in queue")
+        dlg.Destroy()
+
+    def on_capture_time(self, event):
+        """Index capture times of the queue, then sort it, or keep one event or time range."""
+        if not self.file_queue:
+            wx.MessageBox("No photos in queue.", "Error", wx.OK | wx.ICON_WARNING)
+            return
+
+        paths = list(self.file_queue)
+        catalog = self._get_catalog()
+        state = {'done': 0}
+        result = {}
+        cancel = threading.Event()
+
+        def work():
+            try:
+                result['index'] = build_capture_index(paths, catalog=catalog, cancel=cancel,
+                                                      progress=lambda n: state.update(done=n))
+            except Exception as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        prog = wx.ProgressDialog("Capture Time", f"Reading capture times of {len(paths)} photos...",
+                                 maximum=len(paths), parent=self,
+                                 style=wx.PD_ELAPSED_TIME | wx.PD_CAN_ABORT)
+        while worker.is_alive():
+            keep_going, _ = prog.Update(min(state['done'], len(paths) - 1),
+                                        f"Read {state['done']}/{len(paths)} photos...")
+            if not keep_going:
+                cancel.set()
+            wx.YieldIfNeeded()
+            worker.join(0.1)
+        prog.Destroy()
+
+        if 'error' in result:
+            wx.MessageBox(f"Reading capture times failed: {result['error']}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        if cancel.is_set():
+            self.SetStatusText("Capture time indexing cancelled")
+            return
+
+        dlg = CaptureTimeDialog(self, result['index'])
+        if dlg.ShowModal() == wx.ID_OK and dlg.queue is not None:
+            self.file_queue = list(dlg.queue)
+            self.file_list.Set(self.file_queue)
+            if self.current_file_path in self.file_queue:
+                self.file_list.SetSelection(self.file_queue.index(self.current_file_path))
+            self.SetStatusText(f"{dlg.summary}; {len(self.file_queue)} in queue")
+        dlg.Destroy()
+
+    def on_shift_capture_time(self, event):
+        """Shift the EXIF/XMP dates of every photo in the queue by a fixed offset, in place."""
+        if not self.file_queue:
+            wx.MessageBox("No photos in queue.", "Error", wx.OK | wx.ICON_WARNING)
+            return
+
+        dlg = wx.TextEntryDialog(self, "Shift capture times by ([-][days] HH:MM[:SS], e.g. +1:00 or -2d 00:30):",
+                                 "Shift Capture Time", "+1:00")
+        if dlg.ShowModal() != wx.ID_OK:
+            dlg.Destroy()
+            return
+        text = dlg.GetValue()
+        dlg.Destroy()
+        try:
+            seconds = parse_time_offset(text)
+        except ValueError as e:
+            wx.MessageBox(str(e), "Shift Capture Time", wx.OK | wx.ICON_WARNING)
+            return
+        if seconds == 0:
+            return
+
+        paths = list(self.file_queue)
+        confirm = wx.MessageDialog(self,
+                                   f"Shift the capture time of {len(paths)} photo(s) by {format_time_offset(seconds)}?\n"
+                                   "Dates are changed in place in the files and their XMP sidecars.",
+                                   "Shift Capture Time", wx.YES_NO | wx.ICON_QUESTION)
+        answer = confirm.ShowModal()
+        confirm.Destroy()
+        if answer != wx.ID_YES:
+            return
+
+        state = {'done': 0}
+        result = {}
+        cancel = threading.Event()
+
+        def work():
+            try:
+                result['stats'] = shift_capture_times(paths, seconds, cancel=cancel,
+                                                      progress=lambda n: state.update(done=n))
+            except Exception as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        prog = wx.ProgressDialog("Shift Capture Time", f"Shifting dates of {len(paths)} photos...",
+                                 maximum=len(paths), parent=self,
+                                 style=wx.PD_ELAPSED_TIME | wx.PD_CAN_ABORT)
+        while worker.is_alive():
+            keep_going, _ = prog.Update(min(state['done'], len(paths) - 1),
+                                        f"Shifted {state['done']}/{len(paths)} photos...")
+            if not keep_going:
+                cancel.set()
+            wx.YieldIfNeeded()
+            worker.join(0.1)
+        prog.Destroy()
+
+        if 'error' in result:
+            wx.MessageBox(f"Shifting capture times failed: {result['error']}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        stats = result['stats']
+        summary = f"Shifted dates of {stats['shifted']} photo(s) by {format_time_offset(seconds)}"
+        if stats['skipped']:
+            summary += f", {stats['skipped']} skipped"
+        if stats['problems']:
+            lines = [f"{Path(p).name}: {msg}" for p, msg in stats['problems'][:15]]
+            if len(stats['problems']) > 15:
+                lines.append(f"... and {len(stats['problems']) - 15} more")
+            wx.MessageBox(summary + "\n\n" + "\n".join(lines), "Shift Capture Time", wx.OK | wx.ICON_WARNING)
+        self.SetStatusText(summary)
+        if self.current_file_path:
+            self.show_metadata_preview(self.current_file_path)
+
+    def on_export_queue_metadata(self, event):
+        """Export metadata of every photo in the queue to one JSON Lines or CSV file."""
+        if not self.file_queue:
+            wx.MessageBox("No photos in queue.", "Error", wx.OK | wx.ICON_WARNING)
+            return
+        self._run_bulk_export(list(self.file_queue), len(self.file_queue))
+
+    def on_export_folder_metadata(self, event):
+        """Export metadata of every supported image under a folder (recursively)."""
+        with wx.DirDialog(self, "Choose a folder to export") as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            folder = dlg.GetPath()
+        self._run_bulk_export(iter_image_paths(folder), None)
+
+    def _run_bulk_export(self, paths, total: Optional[int]):
+        """Ask for an output file and stream the export on a worker thread."""
+        with wx.FileDialog(self, "Export metadata", wildcard="JSON Lines (*.jsonl)|*.jsonl|CSV (*.csv)|*.csv",
+                           style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            output_path = dlg.GetPath()
+            if not os.path.splitext(output_path)[1]:
+                output_path += '.csv' if dlg.GetFilterIndex() == 1 else '.jsonl'
+
+        state = {'written': 0}
+        result = {}
+        cancel = threading.Event()
+
+        def work():
+            try:
+                result['stats'] = export_metadata_bulk(
+                    paths, output_path, cancel=cancel,
+                    progress=lambda n: state.__setitem__('written', n))
+            except Exception as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        prog = wx.ProgressDialog("Exporting metadata", "Starting export...", maximum=total or 100,
+                                 parent=self, style=wx.PD_ELAPSED_TIME | wx.PD_CAN_ABORT)
+        while worker.is_alive():
+            label = f"Exported {state['written']} photos..."
+            if total:
+                keep_going = prog.Update(min(state['written'], total - 1), label)[0]
+            else:
+                keep_going = prog.Pulse(label)[0]
+            if not keep_going:
+                cancel.set()
+            wx.YieldIfNeeded()
+            worker.join(0.1)
+        prog.Destroy()
+
+        if 'error' in result:
+            wx.MessageBox(f"Export failed: {result['error']}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        stats = result.get('stats', {})
+        summary = f"Exported metadata for {stats.get('written', 0)} photos to {Path(output_path).name}"
+        if stats.get('errors'):
+            summary += f" ({stats['errors']} unreadable)"
+        self.SetStatusText(summary)
+
+    def on_import_manifest(self, event):
+        """Apply per-file metadata from a CSV or JSON Lines manifest on a worker thread."""
+        with wx.FileDialog(self, "Import metadata manifest",
+                           wildcard="Manifests (*.csv;*.jsonl)|*.csv;*.jsonl|All files (*.*)|*.*",
+                           style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            manifest_path = dlg.GetPath()
+        sidecar = self.cb_sidecar.GetValue()
+        if sidecar:
+            question = (f"Write the metadata listed in {Path(manifest_path).name} into XMP sidecars "
+                        "next to the photos it names?")
+        else:
+            question = (f"Write the metadata listed in {Path(manifest_path).name} into the photos it names?\n"
+                        "Existing non-camera metadata in those photos is replaced.")
+        if wx.MessageBox(question, "Import Manifest", wx.YES_NO | wx.ICON_QUESTION) != wx.YES:
+            return
+        results_path = os.path.splitext(manifest_path)[0] + '.results.csv'
+
+        state = {'done': 0}
+        result = {}
+        cancel = threading.Event()
+
+        def work():
+            try:
+                result['stats'] = import_metadata_bulk(
+                    manifest_path, results_path=results_path, sidecar=sidecar, cancel=cancel,
+                    progress=lambda n: state.__setitem__('done', n))
+            except Exception as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+        prog = wx.ProgressDialog("Importing metadata", "Starting import...", maximum=100,
+                                 parent=self, style=wx.PD_ELAPSED_TIME | wx.PD_CAN_ABORT)
+        while worker.is_alive():
+            if not prog.Pulse(f"Processed {state['done']} rows...")[0]:
+                cancel.set()
+            wx.YieldIfNeeded()
+            worker.join(0.1)
+        prog.Destroy()
+
+        if 'error' in result:
+            wx.MessageBox(f"Import failed: {result['error']}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        stats = result.get('stats', {})
+        summary = f"Imported metadata into {stats.get('applied', 0)} photos"
+        if stats.get('failed'):
+            summary += f"; {stats['failed']} rows failed (see {Path(results_path).name})"
+            wx.MessageBox(summary, "Import Manifest", wx.OK | wx.ICON_WARNING)
         self.SetStatusText(summary)
 
     def on_batch_rename(self, event):
@@ -964,17 +1502,59 @@ class MainFrame(wx.Frame):
 
     def on_exit(self, event):
         """Exit the application."""
+        self.prefetcher.close()
         self.Close(True)
 
 
+PREVIEW_DEBOUNCE_MS = 250
+
+
+class RenamePreviewList(wx.ListCtrl):
+    """Virtual list of current -> new names for a RenamePlan; problem rows are highlighted."""
+
+    def __init__(self, parent):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_HRULES, size=(-1, 200))
+        self.InsertColumn(0, "Current name", width=200)
+        self.InsertColumn(1, "New name", width=200)
+        self.InsertColumn(2, "Problem", width=200)
+        self.plan = None
+        self._problem_attr = wx.ItemAttr()
+        self._problem_attr.SetBackgroundColour(wx.Colour(255, 220, 220))
+        self.SetItemCount(0)
+
+    def set_plan(self, plan):
+        self.plan = plan
+        self.SetItemCount(len(plan.sources) if plan else 0)
+        self.Refresh()
+
+    def OnGetItemText(self, item, column):
+        if self.plan is None:
+            return ""
+        if column == 0:
+            return os.path.basename(self.plan.sources[item])
+        if column == 1:
+            return os.path.basename(self.plan.targets[item])
+        return self.plan.problems.get(item, "")
+
+    def OnGetItemAttr(self, item):
+        if self.plan is not None and item in self.plan.problems:
+            return self._problem_attr
+        return None
+
+
 class BatchRenameDialog(wx.Dialog):
-    """Dialog to batch rename files using a pattern with {index}."""
+    """Dialog to batch rename files using a pattern with {index} and metadata tokens."""
 
     def __init__(self, parent, file_list: List[str]):
-        super().__init__(parent, title="Batch Rename", size=(650, 480))
+        super().__init__(parent, title="Batch Rename", size=(700, 620))
         self.file_list = file_list
         self.parent_frame = parent
         self.mode_controls = {}  # Track controls by mode
+        # Prefetched metadata for rename tokens: path -> {field: value}
+        self.field_values: Dict[str, Dict[str, Any]] = {}
+        self._fetched_fields = set()
+        self._fields_lock = threading.Lock()
+        self._prefetch_thread = None
         self.init_ui()
 
     def init_ui(self):
@@ -993,39 +1573,41 @@ class BatchRenameDialog(wx.Dialog):
         grid = wx.FlexGridSizer(7, 2, 8, 8)
         grid.AddGrowableCol(1, 1)
         
-        grid.Add(wx.StaticText(self, label="Pattern (use {index}):"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(wx.StaticText(self, label="Pattern ({index}, {Model}, {DateTimeOriginal:%Y%m%d_%H%M%S}):"), 0, wx.ALIGN_CENTER_VERTICAL)
         self.tc_pattern = wx.TextCtrl(self, value="photo_{index}")
-        self.tc_pattern.Bind(wx.EVT_TEXT, lambda e: self.update_preview())
+        self.tc_pattern.SetToolTip("Tokens: {index}, any EXIF tag name ({Model}, {LensModel}, {DateTimeOriginal:%Y%m%d}) "
+                                   "or XMP field ({Headline}, {creator})")
+        self.tc_pattern.Bind(wx.EVT_TEXT, lambda e: self.schedule_preview())
         grid.Add(self.tc_pattern, 1, wx.EXPAND)
         
         grid.Add(wx.StaticText(self, label="Prefix:"), 0, wx.ALIGN_CENTER_VERTICAL)
         self.tc_prefix = wx.TextCtrl(self, value="")
-        self.tc_prefix.Bind(wx.EVT_TEXT, lambda e: self.update_preview())
+        self.tc_prefix.Bind(wx.EVT_TEXT, lambda e: self.schedule_preview())
         grid.Add(self.tc_prefix, 1, wx.EXPAND)
         
         grid.Add(wx.StaticText(self, label="Suffix:"), 0, wx.ALIGN_CENTER_VERTICAL)
         self.tc_suffix = wx.TextCtrl(self, value="")
-        self.tc_suffix.Bind(wx.EVT_TEXT, lambda e: self.update_preview())
+        self.tc_suffix.Bind(wx.EVT_TEXT, lambda e: self.schedule_preview())
         grid.Add(self.tc_suffix, 1, wx.EXPAND)
         
         grid.Add(wx.StaticText(self, label="Find (search):"), 0, wx.ALIGN_CENTER_VERTICAL)
         self.tc_find = wx.TextCtrl(self, value="")
-        self.tc_find.Bind(wx.EVT_TEXT, lambda e: self.update_preview())
+        self.tc_find.Bind(wx.EVT_TEXT, lambda e: self.schedule_preview())
         grid.Add(self.tc_find, 1, wx.EXPAND)
         
         grid.Add(wx.StaticText(self, label="Replace with:"), 0, wx.ALIGN_CENTER_VERTICAL)
         self.tc_replace = wx.TextCtrl(self, value="")
-        self.tc_replace.Bind(wx.EVT_TEXT, lambda e: self.update_preview())
+        self.tc_replace.Bind(wx.EVT_TEXT, lambda e: self.schedule_preview())
         grid.Add(self.tc_replace, 1, wx.EXPAND)
         
         grid.Add(wx.StaticText(self, label="Start index:"), 0, wx.ALIGN_CENTER_VERTICAL)
         self.spin_start = wx.SpinCtrl(self, value="1", min=0, max=1000000)
-        self.spin_start.Bind(wx.EVT_SPINCTRL, lambda e: self.update_preview())
+        self.spin_start.Bind(wx.EVT_SPINCTRL, lambda e: self.schedule_preview())
         grid.Add(self.spin_start, 0, wx.EXPAND)
         
         grid.Add(wx.StaticText(self, label="Zero-pad width:"), 0, wx.ALIGN_CENTER_VERTICAL)
         self.spin_pad = wx.SpinCtrl(self, value="0", min=0, max=10)
-        self.spin_pad.Bind(wx.EVT_SPINCTRL, lambda e: self.update_preview())
+        self.spin_pad.Bind(wx.EVT_SPINCTRL, lambda e: self.schedule_preview())
         grid.Add(self.spin_pad, 0, wx.EXPAND)
 
         sizer.Add(grid, 0, wx.ALL | wx.EXPAND, 8)
@@ -1035,20 +1617,20 @@ class BatchRenameDialog(wx.Dialog):
         case_h.Add(wx.StaticText(self, label="Case:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 6)
         self.choice_case = wx.Choice(self, choices=["as-is", "lower", "upper", "title"])
         self.choice_case.SetSelection(0)
-        self.choice_case.Bind(wx.EVT_CHOICE, lambda e: self.update_preview())
+        self.choice_case.Bind(wx.EVT_CHOICE, lambda e: self.schedule_preview())
         case_h.Add(self.choice_case, 0, wx.ALL, 6)
         sizer.Add(case_h, 0, wx.LEFT)
 
-        # Preview of first 3 renamed files
-        sizer.Add(wx.StaticText(self, label="Preview (first 3):"), 0, wx.LEFT | wx.TOP, 6)
-        self.tc_preview = wx.TextCtrl(self, style=wx.TE_MULTILINE | wx.TE_READONLY, size=(-1, 150))
-        sizer.Add(self.tc_preview, 1, wx.EXPAND | wx.ALL, 8)
+        # Preview of every old -> new name (virtual list; rows with problems are highlighted)
+        self.preview_status = wx.StaticText(self, label="Preview:")
+        sizer.Add(self.preview_status, 0, wx.LEFT | wx.TOP, 6)
+        self.preview_list = RenamePreviewList(self)
+        sizer.Add(self.preview_list, 1, wx.EXPAND | wx.ALL, 8)
 
-        # Bind events to update preview when options change
-        self.tc_pattern.Bind(wx.EVT_TEXT, lambda e: self.update_preview())
-        self.spin_start.Bind(wx.EVT_SPINCTRL, lambda e: self.update_preview())
-        self.spin_pad.Bind(wx.EVT_SPINCTRL, lambda e: self.update_preview())
-        self.choice_case.Bind(wx.EVT_CHOICE, lambda e: self.update_preview())
+        # Option changes recompute the preview on a worker once typing pauses
+        self.preview_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda e: self.update_preview(), self.preview_timer)
+        self._preview_generation = 0
 
         # Buttons: Rename All or Cancel
         btn_h = wx.BoxSizer(wx.HORIZONTAL)
@@ -1088,162 +1670,187 @@ class BatchRenameDialog(wx.Dialog):
     def get_values(self):
         return (self.tc_pattern.GetValue(), int(self.spin_start.GetValue()), int(self.spin_pad.GetValue()), self.choice_case.GetString(self.choice_case.GetSelection()))
 
-    def update_preview(self):
-        """Update the preview box showing the first three target names."""
-        mode = self.choice_mode.GetString(self.choice_mode.GetSelection())
-        case = self.choice_case.GetString(self.choice_case.GetSelection())
-        
-        # Build preview mapping for the files in the provided list (show up to 500 entries)
-        lines = []
-        limit = min(len(self.file_list), 3)  # Show only first 3 for preview
-        
-        for i in range(limit):
-            orig = Path(self.file_list[i])
-            new_base = orig.stem  # filename without extension
-            
-            if mode == "Pattern (with {index})":
-                pattern = self.tc_pattern.GetValue()
-                try:
-                    start = int(self.spin_start.GetValue())
-                except Exception:
-                    start = 1
-                try:
-                    pad = int(self.spin_pad.GetValue())
-                except Exception:
-                    pad = 0
-                idx = start + i
-                index_str = str(idx).zfill(pad)
-                new_base = pattern.replace('{index}', index_str)
-            
-            elif mode == "Prefix":
-                prefix = self.tc_prefix.GetValue()
-                new_base = prefix + new_base
-            
-            elif mode == "Suffix":
-                suffix = self.tc_suffix.GetValue()
-                new_base = new_base + suffix
-            
-            elif mode == "Find & Replace":
-                find_str = self.tc_find.GetValue()
-                replace_str = self.tc_replace.GetValue()
-                new_base = new_base.replace(find_str, replace_str)
-            
-            elif mode == "Increment":
-                # Just add number to filename
-                try:
-                    start = int(self.spin_start.GetValue())
-                except Exception:
-                    start = 1
-                try:
-                    pad = int(self.spin_pad.GetValue())
-                except Exception:
-                    pad = 0
-                idx = start + i
-                index_str = str(idx).zfill(pad)
-                new_base = new_base + "_" + index_str
-            
-            # Apply case transformation
-            if case == 'lower':
-                new_base = new_base.lower()
-            elif case == 'upper':
-                new_base = new_base.upper()
-            elif case == 'title':
-                new_base = new_base.title()
-            
-            new_name = f"{new_base}{orig.suffix}"
-            lines.append(f"{orig.name} -> {new_name}")
-        
-        if len(self.file_list) > limit:
-            lines.append(f"... and {len(self.file_list)-limit} more ...")
-        
-        self.tc_preview.SetValue('\n'.join(lines))
-
-    def on_rename_all(self, event):
-        """Execute batch rename now and close dialog."""
-        mode = self.choice_mode.GetString(self.choice_mode.GetSelection())
-        case = self.choice_case.GetString(self.choice_case.GetSelection())
-        
+    def get_options(self) -> RenameOptions:
+        """Collect the dialog fields into RenameOptions."""
         try:
             start = int(self.spin_start.GetValue())
         except Exception:
             start = 1
         try:
-            padding = int(self.spin_pad.GetValue())
+            pad = int(self.spin_pad.GetValue())
         except Exception:
-            padding = 0
+            pad = 0
+        return RenameOptions(
+            mode=RENAME_MODES[self.choice_mode.GetSelection()],
+            pattern=self.tc_pattern.GetValue(),
+            prefix=self.tc_prefix.GetValue(),
+            suffix=self.tc_suffix.GetValue(),
+            find=self.tc_find.GetValue(),
+            replace=self.tc_replace.GetValue(),
+            start=start,
+            pad=pad,
+            case=RENAME_CASES[self.choice_case.GetSelection()],
+        )
 
+    def _missing_fields(self, options: RenameOptions) -> List[str]:
+        with self._fields_lock:
+            return [f for f in required_fields(options) if f not in self._fetched_fields]
+
+    def _store_fields(self, fields: List[str], values: Dict[str, Dict[str, Any]]):
+        with self._fields_lock:
+            for path, vals in values.items():
+                self.field_values.setdefault(path, {}).update(vals)
+            self._fetched_fields.update(fields)
+
+    def _start_prefetch(self, fields: List[str]):
+        """Read the fields for the whole queue on a worker thread, then refresh the preview."""
+        if self._prefetch_thread is not None and self._prefetch_thread.is_alive():
+            return
+        handler = self.parent_frame.metadata_handler
+        paths = list(self.file_list)
+
+        def work():
+            self._store_fields(fields, prefetch_fields(handler, paths, fields))
+            wx.CallAfter(self._on_prefetch_done)
+
+        self._prefetch_thread = threading.Thread(target=work, daemon=True)
+        self._prefetch_thread.start()
+
+    def _on_prefetch_done(self):
+        if self:  # dialog may have been closed meanwhile
+            self.update_preview()
+
+    def schedule_preview(self):
+        """Restart the debounce timer; the preview is recomputed when typing pauses."""
+        self.preview_timer.StartOnce(PREVIEW_DEBOUNCE_MS)
+
+    def update_preview(self):
+        """Recompute the full rename plan on a worker thread and show it in the preview list."""
+        options = self.get_options()
+        missing = self._missing_fields(options)
+        if missing:
+            self._start_prefetch(missing)
+            self.preview_status.SetLabel(f"Reading {', '.join(missing)} for {len(self.file_list)} files...")
+            return
+
+        self._preview_generation += 1
+        generation = self._preview_generation
+        with self._fields_lock:
+            planner = RenamePlanner(list(self.file_list), options, dict(self.field_values))
+
+        def work():
+            try:
+                plan = planner.plan()
+            except Exception as e:
+                plan = e
+            wx.CallAfter(self._on_preview_ready, generation, plan)
+
+        threading.Thread(target=work, daemon=True).start()
+        self.preview_status.SetLabel("Preview: computing...")
+
+    def _on_preview_ready(self, generation: int, plan):
+        """Show a finished plan unless a newer one has been requested since."""
+        if not self or generation != self._preview_generation:
+            return
+        if isinstance(plan, Exception):
+            self.preview_status.SetLabel(f"Preview failed: {plan}")
+            self.preview_list.set_plan(None)
+            return
+        self.preview_list.set_plan(plan)
+        changed = len(plan.moves)
+        status = f"Preview: {len(plan.sources)} files, {changed} renamed"
+        if plan.problems:
+            status += f", {len(plan.problems)} with problems (highlighted)"
+        self.preview_status.SetLabel(status)
+
+    def on_rename_all(self, event):
+        """Execute batch rename now and close dialog."""
+        options = self.get_options()
         total = len(self.file_list)
+
+        # Make sure every metadata token has been read for the whole queue
+        if self._prefetch_thread is not None and self._prefetch_thread.is_alive():
+            busy = wx.ProgressDialog("Reading metadata", f"Reading name tokens for {total} files...",
+                                     maximum=100, parent=self, style=wx.PD_ELAPSED_TIME)
+            while self._prefetch_thread.is_alive():
+                busy.Pulse()
+                wx.YieldIfNeeded()
+                self._prefetch_thread.join(0.05)
+            busy.Destroy()
+        missing = self._missing_fields(options)
+        if missing:
+            # Read on a worker thread; the dialog only polls its progress
+            state = {'done': 0}
+            handler = self.parent_frame.metadata_handler
+            paths = list(self.file_list)
+
+            def work():
+                values = prefetch_fields(handler, paths, missing,
+                                         progress=lambda done, _total: state.update(done=done))
+                self._store_fields(missing, values)
+
+            worker = threading.Thread(target=work, daemon=True)
+            worker.start()
+            prog = wx.ProgressDialog("Reading metadata",
+                                     f"Reading {', '.join(missing)} for {total} files...",
+                                     maximum=max(total, 1), parent=self,
+                                     style=wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME)
+            while worker.is_alive():
+                prog.Update(min(state['done'], max(total - 1, 0)))
+                wx.YieldIfNeeded()
+                worker.join(0.05)
+            prog.Destroy()
+        with self._fields_lock:
+            planner = RenamePlanner(self.file_list, options, dict(self.field_values))
+
+        # Compute and validate every target on a worker thread before touching any file
+        result = {}
+        worker = threading.Thread(target=lambda: result.setdefault('plan', planner.plan()), daemon=True)
+        worker.start()
+        busy = wx.ProgressDialog("Checking rename plan", f"Checking {total} target names...",
+                                 maximum=100, parent=self, style=wx.PD_ELAPSED_TIME)
+        while worker.is_alive():
+            busy.Pulse()
+            wx.YieldIfNeeded()
+            worker.join(0.05)
+        busy.Destroy()
+        plan = result.get('plan')
+        if plan is None:
+            wx.MessageBox("Could not compute the rename plan.", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        if not plan.ok:
+            lines = [f"{Path(self.file_list[i]).name} -> {Path(plan.targets[i]).name}: {reason}"
+                     for i, reason in sorted(plan.problems.items())[:15]]
+            if len(plan.problems) > 15:
+                lines.append(f"... and {len(plan.problems) - 15} more")
+            wx.MessageBox(f"{len(plan.problems)} file(s) cannot be renamed; nothing was changed.\n\n" + '\n'.join(lines),
+                          "Rename Conflicts", wx.OK | wx.ICON_WARNING)
+            return
+
+        moves = len(plan.moves)
         prog = wx.ProgressDialog("Renaming files",
-                                 f"Renaming {total} files...",
-                                 maximum=total,
+                                 f"Renaming {moves} files...",
+                                 maximum=max(moves, 1),
                                  parent=self,
                                  style=wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME)
+        try:
+            renamed = planner.execute(plan, progress=lambda done, _total: prog.Update(done))
+        except OSError as e:
+            prog.Destroy()
+            wx.MessageBox(f"Rename failed and was rolled back:\n{e}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        prog.Destroy()
 
-        renamed = 0
-        failed = []
-
-        # iterate by index so we can update the queue/list in-place
-        for i in range(len(self.file_list)):
-            old_path = Path(self.file_list[i])
-            new_base = old_path.stem  # filename without extension
-            
-            # Apply rename mode
-            if mode == "Pattern (with {index})":
-                pattern = self.tc_pattern.GetValue()
-                idx = start + i
-                index_str = str(idx).zfill(padding)
-                new_base = pattern.replace('{index}', index_str)
-            
-            elif mode == "Prefix":
-                prefix = self.tc_prefix.GetValue()
-                new_base = prefix + new_base
-            
-            elif mode == "Suffix":
-                suffix = self.tc_suffix.GetValue()
-                new_base = new_base + suffix
-            
-            elif mode == "Find & Replace":
-                find_str = self.tc_find.GetValue()
-                replace_str = self.tc_replace.GetValue()
-                new_base = new_base.replace(find_str, replace_str)
-            
-            elif mode == "Increment":
-                idx = start + i
-                index_str = str(idx).zfill(padding)
-                new_base = new_base + "_" + index_str
-            
-            # Apply case transformation
-            if case == 'lower':
-                new_base = new_base.lower()
-            elif case == 'upper':
-                new_base = new_base.upper()
-            elif case == 'title':
-                new_base = new_base.title()
-
-            new_path = old_path.with_name(f"{new_base}{old_path.suffix}")
+        # Update the internal queue and the listbox in the parent frame
+        for i, new_path in renamed.items():
+            self.file_list[i] = new_path
             try:
-                old_path.rename(new_path)
-                # update internal queue and listbox in parent frame
-                self.file_list[i] = str(new_path)
-                try:
-                    self.parent_frame.file_list.SetString(i, str(new_path))
-                    self.parent_frame.file_queue[i] = str(new_path)
-                except Exception:
-                    pass
-                renamed += 1
+                self.parent_frame.file_list.SetString(i, new_path)
+                self.parent_frame.file_queue[i] = new_path
             except Exception:
-                failed.append(old_path.name)
-
-            keep_going = prog.Update(i + 1)[0]
-            if not keep_going:
-                break
+                pass
+        self.parent_frame.SetStatusText(f"Renamed {len(renamed)}/{total} photos.")
 
-        prog.Destroy()
-        summary = f"Renamed {renamed}/{total} photos."
-        if failed:
-            summary += f" Failed: {', '.join(failed)}"
-        self.parent_frame.SetStatusText(summary)
-        
         # Close the dialog
         self.EndModal(wx.ID_OK)
 
@@ -1331,64 +1938,372 @@ class TemplateManagerDialog(wx.Dialog):
         self.EndModal(wx.ID_OK)
 
 
+class DuplicatesDialog(wx.Dialog):
+    """Shows groups of photos with identical image data."""
+
+    def __init__(self, parent: wx.Frame, groups: List[List[str]]):
+        super().__init__(parent, title="Duplicate Photos", size=(700, 450))
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        extra = sum(len(g) - 1 for g in groups)
+        sizer.Add(wx.StaticText(self, label=f"{len(groups)} group(s) of identical photos; {extra} extra copies. "
+                                            "The first photo of each group is kept."),
+                  0, wx.ALL, 8)
+
+        tree = wx.TreeCtrl(self, style=wx.TR_DEFAULT_STYLE | wx.TR_HIDE_ROOT)
+        root = tree.AddRoot("Duplicates")
+        for n, group in enumerate(groups, start=1):
+            node = tree.AppendItem(root, f"Group {n}: {len(group)} copies of {Path(group[0]).name}")
+            for path in group:
+                tree.AppendItem(node, path)
+            tree.Expand(node)
+        sizer.Add(tree, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 8)
+
+        btn_h = wx.BoxSizer(wx.HORIZONTAL)
+        btn_h.AddStretchSpacer()
+        btn_h.Add(wx.Button(self, wx.ID_OK, "Remove Extra Copies from Queue"), 0, wx.ALL, 5)
+        btn_h.Add(wx.Button(self, wx.ID_CANCEL, "Close"), 0, wx.ALL, 5)
+        sizer.Add(btn_h, 0, wx.EXPAND | wx.ALL, 8)
+        self.SetSizer(sizer)
+
+
+class FacetReportDialog(wx.Dialog):
+    """Summary of field values across the queue, with missing fields and XMP/EXIF conflicts."""
+
+    def __init__(self, parent: wx.Frame, report):
+        super().__init__(parent, title="Queue Consistency Report", size=(820, 560),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.report = report
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(wx.StaticText(self, label=report.summary_lines()[0]), 0, wx.ALL, 8)
+
+        fields = wx.ListCtrl(self, style=wx.LC_REPORT | wx.LC_SINGLE_SEL | wx.LC_HRULES)
+        for col, (title, width) in enumerate([("Field", 110), ("Files", 60), ("Distinct", 70),
+                                              ("Missing", 70), ("Most common values", 480)]):
+            fields.InsertColumn(col, title, width=width)
+        warn = wx.Colour(255, 235, 200)
+        for row, name in enumerate(report.fields):
+            facet = report.facets[name]
+            fields.InsertItem(row, name)
+            fields.SetItem(row, 1, str(facet.present))
+            fields.SetItem(row, 2, str(facet.distinct))
+            fields.SetItem(row, 3, str(len(facet.missing)))
+            fields.SetItem(row, 4, ', '.join(f"{v} ({n})" for v, n in facet.counts.most_common(5)))
+            if not facet.consistent:
+                fields.SetItemBackgroundColour(row, warn)
+        sizer.Add(fields, 2, wx.EXPAND | wx.LEFT | wx.RIGHT, 8)
+
+        # Files that lack a field or whose XMP and EXIF values disagree
+        details: List[str] = []
+        for label, rows in report.conflicts.items():
+            for path, xmp_terms, exif_terms in rows:
+                details.append(f"{label} differ: {Path(path).name}: {'; '.join(xmp_terms)} | {'; '.join(exif_terms)}")
+        for name in report.fields:
+            missing = report.facets[name].missing
+            if missing and len(missing) < report.total:
+                details.extend(f"{name} missing: {Path(p).name}" for p in missing[:200])
+        for path, error in report.errors:
+            details.append(f"unreadable: {Path(path).name}: {error}")
+        tc_details = wx.TextCtrl(self, value='\n'.join(details) or "No conflicts or partially missing fields.",
+                                 style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_DONTWRAP)
+        sizer.Add(tc_details, 1, wx.EXPAND | wx.ALL, 8)
+
+        btn_h = wx.BoxSizer(wx.HORIZONTAL)
+        btn_h.AddStretchSpacer()
+        btn_export = wx.Button(self, label="Export...")
+        btn_h.Add(btn_export, 0, wx.ALL, 5)
+        btn_h.Add(wx.Button(self, wx.ID_CANCEL, "Close"), 0, wx.ALL, 5)
+        sizer.Add(btn_h, 0, wx.EXPAND | wx.ALL, 8)
+        self.SetSizer(sizer)
+
+        btn_export.Bind(wx.EVT_BUTTON, self.on_export)
+
+    def on_export(self, event):
+        with wx.FileDialog(self, "Export report", wildcard="JSON (*.json)|*.json|CSV (*.csv)|*.csv",
+                           style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            output_path = dlg.GetPath()
+            if not os.path.splitext(output_path)[1]:
+                output_path += '.csv' if dlg.GetFilterIndex() == 1 else '.json'
+        try:
+            write_facet_report(self.report, output_path)
+        except Exception as e:
+            wx.MessageBox(f"Export failed: {e}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        wx.MessageBox(f"Report written to {output_path}", "Export", wx.OK | wx.ICON_INFORMATION)
+
+
+class GeoFilterDialog(wx.Dialog):
+    """Filter queue photos by bounding box, radius or missing GPS, and export positions as GeoJSON."""
+
+    def __init__(self, parent: wx.Frame, table):
+        super().__init__(parent, title="GPS Filter", size=(520, 420))
+        self.table = table
+        self.mask = None
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        fixes = int(table.has_fix.sum())
+        sizer.Add(wx.StaticText(self, label=f"{fixes} of {len(table)} photo(s) have a GPS position."), 0, wx.ALL, 8)
+
+        self.rb_mode = wx.RadioBox(self, label="Keep photos", choices=["Inside bounding box", "Within radius",
+                                                                        "Without GPS position"],
+                                   majorDimension=1, style=wx.RA_SPECIFY_COLS)
+        sizer.Add(self.rb_mode, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 8)
+
+        grid = wx.FlexGridSizer(cols=4, hgap=6, vgap=6)
+        self.fields = {}
+        for key, label in [('min_lat', "Min latitude"), ('min_lon', "Min longitude"),
+                           ('max_lat', "Max latitude"), ('max_lon', "Max longitude"),
+                           ('lat', "Centre latitude"), ('lon', "Centre longitude"), ('km', "Radius (km)")]:
+            grid.Add(wx.StaticText(self, label=label), 0, wx.ALIGN_CENTER_VERTICAL)
+            self.fields[key] = wx.TextCtrl(self, size=(100, -1))
+            grid.Add(self.fields[key], 0)
+        sizer.Add(grid, 0, wx.ALL, 8)
+
+        self.lbl_result = wx.StaticText(self, label="")
+        sizer.Add(self.lbl_result, 0, wx.ALL, 8)
+
+        btn_h = wx.BoxSizer(wx.HORIZONTAL)
+        btn_apply = wx.Button(self, label="Apply Filter")
+        btn_export = wx.Button(self, label="Export GeoJSON...")
+        self.btn_keep = wx.Button(self, wx.ID_OK, "Keep Matches in Queue")
+        self.btn_keep.Disable()
+        btn_h.Add(btn_apply, 0, wx.ALL, 5)
+        btn_h.Add(btn_export, 0, wx.ALL, 5)
+        btn_h.AddStretchSpacer()
+        btn_h.Add(self.btn_keep, 0, wx.ALL, 5)
+        btn_h.Add(wx.Button(self, wx.ID_CANCEL, "Close"), 0, wx.ALL, 5)
+        sizer.Add(btn_h, 0, wx.EXPAND | wx.ALL, 8)
+        self.SetSizer(sizer)
+
+        btn_apply.Bind(wx.EVT_BUTTON, self.on_apply)
+        btn_export.Bind(wx.EVT_BUTTON, self.on_export)
+
+    def _number(self, key: str) -> float:
+        text = self.fields[key].GetValue().strip()
+        try:
+            return float(text)
+        except ValueError:
+            raise ValueError(f"{key.replace('_', ' ')}: '{text}' is not a number")
+
+    def on_apply(self, event):
+        mode = self.rb_mode.GetSelection()
+        try:
+            if mode == 0:
+                self.mask = self.table.within_bbox(self._number('min_lat'), self._number('min_lon'),
+                                                   self._number('max_lat'), self._number('max_lon'))
+            elif mode == 1:
+                self.mask = self.table.within_radius(self._number('lat'), self._number('lon'), self._number('km'))
+            else:
+                self.mask = ~self.table.has_fix
+        except ValueError as e:
+            wx.MessageBox(str(e), "GPS Filter", wx.OK | wx.ICON_WARNING)
+            return
+        self.lbl_result.SetLabel(f"{int(self.mask.sum())} photo(s) match.")
+        self.btn_keep.Enable()
+
+    def on_export(self, event):
+        with wx.FileDialog(self, "Export GeoJSON", wildcard="GeoJSON (*.geojson)|*.geojson",
+                           style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            output_path = dlg.GetPath()
+        if not os.path.splitext(output_path)[1]:
+            output_path += '.geojson'
+        try:
+            # Current filter result, or every photo with a position
+            self.table.write_geojson(output_path, self.mask)
+        except Exception as e:
+            wx.MessageBox(f"Export failed: {e}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        wx.MessageBox(f"Positions written to {output_path}", "Export", wx.OK | wx.ICON_INFORMATION)
+
+
+class CaptureTimeDialog(wx.Dialog):
+    """Sort the queue by capture time, or keep only one shooting event or time range."""
+
+    def __init__(self, parent: wx.Frame, index):
+        super().__init__(parent, title="Capture Time", size=(560, 520),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.index = index
+        self.queue = None  # new queue order, set when the dialog ends with OK
+        self.summary = ""
+        self.events = []
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        span = index.span
+        label = f"{index.dated_count} of {len(index)} photo(s) have a capture time."
+        if span:
+            label += f" From {format_capture_time(span[0])} to {format_capture_time(span[1])}."
+        sizer.Add(wx.StaticText(self, label=label), 0, wx.ALL, 8)
+
+        # Event grouping
+        gap_row = wx.BoxSizer(wx.HORIZONTAL)
+        gap_row.Add(wx.StaticText(self, label="New event after a gap of (hours)"), 0, wx.ALIGN_CENTER_VERTICAL)
+        self.spin_gap = wx.SpinCtrlDouble(self, min=0.05, max=720, inc=0.5, initial=EVENT_GAP_SECONDS / 3600)
+        gap_row.Add(self.spin_gap, 0, wx.LEFT, 6)
+        sizer.Add(gap_row, 0, wx.LEFT | wx.RIGHT, 8)
+        self.lb_events = wx.ListBox(self, style=wx.LB_EXTENDED)
+        sizer.Add(self.lb_events, 1, wx.EXPAND | wx.ALL, 8)
+
+        # Time range
+        grid = wx.FlexGridSizer(cols=4, hgap=6, vgap=6)
+        self.tc_from = wx.TextCtrl(self, size=(160, -1))
+        self.tc_to = wx.TextCtrl(self, size=(160, -1))
+        grid.Add(wx.StaticText(self, label="From"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.tc_from, 0)
+        grid.Add(wx.StaticText(self, label="To"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.tc_to, 0)
+        sizer.Add(grid, 0, wx.LEFT | wx.RIGHT, 8)
+        sizer.Add(wx.StaticText(self, label="YYYY-MM-DD HH:MM:SS; leave a bound empty for no limit."),
+                  0, wx.ALL, 8)
+
+        btn_h = wx.BoxSizer(wx.HORIZONTAL)
+        btn_sort = wx.Button(self, label="Sort Queue")
+        btn_events = wx.Button(self, label="Keep Selected Events")
+        btn_range = wx.Button(self, label="Keep Range")
+        btn_h.Add(btn_sort, 0, wx.ALL, 5)
+        btn_h.Add(btn_events, 0, wx.ALL, 5)
+        btn_h.Add(btn_range, 0, wx.ALL, 5)
+        btn_h.AddStretchSpacer()
+        btn_h.Add(wx.Button(self, wx.ID_CANCEL, "Close"), 0, wx.ALL, 5)
+        sizer.Add(btn_h, 0, wx.EXPAND | wx.ALL, 8)
+        self.SetSizer(sizer)
+
+        self.spin_gap.Bind(wx.EVT_SPINCTRLDOUBLE, lambda e: self.regroup())
+        btn_sort.Bind(wx.EVT_BUTTON, self.on_sort)
+        btn_events.Bind(wx.EVT_BUTTON, self.on_keep_events)
+        btn_range.Bind(wx.EVT_BUTTON, self.on_keep_range)
+        self.regroup()
+
+    def regroup(self):
+        self.events = self.index.group_events(self.spin_gap.GetValue() * 3600)
+        labels = [event.label for event in self.events]
+        if self.index.undated:
+            labels.append(f"No capture time ({len(self.index.undated)} photos)")
+        self.lb_events.Set(labels)
+
+    def _finish(self, indices, summary: str):
+        self.queue = self.index.select_paths(indices)
+        self.summary = summary
+        self.EndModal(wx.ID_OK)
+
+    def on_sort(self, event):
+        self._finish(self.index.sorted_indices(), "Sorted by capture time")
+
+    def on_keep_events(self, event):
+        selected = self.lb_events.GetSelections()
+        if not selected:
+            wx.MessageBox("Select one or more events first.", "Capture Time", wx.OK | wx.ICON_WARNING)
+            return
+        indices = []
+        for n in sorted(selected):
+            indices.extend(self.events[n].indices if n < len(self.events) else self.index.undated)
+        self._finish(indices, f"Kept {len(selected)} event(s)")
+
+    def on_keep_range(self, event):
+        bounds = []
+        for ctrl in (self.tc_from, self.tc_to):
+            text = ctrl.GetValue().strip()
+            seconds = parse_capture_time(text) if text else None
+            if text and seconds is None:
+                wx.MessageBox(f"'{text}' is not a date (YYYY-MM-DD HH:MM:SS).", "Capture Time",
+                              wx.OK | wx.ICON_WARNING)
+                return
+            if ctrl is self.tc_to and seconds is not None and len(text) <= 10:
+                seconds += 86400 - 1e-3  # a date alone includes the whole day
+            bounds.append(seconds)
+        self._finish(self.index.select_range(*bounds), "Kept time range")
+
+
+class MetadataTreeList(wx.ListCtrl):
+    """Virtual, grouped list of metadata fields; rows are formatted only when they are drawn."""
+
+    def __init__(self, parent, model: MetadataRowModel):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL | wx.LC_HRULES)
+        self.InsertColumn(0, "Field", width=220)
+        self.InsertColumn(1, "Value", width=380)
+        self.model = model
+        self._group_attr = wx.ItemAttr()
+        self._group_attr.SetBackgroundColour(wx.Colour(235, 235, 235))
+        self._group_attr.SetFont(self.GetFont().Bold())
+        self.SetItemCount(len(model))
+
+    def refresh_rows(self):
+        self.SetItemCount(len(self.model))
+        self.Refresh()
+
+    def OnGetItemText(self, item, column):
+        return self.model.cell_text(item, column)
+
+    def OnGetItemAttr(self, item):
+        return self._group_attr if self.model.is_group(item) else None
+
+
 class MetadataDetailsDialog(wx.Dialog):
-    """Dialog to display full metadata for current image."""
+    """Dialog to display full metadata for current image, grouped by IFD and XMP schema."""
 
     def __init__(self, parent: wx.Frame, file_path: str, metadata: Dict[str, Any]):
-        super().__init__(parent, title=f"Metadata Details - {Path(file_path).name}", size=(650, 600))
+        super().__init__(parent, title=f"Metadata Details - {Path(file_path).name}", size=(650, 600),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
         panel = wx.Panel(self)
         sizer = wx.BoxSizer(wx.VERTICAL)
 
-        nb = wx.Notebook(panel)
-        # EXIF tab
-        exif_panel = wx.Panel(nb)
-        exif_sizer = wx.BoxSizer(wx.VERTICAL)
-        self.tc_exif = wx.TextCtrl(exif_panel, style=wx.TE_MULTILINE | wx.TE_READONLY)
-        exif_sizer.Add(self.tc_exif, 1, wx.EXPAND | wx.ALL, 6)
-        exif_panel.SetSizer(exif_sizer)
-        nb.AddPage(exif_panel, "EXIF")
-
-        # XMP tab
-        xmp_panel = wx.Panel(nb)
-        xmp_sizer = wx.BoxSizer(wx.VERTICAL)
-        self.tc_xmp = wx.TextCtrl(xmp_panel, style=wx.TE_MULTILINE | wx.TE_READONLY)
-        xmp_sizer.Add(self.tc_xmp, 1, wx.EXPAND | wx.ALL, 6)
-        xmp_panel.SetSizer(xmp_sizer)
-        nb.AddPage(xmp_panel, "XMP")
-
-        sizer.Add(nb, 1, wx.EXPAND | wx.ALL, 6)
+        self.model = MetadataRowModel(metadata)
+
+        self.search = wx.SearchCtrl(panel)
+        self.search.ShowCancelButton(True)
+        self.search.SetDescriptiveText("Search fields and values")
+        sizer.Add(self.search, 0, wx.EXPAND | wx.ALL, 6)
+
+        self.list = MetadataTreeList(panel, self.model)
+        sizer.Add(self.list, 3, wx.EXPAND | wx.LEFT | wx.RIGHT, 6)
+
+        # Full value of the selected field, rendered only when selected
+        self.tc_value = wx.TextCtrl(panel, style=wx.TE_MULTILINE | wx.TE_READONLY)
+        sizer.Add(self.tc_value, 1, wx.EXPAND | wx.ALL, 6)
 
         # Buttons
         btn_row = wx.BoxSizer(wx.HORIZONTAL)
+        self.lbl_count = wx.StaticText(panel, label=f"{self.model.field_count()} fields")
         btn_copy = wx.Button(panel, label="Copy All")
         btn_close = wx.Button(panel, wx.ID_CLOSE, "Close")
+        btn_row.Add(self.lbl_count, 1, wx.ALIGN_CENTER_VERTICAL)
         btn_row.Add(btn_copy, 0, wx.RIGHT, 6)
         btn_row.Add(btn_close, 0)
-        sizer.Add(btn_row, 0, wx.ALIGN_RIGHT | wx.ALL, 6)
+        sizer.Add(btn_row, 0, wx.EXPAND | wx.ALL, 6)
 
         panel.SetSizer(sizer)
 
-        # Fill data
-        exif = metadata.get('exif', {}) or {}
-        xmp = metadata.get('xmp', {}) or {}
-        self.tc_exif.SetValue('\n'.join(f"{k}: {self._format_display_value(exif[k])}" for k in sorted(exif.keys())))
-        self.tc_xmp.SetValue('\n'.join(f"{k}: {self._format_display_value(xmp[k])}" for k in sorted(xmp.keys())))
-
         # Bind
+        self.search.Bind(wx.EVT_TEXT, self.on_search)
+        self.search.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN, lambda e: self.search.SetValue(""))
+        self.list.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_row_selected)
+        self.list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_row_activated)
         btn_close.Bind(wx.EVT_BUTTON, lambda e: self.EndModal(wx.ID_OK))
         btn_copy.Bind(wx.EVT_BUTTON, self.on_copy_all)
 
-    def _format_display_value(self, v: Any) -> str:
-        if isinstance(v, (list, tuple)):
-            return ', '.join(str(i) for i in v)
-        try:
-            return str(v)
-        except Exception:
-            return repr(v)
+    def on_search(self, event):
+        """Filter rows as the user types."""
+        self.model.search(self.search.GetValue())
+        self.list.refresh_rows()
+        self.tc_value.SetValue("")
+        if self.model.query:
+            self.lbl_count.SetLabel(f"{self.model.match_count()} of {self.model.field_count()} fields")
+        else:
+            self.lbl_count.SetLabel(f"{self.model.field_count()} fields")
+
+    def on_row_selected(self, event):
+        """Show the complete value of the selected field below the list."""
+        self.tc_value.SetValue(self.model.full_value(event.GetIndex()))
+
+    def on_row_activated(self, event):
+        """Double-click / Enter on a group header collapses or expands it."""
+        row = event.GetIndex()
+        if self.model.is_group(row):
+            self.model.toggle(row)
+            self.list.refresh_rows()
 
     def on_copy_all(self, event):
-        all_text = [self.tc_exif.GetValue(), '', self.tc_xmp.GetValue()]
-        text = '\n'.join(all_text)
+        text = self.model.full_text()
         if wx.TheClipboard.Open():
             try:
                 wx.TheClipboard.SetData(wx.TextDataObject(text))
@@ -1409,6 +2324,8 @@ class App(wx.App):
 
 
 if __name__ == '__main__':
+    # Required for the duplicate finder's process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     # Robust startup wrapper to capture crashes in packaged app (immediate close diagnosis)
     try:
         app = App(False)
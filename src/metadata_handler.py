@@ -8,22 +8,40 @@ import json
 import os
 import re
 import binascii
+import io
 from datetime import datetime
-from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Mapping, Optional
 
 from PIL import Image
 import piexif
 # XMP support: try to use pyxmp (if installed) or python-xmp-toolkit (libxmp).
 
+from instrumentation import make_tracer, traced
+from io_scheduler import HEADER_READAHEAD_BYTES
+from png_metadata import read_png_metadata, write_png_metadata, strip_png_metadata
+from tiff_metadata import (read_tiff_tags, read_tiff_tags_from, read_jpeg_exif_tags, patch_tiff_metadata,
+                           read_raw_tags, read_raw_layout, read_raw_preview)
+from container_metadata import read_container_metadata
+from xmp_scan import find_xmp_packet
+from xmp_sidecar import find_sidecar, read_sidecar_file, write_sidecar
+from templates import CompiledTemplate
+
+# Default for the sidecar argument of the internal readers: look it up
+_FIND = object()
+
 
 class MetadataHandler:
     """
     Core metadata manipulation class.
-    Supports JPEG, PNG, TIFF, and basic RAW file metadata operations.
+    Supports JPEG, PNG, TIFF, HEIC/AVIF/WebP and basic RAW file metadata operations.
     """
 
-    SUPPORTED_FORMATS = {'.jpg', '.jpeg', '.png', '.tiff', '.tif', '.gif', '.bmp'}
+    # TIFF-based RAW: read header-only; edits always go to an XMP sidecar
+    RAW_FORMATS = {'.cr2', '.nef', '.arw', '.dng', '.orf', '.rw2'}
+    # ISO-BMFF / RIFF containers: Exif and XMP are read box-level; edits go to a sidecar
+    CONTAINER_FORMATS = {'.heic', '.heif', '.avif', '.webp'}
+    SIDECAR_ONLY_FORMATS = RAW_FORMATS | CONTAINER_FORMATS
+    SUPPORTED_FORMATS = {'.jpg', '.jpeg', '.png', '.tiff', '.tif', '.gif', '.bmp'} | SIDECAR_ONLY_FORMATS
     EXIF_READABLE_TAGS = {
         0x0112: 'Orientation',
         0x0132: 'DateTime',
@@ -36,9 +54,14 @@ class MetadataHandler:
         0xa001: 'ColorSpace',
     }
 
-    def __init__(self):
-        """Initialize the metadata handler."""
+    def __init__(self, trace=None):
+        """
+        Initialize the metadata handler.
+        trace: per-phase instrumentation (see instrumentation.make_tracer);
+        None defers to the PMM_TRACE environment variable.
+        """
         self.last_error = None
+        self.tracer = make_tracer(trace)
 
     def _normalize_value(self, v):
         """Normalize a metadata value to a JSON/display-friendly Python type."""
@@ -132,12 +155,28 @@ class MetadataHandler:
 
     def get_file_extension(self, file_path: str) -> str:
         """Get the file extension in lowercase."""
-        return Path(file_path).suffix.lower()
+        return os.path.splitext(file_path)[1].lower()
 
     def is_supported(self, file_path: str) -> bool:
         """Check if a file format is supported."""
         return self.get_file_extension(file_path) in self.SUPPORTED_FORMATS
 
+    def readahead_bytes(self, file_path: str, sidecar: bool = False, delete: bool = False) -> int:
+        """
+        Bytes worth hinting ahead of edit_metadata() (or delete_all_metadata()
+        with delete=True) on a file, for io_scheduler: 0 (the whole file) when
+        the image is rewritten in full, else only its header. RAW and
+        HEIC/AVIF/WebP files and sidecar writes never touch the image data, and
+        TIFF edits are patched in place.
+        """
+        ext = self.get_file_extension(file_path)
+        if ext in self.SIDECAR_ONLY_FORMATS or sidecar and not delete:
+            return HEADER_READAHEAD_BYTES
+        if ext in ('.tif', '.tiff') and not delete:
+            return HEADER_READAHEAD_BYTES
+        return 0
+
+    @traced('read')
     def read_metadata(self, file_path: str) -> Dict[str, Any]:
         """
         Read all metadata from an image file.
@@ -147,53 +186,219 @@ class MetadataHandler:
             self.last_error = f"File not found: {file_path}"
             return {}
 
-        if not self.is_supported(file_path):
-            self.last_error = f"Unsupported file format: {self.get_file_extension(file_path)}"
+        ext = self.get_file_extension(file_path)
+        if ext not in self.SUPPORTED_FORMATS:
+            self.last_error = f"Unsupported file format: {ext}"
             return {}
 
+        # Looked up once and passed down: the general and XMP readers both need it
+        sidecar = find_sidecar(file_path)
         metadata = {
             'exif': {},
             'iptc': {},
             'xmp': {},
-            'general': self._read_general_metadata(file_path)
+            'general': self._read_general_metadata(file_path, ext, sidecar)
         }
 
         try:
             # Read EXIF
-            metadata['exif'] = self._read_exif(file_path)
+            metadata['exif'] = self._read_exif(file_path, ext)
         except Exception as e:
             self.last_error = f"Error reading EXIF: {str(e)}"
 
         try:
             # Read XMP
-            metadata['xmp'] = self._read_xmp(file_path)
+            with self.tracer.phase('xmp.parse'):
+                metadata['xmp'] = self._read_xmp(file_path, ext, sidecar)
         except Exception as e:
             self.last_error = f"Error reading XMP: {str(e)}"
 
         return metadata
 
-    def _read_general_metadata(self, file_path: str) -> Dict[str, Any]:
-        """Read general image metadata (dimensions, format, etc.)."""
+    @traced('read_fields')
+    def read_fields(self, file_path: str, names) -> Dict[str, Any]:
+        """
+        Read only the named fields (EXIF tag names such as 'Model' or
+        'DateTimeOriginal', else XMP names such as 'Headline'), header-only.
+        Returns name -> normalized value for the fields present. An EXIF field
+        also stored in the image's XMP sidecar (e.g. exif:DateTimeOriginal
+        written for a RAW file) is taken from the sidecar. Read-only and safe
+        to call from worker threads.
+        """
+        values: Dict[str, Any] = {}
+        exif_names = [n for n in names if self._exif_tags_named(n)]
+        xmp_names = [n for n in names if n not in exif_names]
+        sidecar = find_sidecar(file_path)
+        if exif_names:
+            try:
+                packet_str = read_sidecar_file(sidecar) if sidecar else None
+            except OSError:
+                packet_str = None
+            if packet_str:
+                sidecar_values = {k.lower(): v for k, v in self._parse_xmp_packet(packet_str).items()}
+                for name in exif_names:
+                    if sidecar_values.get(name.lower()):
+                        values[name] = self._normalize_value(sidecar_values[name.lower()])
+            exif_dict = self._load_exif_dict(file_path)
+            for name in exif_names:
+                if name in values:
+                    continue
+                for ifd, tag in self._exif_tags_named(name):
+                    value = (exif_dict.get(ifd) or {}).get(tag)
+                    if value is not None:
+                        tag_name = piexif.TAGS[ifd][tag]['name']
+                        values[name] = self._normalize_value(self._decode_exif_value(tag_name, value))
+                        break
+            gps = exif_dict.get('GPS') or {}
+            refs = {ref_key: self._normalize_value(gps.get(tag))
+                    for ref_key, tag in (('GPSLatitudeRef', piexif.GPSIFD.GPSLatitudeRef),
+                                         ('GPSLongitudeRef', piexif.GPSIFD.GPSLongitudeRef))}
+            self._apply_gps_refs(values, refs)
+        if xmp_names:
+            with self.tracer.phase('xmp.parse'):
+                xmp = {k.lower(): v for k, v in self._read_xmp(file_path, sidecar=sidecar).items()}
+            for name in xmp_names:
+                if name.lower() in xmp:
+                    values[name] = xmp[name.lower()]
+        return values
+
+    @traced('read_gps')
+    def read_gps(self, file_path: str) -> Dict[int, Any]:
+        """
+        Raw GPS IFD of a file (piexif tag id -> value, rationals as (num, den)
+        pairs), header-only; {} if there is none. Safe to call from worker threads.
+        """
+        if not self.is_supported(file_path):
+            return {}
+        gps = self._load_exif_dict(file_path).get('GPS')
+        return dict(gps) if isinstance(gps, dict) else {}
+
+    def _read_general_metadata(self, file_path: str, ext: Optional[str] = None,
+                               sidecar: Any = _FIND) -> Dict[str, Any]:
+        """
+        Read general image metadata (dimensions, format, etc.).
+        ext / sidecar: the file's extension and find_sidecar() result when the caller already has them.
+        """
+        ext = ext or self.get_file_extension(file_path)
+        if sidecar is _FIND:
+            sidecar = find_sidecar(file_path)
+        if ext in self.RAW_FORMATS:
+            return self._read_raw_general(file_path, ext, sidecar)
+        if ext in self.CONTAINER_FORMATS:
+            return self._read_container_general(file_path, ext, sidecar)
         try:
-            with Image.open(file_path) as img:
-                return {
+            with self.tracer.phase('Image.open'):
+                img = Image.open(file_path)
+            with img:
+                general = {
                     'format': img.format,
                     'size': img.size,
                     'mode': img.mode,
                     'file_size': os.path.getsize(file_path),
                 }
+            if ext == '.png':
+                text = self._png_metadata(file_path).get('text')
+                if text:
+                    general['text'] = text
+            if sidecar:
+                general['xmp_sidecar'] = os.path.basename(sidecar)
+            return general
+        except Exception as e:
+            self.last_error = f"Error reading general metadata: {str(e)}"
+            return {}
+
+    def _read_raw_general(self, file_path: str, ext: str, sidecar: Optional[str]) -> Dict[str, Any]:
+        """General metadata of a RAW file from its IFD layout (sensor data is not read)."""
+        try:
+            with self.tracer.phase('raw.layout'):
+                layout = read_raw_layout(file_path)
+            general = {
+                'format': f"RAW ({layout['format'] or ext[1:].upper()})",
+                'file_size': os.path.getsize(file_path),
+                'previews': len(layout['previews']),
+            }
+            if layout['dimensions']:
+                general['size'] = layout['dimensions']
+            if sidecar:
+                general['xmp_sidecar'] = os.path.basename(sidecar)
+            return general
+        except Exception as e:
+            self.last_error = f"Error reading general metadata: {str(e)}"
+            return {}
+
+    def _read_container_general(self, file_path: str, ext: str, sidecar: Optional[str]) -> Dict[str, Any]:
+        """General metadata of a HEIC/AVIF/WebP file from its box headers (pixels are not decoded)."""
+        try:
+            container = self._container_metadata(file_path)
+            general = {
+                'format': container['format'] or ext[1:].upper(),
+                'file_size': os.path.getsize(file_path),
+            }
+            if container['dimensions']:
+                general['size'] = container['dimensions']
+            if sidecar:
+                general['xmp_sidecar'] = os.path.basename(sidecar)
+            return general
         except Exception as e:
             self.last_error = f"Error reading general metadata: {str(e)}"
             return {}
 
-    def _read_exif(self, file_path: str) -> Dict[str, Any]:
+    def _container_metadata(self, file_path: str) -> Dict[str, Any]:
+        """Exif/XMP payloads of a HEIC/AVIF/WebP file, cached for the last file like _png_metadata."""
+        st = os.stat(file_path)
+        key = (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+        cached = getattr(self, '_container_cache', None)
+        if cached and cached[0] == key:
+            return cached[1]
+        with self.tracer.phase('container.read'):
+            result = read_container_metadata(file_path)
+        self._container_cache = (key, result)
+        return result
+
+    def read_preview(self, file_path: str) -> Optional[bytes]:
+        """Largest embedded JPEG preview of a RAW file (None for other formats or if absent)."""
+        if self.get_file_extension(file_path) not in self.RAW_FORMATS:
+            return None
+        try:
+            with self.tracer.phase('raw.preview'):
+                return read_raw_preview(file_path)
+        except Exception:
+            return None
+
+    def _png_metadata(self, file_path: str) -> Dict[str, Any]:
+        """Chunk-level PNG metadata, cached for the last file so one read serves EXIF, XMP and text."""
+        st = os.stat(file_path)
+        key = (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+        cached = getattr(self, '_png_cache', None)
+        if cached and cached[0] == key:
+            return cached[1]
+        with self.tracer.phase('png.read'):
+            result = read_png_metadata(file_path)
+        self._png_cache = (key, result)
+        return result
+
+    def _read_exif(self, file_path: str, ext: Optional[str] = None) -> Dict[str, Any]:
         """Extract EXIF data from image.
         Robust to unknown tags and includes all available IFDs.
         """
         exif_dict: Dict[str, Any] = {}
 
         try:
-            img_data = piexif.load(file_path)
+            with self.tracer.phase('piexif.load'):
+                ext = ext or self.get_file_extension(file_path)
+                if ext == '.png':
+                    # piexif cannot open PNG; feed it the eXIf chunk (TIFF bytes)
+                    img_data = piexif.load(self._png_metadata(file_path)['exif'])
+                elif ext in ('.tif', '.tiff'):
+                    # Walk the IFDs directly: header-only, and works for BigTIFF
+                    img_data = read_tiff_tags(file_path)
+                elif ext in self.RAW_FORMATS:
+                    img_data = read_raw_tags(file_path)
+                elif ext in self.CONTAINER_FORMATS:
+                    data = self._container_metadata(file_path)['exif']
+                    img_data = read_tiff_tags_from(io.BytesIO(data)) if data else {}
+                else:
+                    img_data = piexif.load(file_path)
         except Exception:
             # piexif couldn't parse; fall back to empty
             return {}
@@ -215,52 +420,153 @@ class MetadataHandler:
                     # Fallback name includes IFD and hex tag id to avoid collisions
                     tag_name = f"{ifd_name}:0x{tag:04X}"
 
-                # Handle Windows XP* UTF-16LE fields specially
-                try:
-                    if tag_name.startswith('XP') or tag_name.lower() in ('xpkeywords', 'xpsubject', 'xptitle', 'xpcomments'):
-                        if isinstance(tag_value, (list, tuple)):
-                            # convert sequence of ints -> bytes
-                            try:
-                                tag_value = bytes(tag_value)
-                            except Exception:
-                                tag_value = str(tag_value)
-                        if isinstance(tag_value, (bytes, bytearray)):
-                            try:
-                                val = tag_value.decode('utf-16le', errors='ignore').rstrip('\x00')
-                            except Exception:
-                                val = tag_value.decode('utf-8', errors='replace') if isinstance(tag_value, (bytes, bytearray)) else str(tag_value)
-                            parts = [p.strip() for p in re.split(r'[;,\x00]+', val) if p.strip()]
-                            tag_value = parts if len(parts) > 1 else (parts[0] if parts else '')
-                    # Handle other byte fields (e.g., UserComment)
-                    elif isinstance(tag_value, (bytes, bytearray)):
-                        try:
-                            val = tag_value.decode('utf-8', errors='replace')
-                        except Exception:
-                            try:
-                                val = tag_value.decode('utf-16le', errors='ignore')
-                            except Exception:
-                                val = str(tag_value)
-                        if tag_name == 'UserComment' and val:
-                            val = re.sub(r'^(ASCII|UNICODE|JIS)\s*\x00+', '', val, flags=re.IGNORECASE)
-                            val = val.rstrip('\x00').strip()
-                        tag_value = val
-                except Exception:
-                    # If decoding fails, keep original value
-                    pass
+                tag_value = self._decode_exif_value(tag_name, tag_value)
 
                 # Record the tag
                 exif_dict[tag_name] = tag_value
 
         # Normalize values for display/JSON (does not drop any keys)
         try:
-            return self._normalize_metadata_dict(exif_dict)
+            with self.tracer.phase('normalize'):
+                normalized = self._normalize_metadata_dict(exif_dict)
         except Exception:
             return exif_dict
+        self._apply_gps_refs(normalized, normalized)
+        return normalized
+
+    @staticmethod
+    def _apply_gps_refs(values: Dict[str, Any], refs: Mapping[str, Any]):
+        """
+        Sign decimal GPSLatitude/GPSLongitude in values by their GPS*Ref in refs.
+        DMS -> decimal degrees is unsigned; south and west are negative.
+        """
+        for key, ref_key, negative in (('GPSLatitude', 'GPSLatitudeRef', 'S'), ('GPSLongitude', 'GPSLongitudeRef', 'W')):
+            ref = str(refs.get(ref_key, '')).strip('\x00 ').upper()
+            if isinstance(values.get(key), float) and ref == negative:
+                values[key] = -values[key]
+
+    def _decode_exif_value(self, tag_name: str, tag_value: Any) -> Any:
+        """
+        Decode an EXIF byte value by tag: Windows XP* fields are UTF-16LE (split
+        into a list when they hold several items), and UserComment loses its
+        ASCII/UNICODE/JIS charset prefix. Other values are returned unchanged.
+        """
+        try:
+            # Handle Windows XP* UTF-16LE fields specially
+            if tag_name.startswith('XP') or tag_name.lower() in ('xpkeywords', 'xpsubject', 'xptitle', 'xpcomments'):
+                if isinstance(tag_value, (list, tuple)):
+                    # convert sequence of ints -> bytes
+                    try:
+                        tag_value = bytes(tag_value)
+                    except Exception:
+                        tag_value = str(tag_value)
+                if isinstance(tag_value, (bytes, bytearray)):
+                    try:
+                        val = tag_value.decode('utf-16le', errors='ignore').rstrip('\x00')
+                    except Exception:
+                        val = tag_value.decode('utf-8', errors='replace') if isinstance(tag_value, (bytes, bytearray)) else str(tag_value)
+                    parts = [p.strip() for p in re.split(r'[;,\x00]+', val) if p.strip()]
+                    tag_value = parts if len(parts) > 1 else (parts[0] if parts else '')
+            # Handle other byte fields (e.g., UserComment)
+            elif isinstance(tag_value, (bytes, bytearray)):
+                try:
+                    val = tag_value.decode('utf-8', errors='replace')
+                except Exception:
+                    try:
+                        val = tag_value.decode('utf-16le', errors='ignore')
+                    except Exception:
+                        val = str(tag_value)
+                if tag_name == 'UserComment' and val:
+                    val = re.sub(r'^(ASCII|UNICODE|JIS)\s*\x00+', '', val, flags=re.IGNORECASE)
+                    val = val.rstrip('\x00').strip()
+                tag_value = val
+        except Exception:
+            # If decoding fails, keep original value
+            pass
+        return tag_value
 
-    def _read_xmp(self, file_path: str) -> Dict[str, Any]:
-        """Extract XMP data from image."""
+    def _read_xmp(self, file_path: str, ext: Optional[str] = None, sidecar: Any = _FIND) -> Dict[str, Any]:
+        """
+        Extract XMP data from image, with values from a .xmp sidecar taking precedence.
+        ext / sidecar: the file's extension and find_sidecar() result when the caller already has them.
+        """
+        xmp_dict = self._read_embedded_xmp(file_path, ext or self.get_file_extension(file_path))
+        if sidecar is _FIND:
+            sidecar = find_sidecar(file_path)
+        try:
+            packet_str = read_sidecar_file(sidecar) if sidecar else None
+        except OSError:
+            packet_str = None
+        if packet_str:
+            sidecar_dict = self._parse_xmp_packet(packet_str)
+            sidecar_dict.pop('xmp_raw', None)
+            try:
+                sidecar_dict = self._normalize_metadata_dict(sidecar_dict)
+            except Exception:
+                pass
+            xmp_dict = {**xmp_dict, **sidecar_dict}
+        return xmp_dict
+
+    def _read_embedded_xmp(self, file_path: str, ext: str) -> Dict[str, Any]:
+        """Extract XMP data embedded in the image."""
         xmp_dict: Dict[str, Any] = {}
 
+        # PNG: read the iTXt XML:com.adobe.xmp chunk directly (handles compressed iTXt too)
+        if ext == '.png':
+            try:
+                packet_str = self._png_metadata(file_path).get('xmp')
+                if packet_str:
+                    xmp_dict = self._parse_xmp_packet(packet_str)
+                    try:
+                        return self._normalize_metadata_dict(xmp_dict)
+                    except Exception:
+                        return xmp_dict
+            except Exception:
+                pass
+
+        # TIFF: XMP lives in IFD0 tag 700 (XMLPacket)
+        if ext in ('.tif', '.tiff'):
+            try:
+                packet = read_tiff_tags(file_path)['0th'].get(700)
+                if packet:
+                    if isinstance(packet, tuple):
+                        packet = bytes(packet)
+                    xmp_dict = self._parse_xmp_packet(packet.decode('utf-8', errors='replace'))
+                    try:
+                        return self._normalize_metadata_dict(xmp_dict)
+                    except Exception:
+                        return xmp_dict
+            except Exception:
+                pass
+
+        # RAW: only IFD0 tag 700 is consulted; scanning would page in the sensor data
+        if ext in self.RAW_FORMATS:
+            try:
+                packet = read_raw_tags(file_path)['0th'].get(700)
+                if packet:
+                    if isinstance(packet, tuple):
+                        packet = bytes(packet)
+                    xmp_dict = self._parse_xmp_packet(packet.decode('utf-8', errors='replace'))
+            except Exception:
+                pass
+            try:
+                return self._normalize_metadata_dict(xmp_dict)
+            except Exception:
+                return xmp_dict
+
+        # HEIC/AVIF/WebP: the XMP item/chunk located from the box structure
+        if ext in self.CONTAINER_FORMATS:
+            try:
+                packet = self._container_metadata(file_path)['xmp']
+                if packet:
+                    xmp_dict = self._parse_xmp_packet(packet.decode('utf-8', errors='replace'))
+            except Exception:
+                pass
+            try:
+                return self._normalize_metadata_dict(xmp_dict)
+            except Exception:
+                return xmp_dict
+
         # First try pyxmp (module name: xmp)
         try:
             import xmp as pyxmp  # type: ignore
@@ -434,48 +740,15 @@ class MetadataHandler:
             # libxmp failed — try fallback: scan file for XMP packet
             pass
 
-        # Fallback: scan file for XMP packet and parse XML directly
+        # Fallback: scan the memory-mapped file for an XMP packet and parse XML directly
         try:
-            data = Path(file_path).read_bytes()
-            start = data.find(b"<x:xmpmeta")
-            end = data.find(b"</x:xmpmeta>")
-            if start != -1 and end != -1 and end > start:
-                packet = data[start:end+12]
+            with self.tracer.phase('xmp.scan') as ph:
+                packet = find_xmp_packet(file_path)
+                if packet:
+                    ph.add_bytes(len(packet))
+            if packet:
                 packet_str = packet.decode('utf-8', errors='replace')
-                
-                # Parse the packet
-                try:
-                    from xml.etree import ElementTree as ET
-                    root = ET.fromstring(packet_str)
-                    ns_rdf = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
-                    
-                    for desc in root.findall('.//{'+ns_rdf+'}Description'):
-                        # Attributes (namespaced) - strip namespace prefix to get local name
-                        for k, v in desc.attrib.items():
-                            local_key = k.split('}', 1)[1] if '}' in k else k
-                            xmp_dict[local_key] = v
-                        
-                        # Child elements
-                        for child in desc:
-                            tag = child.tag
-                            tagname = tag.split('}', 1)[1] if '}' in tag else tag
-                            
-                            # Collect rdf:li children if present
-                            li_nodes = child.findall('.//{'+ns_rdf+'}li')
-                            if li_nodes:
-                                li_texts = [(li.text or '').strip() for li in li_nodes if (li.text or '').strip()]
-                                # For title/description/rights prefer single string
-                                if tagname in ('title', 'description', 'rights') and len(li_texts) == 1:
-                                    xmp_dict[tagname] = li_texts[0]
-                                else:
-                                    xmp_dict[tagname] = li_texts
-                            else:
-                                # Fallback to direct text
-                                text = child.text
-                                if text is not None and text.strip():
-                                    xmp_dict[tagname] = text.strip()
-                except Exception:
-                    xmp_dict = {'xmp_raw': packet_str[:500]}
+                xmp_dict = self._parse_xmp_packet(packet_str)
         except Exception:
             pass
         
@@ -485,6 +758,44 @@ class MetadataHandler:
         except Exception:
             return xmp_dict
 
+    def _parse_xmp_packet(self, packet_str: str) -> Dict[str, Any]:
+        """Parse an XMP packet into a flat dict keyed by local names (not normalized)."""
+        xmp_dict: Dict[str, Any] = {}
+        try:
+            from xml.etree import ElementTree as ET
+            root = ET.fromstring(packet_str)
+            ns_rdf = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+            
+            for desc in root.findall('.//{'+ns_rdf+'}Description'):
+                # Attributes (namespaced) - strip namespace prefix to get local name
+                for k, v in desc.attrib.items():
+                    local_key = k.split('}', 1)[1] if '}' in k else k
+                    xmp_dict[local_key] = v
+                
+                # Child elements
+                for child in desc:
+                    tag = child.tag
+                    tagname = tag.split('}', 1)[1] if '}' in tag else tag
+                    
+                    # Collect rdf:li children if present
+                    li_nodes = child.findall('.//{'+ns_rdf+'}li')
+                    if li_nodes:
+                        li_texts = [(li.text or '').strip() for li in li_nodes if (li.text or '').strip()]
+                        # For title/description/rights prefer single string
+                        if tagname in ('title', 'description', 'rights') and len(li_texts) == 1:
+                            xmp_dict[tagname] = li_texts[0]
+                        else:
+                            xmp_dict[tagname] = li_texts
+                    else:
+                        # Fallback to direct text
+                        text = child.text
+                        if text is not None and text.strip():
+                            xmp_dict[tagname] = text.strip()
+        except Exception:
+            xmp_dict = {'xmp_raw': packet_str[:500]}
+        return xmp_dict
+
+    @traced('delete')
     def delete_all_metadata(self, file_path: str, output_path: Optional[str] = None) -> bool:
         """
         Remove all metadata from an image and save as new file.
@@ -494,16 +805,36 @@ class MetadataHandler:
             self.last_error = f"File not found: {file_path}"
             return False
 
+        ext = self.get_file_extension(file_path)
+        if ext in self.SIDECAR_ONLY_FORMATS:
+            self.last_error = (f"Deleting metadata from {ext[1:].upper()} "
+                               "files is not supported (originals are never rewritten)")
+            return False
+
+        if ext == '.png':
+            # Drop metadata chunks; pixel data is copied without decoding
+            try:
+                with self.tracer.phase('png.write'):
+                    strip_png_metadata(file_path, output_path)
+                return True
+            except Exception as e:
+                self.last_error = f"Error deleting metadata: {str(e)}"
+                return False
+
         try:
-            with Image.open(file_path) as img:
-                # Create a new image without metadata
-                data = list(img.getdata())
-                image_without_exif = Image.new(img.mode, img.size)
-                image_without_exif.putdata(data)
+            with self.tracer.phase('Image.open'):
+                img = Image.open(file_path)
+            with img:
+                # Create a new image without metadata (raw pixel bytes, no per-pixel tuples)
+                with self.tracer.phase('Image.decode'):
+                    image_without_exif = Image.frombytes(img.mode, img.size, img.tobytes())
 
                 # Save to output path
                 save_path = output_path or file_path
-                image_without_exif.save(save_path, "JPEG", quality=95)
+                with self.tracer.phase('Image.save') as ph:
+                    image_without_exif.save(save_path, "JPEG", quality=95)
+                    if self.tracer.enabled:
+                        ph.add_bytes(os.path.getsize(save_path))
                 return True
         except Exception as e:
             self.last_error = f"Error deleting metadata: {str(e)}"
@@ -528,11 +859,201 @@ class MetadataHandler:
             self.last_error = f"Error deleting specific metadata: {str(e)}"
             return False
 
+    # Camera/capture tags kept when purge_non_camera is set (the default)
+    CAMERA_0TH_TAGS = {
+        piexif.ImageIFD.Make,
+        piexif.ImageIFD.Model,
+        piexif.ImageIFD.Orientation,
+        piexif.ImageIFD.XResolution,
+        piexif.ImageIFD.YResolution,
+        piexif.ImageIFD.ResolutionUnit,
+    }
+    CAMERA_EXIF_TAGS = {
+        piexif.ExifIFD.DateTimeOriginal,
+        piexif.ExifIFD.DateTimeDigitized,
+        piexif.ExifIFD.SubSecTimeOriginal,
+        piexif.ExifIFD.SubSecTimeDigitized,
+        piexif.ExifIFD.ExifVersion,
+        piexif.ExifIFD.ExposureTime,
+        piexif.ExifIFD.FNumber,
+        piexif.ExifIFD.ShutterSpeedValue,
+        piexif.ExifIFD.ApertureValue,
+        piexif.ExifIFD.ExposureBiasValue,
+        piexif.ExifIFD.MaxApertureValue,
+        piexif.ExifIFD.ExposureProgram,
+        piexif.ExifIFD.ISOSpeedRatings if hasattr(piexif.ExifIFD, 'ISOSpeedRatings') else 0x8827,
+        piexif.ExifIFD.SensitivityType if hasattr(piexif.ExifIFD, 'SensitivityType') else 0x8830,
+        piexif.ExifIFD.RecommendedExposureIndex if hasattr(piexif.ExifIFD, 'RecommendedExposureIndex') else 0x8832,
+        piexif.ExifIFD.MeteringMode,
+        piexif.ExifIFD.Flash,
+        piexif.ExifIFD.FocalLength,
+        piexif.ExifIFD.ColorSpace,
+        piexif.ExifIFD.FocalPlaneXResolution,
+        piexif.ExifIFD.FocalPlaneYResolution,
+        piexif.ExifIFD.FocalPlaneResolutionUnit,
+        piexif.ExifIFD.CustomRendered if hasattr(piexif.ExifIFD, 'CustomRendered') else 0xA401,
+        piexif.ExifIFD.ExposureMode if hasattr(piexif.ExifIFD, 'ExposureMode') else 0xA402,
+        piexif.ExifIFD.WhiteBalance,
+        piexif.ExifIFD.SceneCaptureType,
+        piexif.ExifIFD.BodySerialNumber if hasattr(piexif.ExifIFD, 'BodySerialNumber') else 0xA431,
+        piexif.ExifIFD.LensSpecification if hasattr(piexif.ExifIFD, 'LensSpecification') else 0xA432,
+        piexif.ExifIFD.LensModel if hasattr(piexif.ExifIFD, 'LensModel') else 0xA434,
+        piexif.ExifIFD.LensSerialNumber if hasattr(piexif.ExifIFD, 'LensSerialNumber') else 0xA435,
+    }
+
+    # Descriptive IFD0 tags dropped from TIFFs by purge_non_camera; everything else in
+    # IFD0 (dimensions, strips/tiles, compression, ICC, GPS pointer...) is structural
+    TIFF_DESCRIPTIVE_TAGS = {
+        269,     # DocumentName
+        piexif.ImageIFD.ImageDescription,
+        285,     # PageName
+        piexif.ImageIFD.Software,
+        piexif.ImageIFD.DateTime,
+        piexif.ImageIFD.Artist,
+        316,     # HostComputer
+        700,     # XMLPacket
+        18246,   # Rating
+        18249,   # RatingPercent
+        piexif.ImageIFD.Copyright,
+        33723,   # IPTC-NAA
+        34377,   # Photoshop image resources
+        piexif.ImageIFD.XPTitle,
+        piexif.ImageIFD.XPComment,
+        piexif.ImageIFD.XPAuthor,
+        piexif.ImageIFD.XPKeywords,
+        piexif.ImageIFD.XPSubject,
+    }
+
+    def _apply_exif_updates(self, exif_dict: Dict[str, Any], metadata_updates: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply editor fields to a piexif-style dict and return the dict to write.
+        Honors metadata_updates['purge_non_camera'] (default True).
+        """
+        # Optionally purge all metadata except essential camera/capture info
+        purge_non_camera = metadata_updates.get('purge_non_camera', True)
+        if purge_non_camera:
+            # Build a new minimal exif dict
+            new_exif = {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
+            # Keep GPS block entirely
+            if isinstance(exif_dict.get('GPS'), dict):
+                new_exif['GPS'] = dict(exif_dict['GPS'])
+            # Copy whitelisted 0th and Exif tags
+            for tag, val in (exif_dict.get('0th') or {}).items():
+                if tag in self.CAMERA_0TH_TAGS:
+                    new_exif['0th'][tag] = val
+            for tag, val in (exif_dict.get('Exif') or {}).items():
+                if tag in self.CAMERA_EXIF_TAGS:
+                    new_exif['Exif'][tag] = val
+            exif_dict = new_exif
+
+        # Map our fields to EXIF tags where appropriate
+        zeroth = exif_dict.setdefault('0th', {})
+        # New preferred keys with fallback to legacy keys
+        headline = metadata_updates.get('headline') or metadata_updates.get('title') or ''
+        creator = metadata_updates.get('creator') or metadata_updates.get('authors') or ''
+        rights = metadata_updates.get('rights') or metadata_updates.get('copyright') or ''
+        subject_str = metadata_updates.get('subject', '')
+        description = metadata_updates.get('description') or metadata_updates.get('comments') or ''
+        date_created = metadata_updates.get('date_created', '')
+
+        if headline:
+            zeroth[piexif.ImageIFD.ImageDescription] = str(headline).encode('utf-8', errors='replace')
+        if creator:
+            zeroth[piexif.ImageIFD.Artist] = str(creator).encode('utf-8', errors='replace')
+        if rights:
+            zeroth[piexif.ImageIFD.Copyright] = str(rights).encode('utf-8', errors='replace')
+        # Subject -> XPSubject (UTF-16LE)
+        if subject_str:
+            try:
+                zeroth[piexif.ImageIFD.XPSubject] = str(subject_str).encode('utf-16le', errors='replace')
+            except Exception:
+                pass
+        # Comments/Description -> UserComment (Exif IFD)
+        if description:
+            exif_ifd = exif_dict.setdefault('Exif', {})
+            exif_ifd[piexif.ExifIFD.UserComment] = str(description).encode('utf-8', errors='replace')
+        # Date Created -> DateTimeOriginal if provided and plausible
+        if date_created:
+            try:
+                exif_ifd = exif_dict.setdefault('Exif', {})
+                # Accept ISO or EXIF-like format; store as-is
+                exif_ifd[piexif.ExifIFD.DateTimeOriginal] = str(date_created).encode('utf-8', errors='replace')
+            except Exception:
+                pass
+        return exif_dict
+
+    def _build_xmp_packet(self, metadata_updates: Dict[str, Any]) -> str:
+        """Build a minimal XMP packet (Dublin Core + photoshop/xmp dates) from editor fields."""
+        def _escape(s: str) -> str:
+            import xml.sax.saxutils as sax
+            return sax.escape(s)
+
+        def _attr(s: str) -> str:
+            import xml.sax.saxutils as sax
+            return sax.escape(s, {'"': '&quot;'})
+
+        # Ensure tags is a list
+        def _split_items(s: str):
+            return [p.strip() for p in re.split('[,;]', s) if p.strip()]
+
+        # New keys with fallback
+        headline = metadata_updates.get('headline') or metadata_updates.get('title') or ''
+        description = metadata_updates.get('description') or metadata_updates.get('comments', '')
+        creator = metadata_updates.get('creator') or metadata_updates.get('authors', '')
+        rights = metadata_updates.get('rights') or metadata_updates.get('copyright', '')
+        subject_val = metadata_updates.get('subject', '')
+        date_created = metadata_updates.get('date_created', '')
+
+        attrs = ''
+        if headline:
+            attrs += f' photoshop:Headline="{_attr(headline)}"'
+        if date_created:
+            attrs += f' xmp:CreateDate="{_attr(date_created)}" photoshop:DateCreated="{_attr(date_created)}"'
+
+        xmp_lines = [
+            '<?xpacket begin="﻿" id="W5M0MpCehiHzreSzNTczkc9d"?>',
+            '<x:xmpmeta xmlns:x="adobe:ns:meta/">',
+            '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">',
+            '<rdf:Description xmlns:dc="http://purl.org/dc/elements/1.1/" '
+            'xmlns:photoshop="http://ns.adobe.com/photoshop/1.0/" '
+            'xmlns:xmp="http://ns.adobe.com/xap/1.0/"'
+            f'{attrs}>'
+        ]
+        if description:
+            xmp_lines.append(f'<dc:description><rdf:Alt><rdf:li xml:lang="x-default">{_escape(description)}</rdf:li></rdf:Alt></dc:description>')
+        if creator:
+            # creators as rdf:Seq
+            creator_items = ''.join([f'<rdf:li>{_escape(a.strip())}</rdf:li>' for a in (_split_items(creator) if isinstance(creator, str) else [creator]) if a])
+            xmp_lines.append(f'<dc:creator><rdf:Seq>{creator_items}</rdf:Seq></dc:creator>')
+        # dc:subject from provided subject string (split on ,;)
+        subj_items = []
+        if subject_val:
+            if isinstance(subject_val, str):
+                subj_items.extend([_escape(s) for s in _split_items(subject_val)])
+            elif isinstance(subject_val, list):
+                subj_items.extend([_escape(str(s)) for s in subject_val if str(s).strip()])
+        if subj_items:
+            tag_items = ''.join([f'<rdf:li>{s}</rdf:li>' for s in subj_items])
+            xmp_lines.append(f'<dc:subject><rdf:Bag>{tag_items}</rdf:Bag></dc:subject>')
+        if rights:
+            xmp_lines.append(f'<dc:rights><rdf:Alt><rdf:li xml:lang="x-default">{_escape(rights)}</rdf:li></rdf:Alt></dc:rights>')
+
+        xmp_lines.append('</rdf:Description>')
+        xmp_lines.append('</rdf:RDF>')
+        xmp_lines.append('</x:xmpmeta>')
+        xmp_lines.append('<?xpacket end="w"?>')
+        return '\n'.join(xmp_lines)
+
+    @traced('edit')
     def edit_metadata(self, file_path: str, metadata_updates: Dict[str, Any],
-                       output_path: Optional[str] = None) -> bool:
+                       output_path: Optional[str] = None, index: Optional[int] = None,
+                       sidecar: bool = False) -> bool:
         """
         Add or edit metadata in an image.
-        metadata_updates: dict with 'exif', 'xmp' keys containing updates.
+        metadata_updates: dict of editor fields, or a CompiledTemplate rendered for
+        this file against the EXIF loaded below (index fills {index}).
+        sidecar: write only an XMP packet into <basename>.xmp next to the image
+        (merged into an existing sidecar); the image bytes are left untouched.
         """
         if not os.path.exists(file_path):
             self.last_error = f"File not found: {file_path}"
@@ -540,16 +1061,42 @@ class MetadataHandler:
 
         save_path = output_path or file_path
 
+        if self.get_file_extension(file_path) in self.SIDECAR_ONLY_FORMATS:
+            # RAW originals are never rewritten; HEIC/AVIF/WebP have no in-place writer
+            sidecar = True
+        if sidecar:
+            try:
+                if save_path != file_path:
+                    from shutil import copyfile
+                    copyfile(file_path, save_path)
+                metadata_updates = self._render_updates(metadata_updates, file_path, None, index)
+                xmp_str = self._build_xmp_packet(metadata_updates)
+                with self.tracer.phase('xmp.sidecar') as ph:
+                    write_sidecar(save_path, xmp_str)
+                    ph.add_bytes(len(xmp_str))
+                return True
+            except Exception as e:
+                self.last_error = f"Error writing XMP sidecar: {str(e)}"
+                return False
+
         # Update EXIF for JPEG/TIFF when possible
+        ext = self.get_file_extension(file_path)
         try:
-            ext = self.get_file_extension(file_path)
-            if ext in ('.jpg', '.jpeg', '.tiff', '.tif'):
+            if ext in ('.tif', '.tiff'):
+                # TIFF: append new IFD0/Exif IFDs and re-point the header; strips stay put
+                metadata_updates = self._render_updates(metadata_updates, file_path, None, index)
+                self._edit_tiff_in_place(file_path, save_path, metadata_updates)
+                return True
+            if ext in ('.jpg', '.jpeg'):
                 # Load image and existing EXIF
-                with Image.open(file_path) as img:
+                with self.tracer.phase('Image.open'):
+                    img = Image.open(file_path)
+                with img:
                     exif_dict = {}
                     try:
                         # First attempt: load from file path to capture all segments
-                        exif_dict = piexif.load(file_path)
+                        with self.tracer.phase('piexif.load'):
+                            exif_dict = piexif.load(file_path)
                     except Exception:
                         try:
                             # Fallback to any exif present in PIL info
@@ -558,179 +1105,65 @@ class MetadataHandler:
                             # start with empty structure
                             exif_dict = {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
 
-                    # Optionally purge all metadata except essential camera/capture info
-                    purge_non_camera = metadata_updates.get('purge_non_camera', True)
-                    if purge_non_camera:
-                        # Whitelists for camera/capture related tags to keep
-                        keep_0th = {
-                            piexif.ImageIFD.Make,
-                            piexif.ImageIFD.Model,
-                            piexif.ImageIFD.Orientation,
-                            piexif.ImageIFD.XResolution,
-                            piexif.ImageIFD.YResolution,
-                            piexif.ImageIFD.ResolutionUnit,
-                        }
-                        keep_exif = {
-                            piexif.ExifIFD.DateTimeOriginal,
-                            piexif.ExifIFD.DateTimeDigitized,
-                            piexif.ExifIFD.SubSecTimeOriginal,
-                            piexif.ExifIFD.SubSecTimeDigitized,
-                            piexif.ExifIFD.ExifVersion,
-                            piexif.ExifIFD.ExposureTime,
-                            piexif.ExifIFD.FNumber,
-                            piexif.ExifIFD.ShutterSpeedValue,
-                            piexif.ExifIFD.ApertureValue,
-                            piexif.ExifIFD.ExposureBiasValue,
-                            piexif.ExifIFD.MaxApertureValue,
-                            piexif.ExifIFD.ExposureProgram,
-                            piexif.ExifIFD.ISOSpeedRatings if hasattr(piexif.ExifIFD, 'ISOSpeedRatings') else 0x8827,
-                            piexif.ExifIFD.SensitivityType if hasattr(piexif.ExifIFD, 'SensitivityType') else 0x8830,
-                            piexif.ExifIFD.RecommendedExposureIndex if hasattr(piexif.ExifIFD, 'RecommendedExposureIndex') else 0x8832,
-                            piexif.ExifIFD.MeteringMode,
-                            piexif.ExifIFD.Flash,
-                            piexif.ExifIFD.FocalLength,
-                            piexif.ExifIFD.ColorSpace,
-                            piexif.ExifIFD.FocalPlaneXResolution,
-                            piexif.ExifIFD.FocalPlaneYResolution,
-                            piexif.ExifIFD.FocalPlaneResolutionUnit,
-                            piexif.ExifIFD.CustomRendered if hasattr(piexif.ExifIFD, 'CustomRendered') else 0xA401,
-                            piexif.ExifIFD.ExposureMode if hasattr(piexif.ExifIFD, 'ExposureMode') else 0xA402,
-                            piexif.ExifIFD.WhiteBalance,
-                            piexif.ExifIFD.SceneCaptureType,
-                            piexif.ExifIFD.BodySerialNumber if hasattr(piexif.ExifIFD, 'BodySerialNumber') else 0xA431,
-                            piexif.ExifIFD.LensSpecification if hasattr(piexif.ExifIFD, 'LensSpecification') else 0xA432,
-                            piexif.ExifIFD.LensModel if hasattr(piexif.ExifIFD, 'LensModel') else 0xA434,
-                            piexif.ExifIFD.LensSerialNumber if hasattr(piexif.ExifIFD, 'LensSerialNumber') else 0xA435,
-                        }
-                        # Build a new minimal exif dict
-                        new_exif = {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
-                        # Keep GPS block entirely
-                        if isinstance(exif_dict.get('GPS'), dict):
-                            new_exif['GPS'] = dict(exif_dict['GPS'])
-                        # Copy whitelisted 0th and Exif tags
-                        for tag, val in exif_dict.get('0th', {}).items():
-                            if tag in keep_0th:
-                                new_exif['0th'][tag] = val
-                        for tag, val in exif_dict.get('Exif', {}).items():
-                            if tag in keep_exif:
-                                new_exif['Exif'][tag] = val
-                        exif_dict = new_exif
-
-                    # Map our fields to EXIF tags where appropriate
-                    zeroth = exif_dict.setdefault('0th', {})
-                    # New preferred keys with fallback to legacy keys
-                    headline = metadata_updates.get('headline') or metadata_updates.get('title') or ''
-                    creator = metadata_updates.get('creator') or metadata_updates.get('authors') or ''
-                    rights = metadata_updates.get('rights') or metadata_updates.get('copyright') or ''
-                    subject_str = metadata_updates.get('subject', '')
-                    description = metadata_updates.get('description') or metadata_updates.get('comments') or ''
-                    date_created = metadata_updates.get('date_created', '')
-
-                    if headline:
-                        zeroth[piexif.ImageIFD.ImageDescription] = str(headline).encode('utf-8', errors='replace')
-                    if creator:
-                        zeroth[piexif.ImageIFD.Artist] = str(creator).encode('utf-8', errors='replace')
-                    if rights:
-                        zeroth[piexif.ImageIFD.Copyright] = str(rights).encode('utf-8', errors='replace')
-                    # Subject -> XPSubject (UTF-16LE)
-                    if subject_str:
-                        try:
-                            zeroth[piexif.ImageIFD.XPSubject] = str(subject_str).encode('utf-16le', errors='replace')
-                        except Exception:
-                            pass
-                    # Comments/Description -> UserComment (Exif IFD)
-                    if description:
-                        exif_ifd = exif_dict.setdefault('Exif', {})
-                        exif_ifd[piexif.ExifIFD.UserComment] = str(description).encode('utf-8', errors='replace')
-                    # Date Created -> DateTimeOriginal if provided and plausible
-                    if date_created:
-                        try:
-                            exif_ifd = exif_dict.setdefault('Exif', {})
-                            # Accept ISO or EXIF-like format; store as-is
-                            exif_ifd[piexif.ExifIFD.DateTimeOriginal] = str(date_created).encode('utf-8', errors='replace')
-                        except Exception:
-                            pass
+                    metadata_updates = self._render_updates(metadata_updates, file_path, exif_dict, index)
+                    exif_dict = self._apply_exif_updates(exif_dict, metadata_updates)
 
-                    exif_bytes = piexif.dump(exif_dict)
+                    with self.tracer.phase('piexif.dump') as ph:
+                        exif_bytes = piexif.dump(exif_dict)
+                        ph.add_bytes(len(exif_bytes))
                     # Save with new EXIF
-                    with Image.open(file_path) as img2:
-                        img2.save(save_path, exif=exif_bytes)
+                    with self.tracer.phase('Image.save') as ph:
+                        with Image.open(file_path) as img2:
+                            img2.save(save_path, exif=exif_bytes)
+                        if self.tracer.enabled:
+                            ph.add_bytes(os.path.getsize(save_path))
+            elif ext == '.png':
+                # PNG: rewrite eXIf and iTXt XMP chunks natively; IDAT is streamed through
+                exif_dict = {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
+                existing = self._png_metadata(file_path)
+                if existing.get('exif'):
+                    try:
+                        with self.tracer.phase('piexif.load'):
+                            exif_dict = piexif.load(existing['exif'])
+                    except Exception:
+                        pass
+                metadata_updates = self._render_updates(metadata_updates, file_path, exif_dict, index)
+                exif_dict = self._apply_exif_updates(exif_dict, metadata_updates)
+                with self.tracer.phase('piexif.dump') as ph:
+                    exif_bytes = piexif.dump(exif_dict)
+                    ph.add_bytes(len(exif_bytes))
+                xmp_packet = self._build_xmp_packet(metadata_updates).encode('utf-8')
+                with self.tracer.phase('png.write') as ph:
+                    write_png_metadata(file_path, save_path, exif=exif_bytes, xmp=xmp_packet)
+                    ph.add_bytes(len(exif_bytes) + len(xmp_packet))
+                return True
             else:
-                # For non-JPEG/TIFF, simply copy file (we'll handle XMP separately)
+                # For other formats, simply copy file (we'll handle XMP separately)
+                metadata_updates = self._render_updates(metadata_updates, file_path, None, index)
                 if save_path != file_path:
                     from shutil import copyfile
                     copyfile(file_path, save_path)
         except Exception as e:
-            # Non-fatal for XMP path, but record error
             self.last_error = f"Error writing EXIF: {str(e)}"
+            if ext in ('.tif', '.tiff', '.png'):
+                # These writers embed the XMP packet themselves, so nothing was written
+                return False
+            # Non-fatal for the XMP path below
+
+        if isinstance(metadata_updates, CompiledTemplate):
+            metadata_updates = self._render_updates(metadata_updates, file_path, None, index)
+        xmp_str = self._build_xmp_packet(metadata_updates)
 
         # Update XMP using python-xmp-toolkit (libxmp) if available
         try:
             from libxmp import XMPFiles
 
-            # Build a minimal XMP packet containing Dublin Core elements
-            def _escape(s: str) -> str:
-                import xml.sax.saxutils as sax
-                return sax.escape(s)
-
-            # New keys with fallback
-            headline = metadata_updates.get('headline') or metadata_updates.get('title') or ''
-            description = metadata_updates.get('description') or metadata_updates.get('comments', '')
-            creator = metadata_updates.get('creator') or metadata_updates.get('authors', '')
-            rights = metadata_updates.get('rights') or metadata_updates.get('copyright', '')
-            subject_val = metadata_updates.get('subject', '')
-            date_created = metadata_updates.get('date_created', '')
-
-            # Ensure tags is a list
-            def _split_items(s: str):
-                return [p.strip() for p in re.split('[,;]', s) if p.strip()]
-
-            xmp_lines = [
-                '<?xpacket begin="﻿" id="W5M0MpCehiHzreSzNTczkc9d"?>',
-                '<x:xmpmeta xmlns:x="adobe:ns:meta/">',
-                '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">',
-                '<rdf:Description xmlns:dc="http://purl.org/dc/elements/1.1/" '
-                'xmlns:photoshop="http://ns.adobe.com/photoshop/1.0/" '
-                'xmlns:xmp="http://ns.adobe.com/xap/1.0/"'
-                f'{(" photoshop:Headline=\"" + _escape(headline) + "\"") if headline else ""}'
-                f'{(" xmp:CreateDate=\"" + _escape(date_created) + "\"") if date_created else ""}'
-                f'{(" photoshop:DateCreated=\"" + _escape(date_created) + "\"") if date_created else ""}'
-                '>'
-            ]
-            # Prefer Headline over title
-            if headline and False:
-                # keep optional dc:title if needed (disabled by default)
-                xmp_lines.append(f'<dc:title><rdf:Alt><rdf:li xml:lang="x-default">{_escape(headline)}</rdf:li></rdf:Alt></dc:title>')
-            if description:
-                xmp_lines.append(f'<dc:description><rdf:Alt><rdf:li xml:lang="x-default">{_escape(description)}</rdf:li></rdf:Alt></dc:description>')
-            if creator:
-                # creators as rdf:Seq
-                creator_items = ''.join([f'<rdf:li>{_escape(a.strip())}</rdf:li>' for a in (_split_items(creator) if isinstance(creator, str) else [creator]) if a])
-                xmp_lines.append(f'<dc:creator><rdf:Seq>{creator_items}</rdf:Seq></dc:creator>')
-            # dc:subject from provided subject string (split on ,;)
-            subj_items = []
-            if subject_val:
-                if isinstance(subject_val, str):
-                    subj_items.extend([_escape(s) for s in _split_items(subject_val)])
-                elif isinstance(subject_val, list):
-                    subj_items.extend([_escape(str(s)) for s in subject_val if str(s).strip()])
-            if subj_items:
-                tag_items = ''.join([f'<rdf:li>{s}</rdf:li>' for s in subj_items])
-                xmp_lines.append(f'<dc:subject><rdf:Bag>{tag_items}</rdf:Bag></dc:subject>')
-            if rights:
-                xmp_lines.append(f'<dc:rights><rdf:Alt><rdf:li xml:lang="x-default">{_escape(rights)}</rdf:li></rdf:Alt></dc:rights>')
-
-            xmp_lines.append('</rdf:Description>')
-            xmp_lines.append('</rdf:RDF>')
-            xmp_lines.append('</x:xmpmeta>')
-            xmp_lines.append('<?xpacket end="w"?>')
-
-            xmp_str = '\n'.join(xmp_lines)
-
             xf = None
             try:
-                xf = XMPFiles(file_path=save_path, open_forupdate=True)
-                xf.put_xmp(xmp_str)
+                with self.tracer.phase('xmp.inject') as ph:
+                    xf = XMPFiles(file_path=save_path, open_forupdate=True)
+                    xf.put_xmp(xmp_str)
+                    ph.add_bytes(len(xmp_str))
             finally:
                 if xf:
                     try:
@@ -741,67 +1174,107 @@ class MetadataHandler:
         except Exception as e:
             # If libxmp is not present or fails, try fallback: inject XMP packet directly
             try:
-                # Build XMP packet
-                def _escape(s: str) -> str:
-                    import xml.sax.saxutils as sax
-                    return sax.escape(s)
-
-                def _split_items(s: str):
-                    return [p.strip() for p in re.split('[,;]', s) if p.strip()]
-
-                headline = metadata_updates.get('headline') or metadata_updates.get('title') or ''
-                description = metadata_updates.get('description') or metadata_updates.get('comments', '')
-                creator = metadata_updates.get('creator') or metadata_updates.get('authors', '')
-                rights = metadata_updates.get('rights') or metadata_updates.get('copyright', '')
-                subject_val = metadata_updates.get('subject', '')
-                date_created = metadata_updates.get('date_created', '')
-
-                xmp_lines = [
-                    '<?xpacket begin="﻿" id="W5M0MpCehiHzreSzNTczkc9d"?>',
-                    '<x:xmpmeta xmlns:x="adobe:ns:meta/">',
-                    '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">',
-                    '<rdf:Description xmlns:dc="http://purl.org/dc/elements/1.1/" '
-                    'xmlns:photoshop="http://ns.adobe.com/photoshop/1.0/" '
-                    'xmlns:xmp="http://ns.adobe.com/xap/1.0/"'
-                    f'{(" photoshop:Headline=\"" + _escape(headline) + "\"") if headline else ""}'
-                    f'{(" xmp:CreateDate=\"" + _escape(date_created) + "\"") if date_created else ""}'
-                    f'{(" photoshop:DateCreated=\"" + _escape(date_created) + "\"") if date_created else ""}'
-                    '>'
-                ]
-                if description:
-                    xmp_lines.append(f'<dc:description><rdf:Alt><rdf:li xml:lang="x-default">{_escape(description)}</rdf:li></rdf:Alt></dc:description>')
-                if creator:
-                    creator_items = ''.join([f'<rdf:li>{_escape(a.strip())}</rdf:li>' for a in (_split_items(creator) if isinstance(creator, str) else [creator]) if a])
-                    xmp_lines.append(f'<dc:creator><rdf:Seq>{creator_items}</rdf:Seq></dc:creator>')
-                
-                subj_items = []
-                if subject_val:
-                    if isinstance(subject_val, str):
-                        subj_items.extend([_escape(s) for s in _split_items(subject_val)])
-                    elif isinstance(subject_val, list):
-                        subj_items.extend([_escape(str(s)) for s in subject_val if str(s).strip()])
-                if subj_items:
-                    tag_items = ''.join([f'<rdf:li>{s}</rdf:li>' for s in subj_items])
-                    xmp_lines.append(f'<dc:subject><rdf:Bag>{tag_items}</rdf:Bag></dc:subject>')
-                
-                if rights:
-                    xmp_lines.append(f'<dc:rights><rdf:Alt><rdf:li xml:lang="x-default">{_escape(rights)}</rdf:li></rdf:Alt></dc:rights>')
-
-                xmp_lines.append('</rdf:Description>')
-                xmp_lines.append('</rdf:RDF>')
-                xmp_lines.append('</x:xmpmeta>')
-                xmp_lines.append('<?xpacket end="w"?>')
+                xmp_packet = xmp_str.encode('utf-8')
 
-                xmp_packet = '\n'.join(xmp_lines).encode('utf-8')
-                
                 # Inject XMP into JPEG APP1 marker
                 if self.get_file_extension(save_path) in ('.jpg', '.jpeg'):
-                    self._inject_xmp_into_jpeg(save_path, xmp_packet)
+                    with self.tracer.phase('xmp.inject') as ph:
+                        self._inject_xmp_into_jpeg(save_path, xmp_packet)
+                        ph.add_bytes(len(xmp_packet))
             except Exception as fallback_err:
                 self.last_error = f"Error writing XMP (libxmp and fallback both failed): {str(e)}, {str(fallback_err)}"
 
         return True
 
+    def _render_updates(self, updates, file_path: str, exif_dict: Optional[Dict[str, Any]],
+                        index: Optional[int]) -> Dict[str, Any]:
+        """
+        Render a CompiledTemplate for one file (plain dicts pass through).
+        exif_dict: the piexif-style dict already loaded by the caller; loaded
+        header-only here only if the template references EXIF and none was given.
+        """
+        if not isinstance(updates, CompiledTemplate):
+            return updates
+        if updates.is_static:
+            return updates.render(file_path, index)
+
+        exif_values: Dict[str, Any] = {}
+        exif_names = updates.fields('exif')
+        if exif_names:
+            if exif_dict is None:
+                exif_dict = self._load_exif_dict(file_path)
+            for name in exif_names:
+                for ifd, tag in self._exif_tags_named(name):
+                    value = (exif_dict.get(ifd) or {}).get(tag)
+                    if value is not None:
+                        exif_values[name] = value
+                        break
+
+        xmp_values: Dict[str, Any] = {}
+        xmp_names = updates.fields('xmp')
+        if xmp_names:
+            existing = {k.lower(): v for k, v in self._read_xmp(file_path).items()}
+            for name in xmp_names:
+                if name.lower() in existing:
+                    xmp_values[name] = existing[name.lower()]
+
+        return updates.render(file_path, index, exif_values, xmp_values)
+
+    def _load_exif_dict(self, file_path: str) -> Dict[str, Any]:
+        """piexif-style EXIF dict for any supported container ({} if none)."""
+        ext = self.get_file_extension(file_path)
+        try:
+            with self.tracer.phase('piexif.load'):
+                if ext == '.png':
+                    data = self._png_metadata(file_path).get('exif')
+                    return piexif.load(data) if data else {}
+                if ext in ('.tif', '.tiff'):
+                    return read_tiff_tags(file_path)
+                if ext in self.RAW_FORMATS:
+                    return read_raw_tags(file_path)
+                if ext in self.CONTAINER_FORMATS:
+                    data = self._container_metadata(file_path)['exif']
+                    return read_tiff_tags_from(io.BytesIO(data)) if data else {}
+                if ext in ('.jpg', '.jpeg'):
+                    return read_jpeg_exif_tags(file_path)
+                return piexif.load(file_path)
+        except Exception:
+            return {}
+
+    _EXIF_NAME_INDEX: Optional[Dict[str, List[tuple]]] = None
+
+    @classmethod
+    def _exif_tags_named(cls, name: str) -> List[tuple]:
+        """(ifd, tag) pairs for an EXIF tag name (case-insensitive), e.g. 'Model'."""
+        if cls._EXIF_NAME_INDEX is None:
+            index: Dict[str, List[tuple]] = {}
+            for ifd in ('0th', 'Exif', 'GPS', 'Interop'):
+                for tag, info in piexif.TAGS.get(ifd, {}).items():
+                    index.setdefault(info['name'].lower(), []).append((ifd, tag))
+            cls._EXIF_NAME_INDEX = index
+        return cls._EXIF_NAME_INDEX.get(name.lower(), [])
+
+    def _edit_tiff_in_place(self, file_path: str, save_path: str, metadata_updates: Dict[str, Any]):
+        """
+        Patch TIFF/BigTIFF metadata without touching image data: updated IFD0 and
+        Exif IFDs (with the XMP packet in tag 700) are appended to the file.
+        """
+        purge = metadata_updates.get('purge_non_camera', True)
+        # Field mapping only; purging is done per tag below so structural tags survive
+        fields = self._apply_exif_updates({'0th': {}, 'Exif': {}},
+                                          dict(metadata_updates, purge_non_camera=False))
+        set_0th = {tag: (piexif.TAGS['Image'][tag]['type'], value) for tag, value in fields['0th'].items()}
+        set_exif = {tag: (piexif.TAGS['Exif'][tag]['type'], value) for tag, value in fields['Exif'].items()}
+        set_0th[700] = (1, self._build_xmp_packet(metadata_updates).encode('utf-8'))
+
+        with self.tracer.phase('tiff.patch') as ph:
+            written = patch_tiff_metadata(
+                file_path, set_0th, set_exif,
+                remove_0th=self.TIFF_DESCRIPTIVE_TAGS if purge else (),
+                keep_exif=self.CAMERA_EXIF_TAGS if purge else None,
+                output_path=save_path)
+            ph.add_bytes(written)
+
     def _inject_xmp_into_jpeg(self, file_path: str, xmp_packet: bytes):
         """Inject XMP packet into JPEG file as APP1 marker."""
         try:
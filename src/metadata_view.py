@@ -0,0 +1,298 @@
+"""
+Metadata View Module
+Row model behind the virtual metadata details view.
+
+read_metadata() returns flat EXIF and XMP dicts that can hold thousands of
+tags, some with multi-KB values (MakerNote, embedded thumbnails). The model
+groups them by IFD (EXIF) and schema (XMP). It keeps only (group, key) index
+pairs for the visible rows. A row's text is formatted when the view asks for
+it, i.e. when the row scrolls into view, and values are truncated to
+MAX_CELL_CHARS there. full_value() renders one complete value on demand.
+
+The XMP dict is keyed by local name, so schemas are recovered from a table of
+well-known property names; anything else is listed under "XMP: Other".
+Searching matches keys and values case-insensitively. When the query extends
+the previous one, only the previous matches are searched again, so typing
+into the search box stays fast.
+
+LiveMetadataDocument backs the live JSON panel next to the preview. It keeps
+the rendered text as one segment per key, and update() returns line-based
+edits for only the segments that changed. The panel can then patch its text
+control in place instead of replacing (and re-scrolling) the whole text.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import piexif
+
+# Longest value shown in a list cell; the full value is rendered on demand
+MAX_CELL_CHARS = 200
+# Characters of each value considered by search (bounds work on huge values)
+MAX_SEARCH_CHARS = 4096
+
+EXIF_GROUPS = [('0th', "EXIF: Image (IFD0)"), ('Exif', "EXIF: Exif IFD"), ('GPS', "EXIF: GPS IFD"),
+               ('Interop', "EXIF: Interop IFD"), (None, "EXIF: Other")]
+XMP_SCHEMAS = {
+    'dc': ('title', 'description', 'creator', 'subject', 'rights', 'format', 'date', 'contributor',
+           'coverage', 'identifier', 'language', 'publisher', 'relation', 'source', 'type'),
+    'photoshop': ('Headline', 'City', 'State', 'Country', 'Credit', 'Source', 'Instructions',
+                  'DateCreated', 'AuthorsPosition', 'CaptionWriter', 'Category', 'SupplementalCategories',
+                  'TransmissionReference', 'Urgency', 'ColorMode', 'ICCProfile'),
+    'xmp': ('CreateDate', 'ModifyDate', 'MetadataDate', 'CreatorTool', 'Rating', 'Label', 'Nickname',
+            'Identifier', 'BaseURL', 'Thumbnails'),
+    'xmpRights': ('Marked', 'WebStatement', 'UsageTerms', 'Owner', 'Certificate'),
+    'xmpMM': ('DocumentID', 'InstanceID', 'OriginalDocumentID', 'DerivedFrom', 'History', 'PreservedFileName'),
+    'Iptc4xmpCore': ('Location', 'CountryCode', 'IntellectualGenre', 'Scene', 'SubjectCode',
+                     'CreatorContactInfo'),
+}
+XMP_GROUP_ORDER = [f"XMP: {prefix}" for prefix in XMP_SCHEMAS] + ["XMP: Other"]
+
+_EXIF_IFD_BY_NAME: Optional[Dict[str, str]] = None
+
+
+def _exif_ifd(name: str) -> Optional[str]:
+    """IFD ('0th', 'Exif', 'GPS', 'Interop') a piexif tag name belongs to, or None."""
+    global _EXIF_IFD_BY_NAME
+    if _EXIF_IFD_BY_NAME is None:
+        index: Dict[str, str] = {}
+        for ifd, _label in EXIF_GROUPS[:-1]:
+            for info in piexif.TAGS.get(ifd, {}).values():
+                index.setdefault(info['name'], ifd)
+        _EXIF_IFD_BY_NAME = index
+    return _EXIF_IFD_BY_NAME.get(name)
+
+
+_XMP_SCHEMA_BY_NAME = {name: prefix for prefix, names in XMP_SCHEMAS.items() for name in names}
+
+
+def format_value(value: Any, limit: Optional[int] = None) -> str:
+    """Display text of a value (lists joined with ', '), cut to limit characters if given."""
+    if limit is not None and isinstance(value, (bytes, str)) and len(value) > limit:
+        # Never render more of a huge value than can be shown
+        unit = 'bytes' if isinstance(value, bytes) else 'chars'
+        return format_value(value[:limit])[:limit] + f" … ({len(value)} {unit})"
+    if isinstance(value, (list, tuple)):
+        text = ', '.join(str(i) for i in value)
+    else:
+        try:
+            text = str(value)
+        except Exception:
+            text = repr(value)
+    if limit is not None and len(text) > limit:
+        return text[:limit] + f" … ({len(text)} chars)"
+    return text
+
+
+def group_metadata(metadata: Dict[str, Any]) -> List[Tuple[str, List[Tuple[str, Any]]]]:
+    """[(group label, [(key, value), ...]), ...] for the EXIF and XMP sections; empty groups are left out."""
+    buckets: Dict[str, List[Tuple[str, Any]]] = {}
+    for key, value in (metadata.get('exif') or {}).items():
+        ifd = _exif_ifd(key)
+        label = next(lbl for name, lbl in EXIF_GROUPS if name == ifd)
+        buckets.setdefault(label, []).append((key, value))
+    for key, value in (metadata.get('xmp') or {}).items():
+        prefix = _XMP_SCHEMA_BY_NAME.get(key)
+        buckets.setdefault(f"XMP: {prefix}" if prefix else "XMP: Other", []).append((key, value))
+    order = [lbl for _, lbl in EXIF_GROUPS] + XMP_GROUP_ORDER
+    return [(label, sorted(buckets[label], key=lambda kv: kv[0].lower())) for label in order if label in buckets]
+
+
+class MetadataRowModel:
+    """
+    Visible rows of a grouped metadata view. A row is (group index, item index),
+    with item index None for a group header. Headers toggle collapse.
+    """
+
+    def __init__(self, metadata: Dict[str, Any], max_chars: int = MAX_CELL_CHARS):
+        self.groups = group_metadata(metadata)
+        self.max_chars = max_chars
+        self.collapsed: set = set()
+        self.query = ''
+        self._matches: Optional[List[List[int]]] = None  # per group, None = no filter
+        self._search_text: Dict[Tuple[int, int], str] = {}
+        self.rows: List[Tuple[int, Optional[int]]] = []
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def field_count(self) -> int:
+        return sum(len(items) for _, items in self.groups)
+
+    def match_count(self) -> int:
+        """Fields matching the current search (all fields when there is none)."""
+        if self._matches is None:
+            return self.field_count()
+        return sum(len(m) for m in self._matches)
+
+    def _rebuild(self):
+        rows: List[Tuple[int, Optional[int]]] = []
+        for g, (_label, items) in enumerate(self.groups):
+            visible = range(len(items)) if self._matches is None else self._matches[g]
+            if not visible:
+                continue
+            rows.append((g, None))
+            if g not in self.collapsed:
+                rows.extend((g, i) for i in visible)
+        self.rows = rows
+
+    def is_group(self, row: int) -> bool:
+        return self.rows[row][1] is None
+
+    def toggle(self, row: int):
+        """Collapse or expand the group of a header row."""
+        g, i = self.rows[row]
+        if i is not None:
+            return
+        if g in self.collapsed:
+            self.collapsed.discard(g)
+        else:
+            self.collapsed.add(g)
+        self._rebuild()
+
+    def cell_text(self, row: int, column: int) -> str:
+        """Text of one cell (column 0 = key or group header, 1 = value), formatted on request."""
+        g, i = self.rows[row]
+        label, items = self.groups[g]
+        if i is None:
+            if column:
+                return ''
+            count = len(items) if self._matches is None else len(self._matches[g])
+            return f"{'▸' if g in self.collapsed else '▾'} {label} ({count})"
+        key, value = items[i]
+        return f"  {key}" if column == 0 else format_value(value, self.max_chars)
+
+    def full_value(self, row: int) -> str:
+        """Complete, untruncated value of a field row ('' for headers)."""
+        g, i = self.rows[row]
+        if i is None:
+            return ''
+        return format_value(self.groups[g][1][i][1])
+
+    def _haystack(self, g: int, i: int) -> str:
+        text = self._search_text.get((g, i))
+        if text is None:
+            key, value = self.groups[g][1][i]
+            text = f"{key}\n{format_value(value, MAX_SEARCH_CHARS)}".lower()
+            self._search_text[(g, i)] = text
+        return text
+
+    def search(self, query: str):
+        """Show only fields whose key or value contains query (case-insensitive); '' shows all."""
+        query = query.strip().lower()
+        if not query:
+            self._matches = None
+        else:
+            narrowing = self._matches is not None and query.startswith(self.query)
+            matches = []
+            for g, (_label, items) in enumerate(self.groups):
+                candidates = self._matches[g] if narrowing else range(len(items))
+                matches.append([i for i in candidates if query in self._haystack(g, i)])
+            self._matches = matches
+        self.query = query
+        self._rebuild()
+
+    def full_text(self) -> str:
+        """Every field, untruncated, under a heading per group (for copying)."""
+        parts: List[str] = []
+        for label, items in self.groups:
+            parts.append(f"=== {label} ===")
+            parts.extend(f"{key}: {format_value(value)}" for key, value in items)
+            parts.append('')
+        return '\n'.join(parts).rstrip('\n')
+
+
+class LiveMetadataDocument:
+    """
+    Pretty-printed JSON of {section: {key: value}} (same text as json.dumps with
+    indent=2 and sorted keys), kept as segments so updates can be applied as
+    line edits. Every segment except the closing brace ends with a newline.
+    """
+
+    def __init__(self, sections: Sequence[str] = ('EXIF', 'XMP')):
+        self.sections = list(sections)
+        self.segments: List[Tuple[tuple, str]] = []  # (segment id, text) in document order
+        self._rendered: Dict[Tuple[str, str], Tuple[Any, str]] = {}  # (section, key) -> (value, body)
+
+    def text(self) -> str:
+        return ''.join(text for _, text in self.segments)
+
+    def reset(self):
+        self.segments = []
+        self._rendered = {}
+
+    def _body(self, section: str, key: str, value: Any) -> str:
+        """Rendered '    "key": value' lines; reused while the value is unchanged."""
+        cached = self._rendered.get((section, key))
+        if cached is not None and cached[0] == value:
+            return cached[1]
+        rendered = json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n    ')
+        body = f"    {json.dumps(key, ensure_ascii=False)}: {rendered}"
+        self._rendered[(section, key)] = (value, body)
+        return body
+
+    def _build(self, data: Dict[str, Dict[str, Any]]) -> List[Tuple[tuple, str]]:
+        segments: List[Tuple[tuple, str]] = [((-1, 0, ''), '{\n')]
+        live = set()
+        for s, section in enumerate(self.sections):
+            values = data.get(section) or {}
+            sep = ',\n' if s < len(self.sections) - 1 else '\n'
+            name = json.dumps(section, ensure_ascii=False)
+            if not values:
+                segments.append(((s, 0, '', 'empty'), f"  {name}: {{}}{sep}"))
+                continue
+            segments.append(((s, 0, '', 'head'), f"  {name}: {{\n"))
+            keys = sorted(values)
+            for n, key in enumerate(keys):
+                live.add((section, key))
+                body = self._body(section, key, values[key])
+                segments.append(((s, 1, key), body + (',\n' if n < len(keys) - 1 else '\n')))
+            segments.append(((s, 2, ''), f"  }}{sep}"))
+        segments.append(((len(self.sections), 0, ''), '}'))
+        for gone in [k for k in self._rendered if k not in live]:
+            del self._rendered[gone]
+        return segments
+
+    def update(self, data: Dict[str, Dict[str, Any]]) -> List[Tuple[int, int, str]]:
+        """
+        Switch to data and return the edits that turn the old text into the new
+        one, as (first line, number of old lines replaced, new text) in document
+        order. Apply them last to first so earlier line numbers stay valid.
+        """
+        old, new = self.segments, self._build(data)
+        edits: List[Tuple[int, int, str]] = []
+        i = j = line = 0
+        while i < len(old) or j < len(new):
+            old_id = old[i][0] if i < len(old) else None
+            new_id = new[j][0] if j < len(new) else None
+            if old_id is not None and (new_id is None or old_id[:3] < new_id[:3]
+                                       or (old_id[:3] == new_id[:3] and old_id != new_id)):
+                n = old[i][1].count('\n')
+                edits.append((line, n, ''))
+                line += n
+                i += 1
+            elif old_id is None or new_id[:3] < old_id[:3]:
+                edits.append((line, 0, new[j][1]))
+                j += 1
+            else:
+                n = old[i][1].count('\n')
+                if old[i][1] != new[j][1]:
+                    edits.append((line, n, new[j][1]))
+                line += n
+                i += 1
+                j += 1
+        self.segments = new
+        return self._merge(edits)
+
+    @staticmethod
+    def _merge(edits: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+        """Join edits that touch consecutive lines into one."""
+        merged: List[Tuple[int, int, str]] = []
+        for first, count, text in edits:
+            if merged and merged[-1][0] + merged[-1][1] == first:
+                prev_first, prev_count, prev_text = merged[-1]
+                merged[-1] = (prev_first, prev_count + count, prev_text + text)
+            else:
+                merged.append((first, count, text))
+        return merged
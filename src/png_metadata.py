@@ -0,0 +1,211 @@
+"""
+PNG Metadata Module
+Chunk-level reading and writing of PNG metadata without decoding pixels.
+
+Handles eXIf (raw TIFF-structured EXIF), iTXt XMP (keyword "XML:com.adobe.xmp"),
+and tEXt / zTXt / iTXt text chunks. Rewrites stream every other chunk (IDAT
+included) through unchanged, byte for byte; CRCs are computed only for the
+chunks that are written anew.
+"""
+
+import os
+import struct
+import tempfile
+import zlib
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+XMP_KEYWORD = 'XML:com.adobe.xmp'
+TEXT_CHUNKS = (b'tEXt', b'zTXt', b'iTXt')
+# Ancillary chunks that only carry metadata (dropped by strip_png_metadata)
+METADATA_CHUNKS = (b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME')
+
+_COPY_BLOCK = 1024 * 1024
+
+
+def is_png(file_path: str) -> bool:
+    """Check the PNG signature."""
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read(8) == PNG_SIGNATURE
+    except Exception:
+        return False
+
+
+def iter_chunks(f) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    Yield (chunk_type, data_length, chunk_start) for every chunk of an open PNG.
+    The file position after each yield is undefined; data is not read.
+    """
+    f.seek(0)
+    if f.read(8) != PNG_SIGNATURE:
+        raise ValueError("Not a valid PNG file")
+    pos = 8
+    while True:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        length, ctype = struct.unpack('>I4s', header)
+        yield ctype, length, pos
+        pos += 12 + length
+        if ctype == b'IEND':
+            return
+
+
+def _read_chunk_data(f, chunk_start: int, length: int) -> bytes:
+    f.seek(chunk_start + 8)
+    return f.read(length)
+
+
+def _decode_text_chunk(ctype: bytes, data: bytes) -> Optional[Tuple[str, str]]:
+    """Decode a tEXt/zTXt/iTXt payload into (keyword, text)."""
+    try:
+        keyword, _, rest = data.partition(b'\x00')
+        key = keyword.decode('latin-1')
+        if ctype == b'tEXt':
+            return key, rest.decode('latin-1')
+        if ctype == b'zTXt':
+            # compression method byte, then zlib stream
+            return key, zlib.decompress(rest[1:]).decode('latin-1')
+        if ctype == b'iTXt':
+            comp_flag, _method = rest[0], rest[1]
+            rest = rest[2:]
+            _lang, _, rest = rest.partition(b'\x00')
+            _translated, _, text = rest.partition(b'\x00')
+            if comp_flag:
+                text = zlib.decompress(text)
+            return key, text.decode('utf-8', errors='replace')
+    except Exception:
+        return None
+    return None
+
+
+def read_png_metadata(file_path: str) -> Dict[str, Any]:
+    """
+    Read metadata chunks from a PNG.
+    Returns: dict with 'exif' (TIFF bytes or None), 'xmp' (packet str or None),
+    and 'text' (keyword -> text for tEXt/zTXt/iTXt, excluding XMP).
+    IDAT and other chunks are skipped by seeking, never read.
+    """
+    result: Dict[str, Any] = {'exif': None, 'xmp': None, 'text': {}}
+    with open(file_path, 'rb') as f:
+        for ctype, length, start in iter_chunks(f):
+            if ctype == b'eXIf':
+                result['exif'] = _read_chunk_data(f, start, length)
+            elif ctype in TEXT_CHUNKS:
+                decoded = _decode_text_chunk(ctype, _read_chunk_data(f, start, length))
+                if not decoded:
+                    continue
+                key, text = decoded
+                if key == XMP_KEYWORD:
+                    result['xmp'] = text
+                else:
+                    result['text'][key] = text
+    return result
+
+
+def make_chunk(ctype: bytes, data: bytes) -> bytes:
+    """Serialize one chunk with its CRC."""
+    return struct.pack('>I', len(data)) + ctype + data + struct.pack('>I', zlib.crc32(ctype + data) & 0xFFFFFFFF)
+
+
+def make_itxt_chunk(keyword: str, text: str, compress: bool = False) -> bytes:
+    """Build an iTXt chunk (uncompressed by default, as XMP readers expect)."""
+    payload = text.encode('utf-8')
+    if compress:
+        payload = zlib.compress(payload)
+    data = keyword.encode('latin-1') + b'\x00' + bytes([1 if compress else 0, 0]) + b'\x00\x00' + payload
+    return make_chunk(b'iTXt', data)
+
+
+def make_text_chunk(keyword: str, text: str) -> bytes:
+    """Build a tEXt chunk, or an iTXt chunk when the text is not Latin-1."""
+    try:
+        return make_chunk(b'tEXt', keyword.encode('latin-1') + b'\x00' + text.encode('latin-1'))
+    except UnicodeEncodeError:
+        return make_itxt_chunk(keyword, text)
+
+
+def _copy_range(src, dst, start: int, length: int):
+    src.seek(start)
+    remaining = length
+    while remaining > 0:
+        block = src.read(min(_COPY_BLOCK, remaining))
+        if not block:
+            raise ValueError("Truncated PNG chunk")
+        dst.write(block)
+        remaining -= len(block)
+
+
+def _rewrite(file_path: str, output_path: Optional[str], drop, new_chunks: bytes):
+    """
+    Stream file_path to output_path (or in place via a temp file), dropping chunks
+    for which drop(ctype, data_reader) is true and inserting new_chunks after IHDR.
+    """
+    save_path = output_path or file_path
+    out_dir = os.path.dirname(os.path.abspath(save_path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.png_meta_', suffix='.tmp', dir=out_dir)
+    try:
+        with open(file_path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+            dst.write(PNG_SIGNATURE)
+            for ctype, length, start in iter_chunks(src):
+                if drop(ctype, lambda: _read_chunk_data(src, start, length)):
+                    continue
+                _copy_range(src, dst, start, length + 12)
+                if ctype == b'IHDR' and new_chunks:
+                    dst.write(new_chunks)
+        if os.path.exists(save_path):
+            try:
+                os.chmod(tmp_path, os.stat(save_path).st_mode & 0o7777)
+            except Exception:
+                pass
+        os.replace(tmp_path, save_path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except Exception:
+            pass
+        raise
+
+
+def write_png_metadata(file_path: str, output_path: Optional[str] = None,
+                       exif: Optional[bytes] = None, xmp: Optional[bytes] = None,
+                       text: Optional[Dict[str, str]] = None) -> None:
+    """
+    Replace metadata chunks of a PNG.
+    exif: raw TIFF-structured EXIF for the eXIf chunk (a leading "Exif\\0\\0" is removed).
+    xmp: XMP packet for the iTXt XML:com.adobe.xmp chunk.
+    text: keyword -> text for tEXt chunks; existing chunks with these keywords are replaced.
+    Arguments left as None keep the existing chunks. Raises on malformed input.
+    """
+    text = text or {}
+    if exif is not None and exif.startswith(b'Exif\x00\x00'):
+        exif = exif[6:]
+
+    def drop(ctype: bytes, read_data) -> bool:
+        if ctype == b'eXIf':
+            return exif is not None
+        if ctype in TEXT_CHUNKS and (xmp is not None or text):
+            decoded = _decode_text_chunk(ctype, read_data())
+            if decoded is None:
+                return False
+            key = decoded[0]
+            return (key == XMP_KEYWORD and xmp is not None) or key in text
+        return False
+
+    new_chunks = b''
+    if exif is not None:
+        new_chunks += make_chunk(b'eXIf', exif)
+    if xmp is not None:
+        packet = xmp.decode('utf-8') if isinstance(xmp, (bytes, bytearray)) else str(xmp)
+        new_chunks += make_itxt_chunk(XMP_KEYWORD, packet)
+    for key, value in text.items():
+        new_chunks += make_text_chunk(key, str(value))
+
+    _rewrite(file_path, output_path, drop, new_chunks)
+
+
+def strip_png_metadata(file_path: str, output_path: Optional[str] = None) -> None:
+    """Remove eXIf, text (including XMP) and tIME chunks; image chunks are copied as-is."""
+    _rewrite(file_path, output_path, lambda ctype, _read: ctype in METADATA_CHUNKS, b'')
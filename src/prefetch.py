@@ -0,0 +1,211 @@
+"""
+Prefetch Module
+Background loading of metadata and scaled previews for the queue rows around
+the current selection, and the fast first stage of the editor preview.
+
+While an editor arrows through the queue, NeighbourPrefetcher loads the next
+and previous `radius` rows on a single worker thread and keeps the results, so
+selecting a neighbour only has to display already-parsed metadata and an
+already-scaled preview. Each focus() call supersedes the previous one:
+queued work for the old selection is dropped and entries outside the new
+window are evicted. A load that is already running finishes, and its result
+is kept only if the file is still in the window.
+
+Entries are keyed on the absolute path and are only returned while the file's
+(mtime_ns, size) still match, so edits made in the meantime are never shown
+stale. The loader is a plain callable, so this module does not depend on wx.
+
+read_editor_fields() is the first stage of a progressive preview. It returns
+only the five editor fields, taken from the catalog or from a header-only
+read_fields() call, so the editor can be filled before the full parse and the
+thumbnail are ready.
+"""
+
+import io
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from metadata_handler import MetadataHandler
+
+# Rows prefetched on each side of the selection
+PREFETCH_RADIUS = 4
+# Bounding box of the editor's preview thumbnail
+PREVIEW_SIZE = (320, 240)
+# Fields the five editor boxes are derived from (XMP names, then EXIF fallbacks)
+EDITOR_SOURCE_FIELDS = ['Headline', 'description', 'creator', 'subject', 'rights',
+                        'UserComment', 'ImageDescription', 'Artist', 'XPKeywords', 'XPSubject', 'Copyright']
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def editor_fields(values: Dict[str, Any]) -> Dict[str, str]:
+    """
+    The five editor values from XMP/EXIF field values (flat name -> value, as
+    returned by read_fields(), or an exif dict updated with the xmp dict).
+    XMP is preferred; Headline never falls back to EXIF ImageDescription,
+    which usually holds the description.
+    """
+    def text(value: Any) -> str:
+        if isinstance(value, (list, tuple)):
+            return '; '.join(str(v) for v in value)
+        return str(value) if value else ''
+
+    subject = values.get('subject') or values.get('XPKeywords') or values.get('XPSubject') or []
+    subject = ', '.join(str(t) for t in subject) if isinstance(subject, (list, tuple)) else text(subject)
+    return {
+        'headline': text(values.get('Headline', '')).strip(),
+        'description': text(values.get('description') or values.get('UserComment')
+                            or values.get('ImageDescription', '')).strip(),
+        'creator': text(values.get('creator') or values.get('Artist', '')).strip(),
+        'subject': subject.strip(),
+        'rights': text(values.get('rights') or values.get('Copyright', '')).strip(),
+    }
+
+
+def read_editor_fields(handler: MetadataHandler, file_path: str, catalog=None) -> Optional[Dict[str, str]]:
+    """
+    Editor field values by the fastest available route: the catalog if its
+    entry is still valid, else a header-only read_fields() call (stored back
+    in the catalog). None if the file is missing or unsupported.
+    """
+    if catalog is not None:
+        cached = catalog.get_editor_fields(file_path)
+        if cached is not None:
+            return cached
+    if not os.path.exists(file_path) or not handler.is_supported(file_path):
+        return None
+    try:
+        fields = editor_fields(handler.read_fields(file_path, EDITOR_SOURCE_FIELDS))
+    except Exception:
+        return None
+    if catalog is not None:
+        catalog.put_editor_fields(file_path, fields)
+    return fields
+
+
+def load_scaled_preview(handler: MetadataHandler, file_path: str,
+                        max_size: Tuple[int, int] = PREVIEW_SIZE) -> Optional[Tuple[int, int, bytes]]:
+    """
+    Decode and scale a preview with Pillow, off the GUI thread.
+    Returns (width, height, RGB bytes) or None if Pillow cannot open the file.
+    RAW files use their embedded JPEG preview; JPEGs are decoded at reduced
+    scale (draft mode) before the high-quality downscale.
+    """
+    try:
+        preview = handler.read_preview(file_path)
+        with Image.open(io.BytesIO(preview) if preview else file_path) as img:
+            if img.format == 'JPEG':
+                img.draft('RGB', max_size)
+            img = img.convert('RGB')
+            img.thumbnail(max_size, Image.LANCZOS)
+            return (img.width, img.height, img.tobytes())
+    except Exception:
+        return None
+
+
+class NeighbourPrefetcher:
+    """
+    Keep load(path) results for the rows around the selection, loaded in the
+    background. on_loaded(abspath, value), if given, is called on the worker
+    thread after each load (GUI code should hand it to its event loop).
+    """
+
+    def __init__(self, load: Callable[[str], Any], radius: int = PREFETCH_RADIUS,
+                 on_loaded: Optional[Callable[[str, Any], None]] = None):
+        self._load = load
+        self._on_loaded = on_loaded
+        self.radius = radius
+        self._cond = threading.Condition()
+        self._pending: deque = deque()
+        self._window: set = set()
+        self._entries: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='neighbour-prefetch', daemon=True)
+        self._thread.start()
+
+    def focus(self, paths: Sequence[str], index: int):
+        """Select paths[index]: drop queued work and prefetch its neighbours, nearest first."""
+        order = [index]
+        for step in range(1, self.radius + 1):
+            order.extend((index + step, index - step))
+        wanted = [os.path.abspath(paths[i]) for i in order if 0 <= i < len(paths)]
+        with self._cond:
+            self._window = set(wanted)
+            for key in [k for k in self._entries if k not in self._window]:
+                del self._entries[key]
+            self._pending = deque(wanted)
+            self._cond.notify()
+
+    def get(self, path: str) -> Optional[Any]:
+        """The prefetched value for path, or None if absent or the file changed since."""
+        key = os.path.abspath(path)
+        with self._cond:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != _signature(key):
+            self.invalidate(key)
+            return None
+        return entry[1]
+
+    def put(self, path: str, value: Any):
+        """Store a value loaded on the caller's thread (e.g. for the selected row)."""
+        key = os.path.abspath(path)
+        sig = _signature(key)
+        if sig is None:
+            return
+        with self._cond:
+            self._entries[key] = (sig, value)
+
+    def invalidate(self, path: Optional[str] = None):
+        """Forget one path, or everything when path is None."""
+        with self._cond:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def close(self):
+        """Stop the worker thread; queued work is discarded."""
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                key = self._pending.popleft()
+                if key in self._entries:
+                    continue
+            sig = _signature(key)
+            if sig is None:
+                continue
+            try:
+                value = self._load(key)
+            except Exception:
+                continue
+            with self._cond:
+                # Keep the result if the file is still wanted, even after a newer focus()
+                if key not in self._window or key in self._entries:
+                    continue
+                self._entries[key] = (sig, value)
+            if self._on_loaded is not None:
+                try:
+                    self._on_loaded(key, value)
+                except Exception:
+                    pass
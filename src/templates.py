@@ -1,13 +1,136 @@
 """
 Template Manager Module
 Handles creation, saving, loading, and applying metadata templates.
+
+Templates are kept in an in-memory index (self.templates) that is rescanned
+only when the templates directory's mtime changes; a rescan re-parses only
+files whose mtime/size changed. Writes go through a temp file and os.replace.
+
+Template values may contain per-file placeholders ({filename}, {index},
+{exif.Model}, {xmp.creator}, ...); CompiledTemplate parses them once and
+renders them per file.
 """
 
+import copy
 import json
 import os
+import string
+import tempfile
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Mapping, Optional, Set
+
+
+# Placeholder roots understood by CompiledTemplate
+PLACEHOLDER_FIELDS = ('filename', 'stem', 'index')
+PLACEHOLDER_NAMESPACES = ('exif', 'xmp')
+
+_formatter = string.Formatter()
+_CONVERSIONS = {'s': str, 'r': repr, 'a': ascii}
+
+
+def _placeholder_text(value: Any) -> str:
+    """Render an EXIF/XMP value as placeholder text."""
+    if value is None:
+        return ''
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode('utf-8', errors='replace').rstrip('\x00').strip()
+    if isinstance(value, tuple) and len(value) == 2 and all(isinstance(v, int) for v in value):
+        num, den = value
+        return f"{num / den:g}" if den else str(num)
+    if isinstance(value, (list, tuple)):
+        return ', '.join(_placeholder_text(v) for v in value)
+    return str(value)
+
+
+class CompiledTemplate:
+    """
+    Template metadata with placeholders parsed once, rendered per file.
+    A value is a template only if it parses and references at least one known
+    placeholder; anything else (e.g. "{draft}", "{{x}}" or "a { b") is kept literally.
+    Raises ValueError when a template value also contains an unknown placeholder,
+    or indexes into a field (e.g. "{exif.Model.x}").
+    """
+
+    def __init__(self, metadata: Dict[str, Any]):
+        self.metadata = dict(metadata)
+        # key -> list of (literal, root, name, format_spec, conversion) segments
+        self._compiled: Dict[str, List[tuple]] = {}
+        self._needs: Dict[str, Set[str]] = {ns: set() for ns in PLACEHOLDER_NAMESPACES}
+        for key, value in self.metadata.items():
+            if not isinstance(value, str) or '{' not in value and '}' not in value:
+                continue
+            try:
+                parsed = list(_formatter.parse(value))
+            except ValueError:
+                continue
+            segments, unknown, needs, known = [], [], set(), 0
+            for literal, field, spec, conversion in parsed:
+                if field is None:
+                    segments.append((literal, None, None, None, None))
+                    continue
+                root, _, name = field.partition('.')
+                if root in PLACEHOLDER_NAMESPACES and ('.' in name or '[' in name):
+                    raise ValueError(f"Attribute or index access is not supported: {{{field}}} in {key}")
+                if conversion and conversion not in _CONVERSIONS:
+                    unknown.append(f"{field}!{conversion}")
+                elif root in PLACEHOLDER_NAMESPACES and name:
+                    needs.add((root, name))
+                    known += 1
+                elif root in PLACEHOLDER_FIELDS and not name:
+                    known += 1
+                else:
+                    unknown.append(field)
+                segments.append((literal, root, name, spec or '', conversion))
+            if not known:
+                # No placeholder of ours: the braces are part of the text
+                continue
+            if unknown:
+                raise ValueError(f"Unknown placeholder {{{unknown[0]}}} in {key}")
+            for root, name in needs:
+                self._needs[root].add(name)
+            self._compiled[key] = segments
+
+    @property
+    def is_static(self) -> bool:
+        """True when no value contains a placeholder."""
+        return not self._compiled
+
+    def fields(self, namespace: str) -> Set[str]:
+        """Names referenced under a namespace ('exif' or 'xmp')."""
+        return self._needs.get(namespace, set())
+
+    def render(self, file_path: str, index: Optional[int] = None,
+               exif: Optional[Mapping[str, Any]] = None,
+               xmp: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Return the metadata dict for one file.
+        exif / xmp: name -> value lookups for the referenced fields (missing values render empty).
+        """
+        if not self._compiled:
+            return dict(self.metadata)
+        name = os.path.basename(file_path)
+        simple = {'filename': name, 'stem': os.path.splitext(name)[0], 'index': index if index is not None else 0}
+        lookups = {'exif': exif or {}, 'xmp': xmp or {}}
+        out = dict(self.metadata)
+        for key, segments in self._compiled.items():
+            parts = []
+            for literal, root, field, spec, conversion in segments:
+                parts.append(literal)
+                if root is None:
+                    continue
+                if field:
+                    value = _placeholder_text(lookups[root].get(field))
+                else:
+                    value = simple[root]
+                if conversion:
+                    value = _CONVERSIONS[conversion](value)
+                try:
+                    parts.append(format(value, spec))
+                except (ValueError, TypeError):
+                    parts.append(str(value))
+            out[key] = ''.join(parts)
+        return out
 
 
 class TemplateManager:
@@ -21,9 +144,72 @@ class TemplateManager:
         self.templates_dir = templates_dir or Path.home() / '.metadata_manipulator' / 'templates'
         self.templates_dir = Path(self.templates_dir)
         self.templates_dir.mkdir(parents=True, exist_ok=True)
+        # name -> template data, and name -> (mtime_ns, size) of the parsed file
         self.templates = {}
+        self._stamps = {}
+        self._dir_mtime_ns = None
         self.last_error = None
 
+    # Index maintenance
+
+    def _template_path(self, name: str) -> Path:
+        return self.templates_dir / f"{name}.json"
+
+    def _parse_file(self, name: str, path: Path, stamp) -> bool:
+        """Parse one template file into the index. Returns False if unreadable."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.templates[name] = json.load(f)
+            self._stamps[name] = stamp
+            return True
+        except Exception as e:
+            self.templates.pop(name, None)
+            self._stamps.pop(name, None)
+            self.last_error = f"Error loading template {name}: {str(e)}"
+            return False
+
+    def _refresh(self):
+        """Rescan the directory if its mtime changed since the last scan."""
+        try:
+            dir_mtime = os.stat(self.templates_dir).st_mtime_ns
+        except FileNotFoundError:
+            self.templates.clear()
+            self._stamps.clear()
+            self._dir_mtime_ns = None
+            return
+        if dir_mtime == self._dir_mtime_ns:
+            return
+
+        seen = set()
+        with os.scandir(self.templates_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.json') or not entry.is_file():
+                    continue
+                name = entry.name[:-5]
+                seen.add(name)
+                st = entry.stat()
+                stamp = (st.st_mtime_ns, st.st_size)
+                if self._stamps.get(name) != stamp:
+                    self._parse_file(name, Path(entry.path), stamp)
+        for name in set(self.templates) - seen:
+            self.templates.pop(name, None)
+            self._stamps.pop(name, None)
+        self._dir_mtime_ns = dir_mtime
+
+    def _revalidate(self, name: str) -> bool:
+        """Re-parse one template if its file changed in place. Returns False if it is gone."""
+        path = self._template_path(name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.templates.pop(name, None)
+            self._stamps.pop(name, None)
+            return False
+        stamp = (st.st_mtime_ns, st.st_size)
+        if self._stamps.get(name) != stamp:
+            return self._parse_file(name, path, stamp)
+        return True
+
     def create_template(self, name: str, metadata: Dict[str, Any],
                         description: str = "") -> bool:
         """
@@ -39,7 +225,6 @@ class TemplateManager:
                 'created': datetime.now().isoformat(),
                 'metadata': metadata
             }
-            self.templates[name] = template_data
             return self.save_template(name, template_data)
         except Exception as e:
             self.last_error = f"Error creating template: {str(e)}"
@@ -48,21 +233,33 @@ class TemplateManager:
     def save_template(self, name: str, template_data: Dict[str, Any]) -> bool:
         """Save a template to disk."""
         try:
-            template_path = self.templates_dir / f"{name}.json"
-            with open(template_path, 'w', encoding='utf-8') as f:
-                json.dump(template_data, f, indent=2)
+            template_path = self._template_path(name)
+            # Write to a temp file in the same directory, then atomically replace
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix='.tmp', dir=self.templates_dir)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(template_data, f, indent=2)
+                os.replace(tmp_path, template_path)
+            except Exception:
+                try:
+                    os.unlink(tmp_path)
+                except Exception:
+                    pass
+                raise
+            st = os.stat(template_path)
+            self.templates[name] = copy.deepcopy(template_data)
+            self._stamps[name] = (st.st_mtime_ns, st.st_size)
             return True
         except Exception as e:
             self.last_error = f"Error saving template: {str(e)}"
             return False
 
     def load_template(self, name: str) -> Optional[Dict[str, Any]]:
-        """Load a template from disk."""
+        """Load a template (served from the index; returns a copy)."""
         try:
-            template_path = self.templates_dir / f"{name}.json"
-            if template_path.exists():
-                with open(template_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            self._refresh()
+            if self._revalidate(name) and name in self.templates:
+                return copy.deepcopy(self.templates[name])
             self.last_error = f"Template not found: {name}"
             return None
         except Exception as e:
@@ -72,8 +269,8 @@ class TemplateManager:
     def list_templates(self) -> List[str]:
         """Get list of all available template names."""
         try:
-            templates = [f.stem for f in self.templates_dir.glob("*.json")]
-            return sorted(templates)
+            self._refresh()
+            return sorted(self.templates)
         except Exception as e:
             self.last_error = f"Error listing templates: {str(e)}"
             return []
@@ -81,11 +278,11 @@ class TemplateManager:
     def delete_template(self, name: str) -> bool:
         """Delete a template."""
         try:
-            template_path = self.templates_dir / f"{name}.json"
+            template_path = self._template_path(name)
             if template_path.exists():
                 template_path.unlink()
-                if name in self.templates:
-                    del self.templates[name]
+                self.templates.pop(name, None)
+                self._stamps.pop(name, None)
                 return True
             self.last_error = f"Template not found: {name}"
             return False
@@ -103,11 +300,11 @@ class TemplateManager:
     def export_templates(self, export_path: str) -> bool:
         """Export all templates as a single JSON file."""
         try:
-            templates_data = {}
-            for name in self.list_templates():
-                template = self.load_template(name)
-                if template:
-                    templates_data[name] = template
+            self._refresh()
+            # Stat-only check for files edited in place (no directory mtime change)
+            for name in list(self.templates):
+                self._revalidate(name)
+            templates_data = {name: self.templates[name] for name in sorted(self.templates)}
 
             with open(export_path, 'w', encoding='utf-8') as f:
                 json.dump(templates_data, f, indent=2)
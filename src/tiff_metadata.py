@@ -0,0 +1,532 @@
+"""
+TIFF Metadata Module
+Random-access reading of TIFF structures and in-place metadata patching.
+
+Works on classic TIFF, BigTIFF and TIFF-based RAW files (CR2, NEF, ARW, DNG,
+ORF, RW2), and on TIFF structures embedded in other files (e.g. the EXIF
+APP1 segment of a JPEG) via a base offset. Only IFDs and the values that are
+asked for are read; strip/tile data (and RAW sensor data) is never touched.
+
+patch_tiff_metadata() appends a new IFD0 (and Exif sub-IFD) with updated
+tags at the end of the file and re-points the header at it. Existing strip,
+tile and out-of-line tag data stay where they are, so an edit costs a few KB
+of writes regardless of image size.
+"""
+
+import os
+import shutil
+import struct
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+# TIFF field types: size in bytes and struct code (rationals are two codes)
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8,
+              11: 4, 12: 8, 13: 4, 16: 8, 17: 8, 18: 8}
+TYPE_CODES = {1: 'B', 3: 'H', 4: 'I', 6: 'b', 8: 'h', 9: 'i', 11: 'f', 12: 'd',
+              13: 'I', 16: 'Q', 17: 'q', 18: 'Q'}
+ASCII, UNDEFINED, RATIONAL, SRATIONAL = 2, 7, 5, 10
+
+# Header magic numbers accepted after the byte-order mark
+MAGIC_CLASSIC = 42
+MAGIC_BIGTIFF = 43
+MAGIC_RAW = {0x4F52: 'ORF', 0x5352: 'ORF', 0x0055: 'RW2'}
+
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+INTEROP_IFD_POINTER = 0xA005
+
+# Values larger than this are not loaded by read_tags (e.g. huge MakerNotes)
+DEFAULT_MAX_VALUE_BYTES = 1024 * 1024
+# Tighter cap for RAW files, whose IFD0 may hold multi-MB previews as tag values
+RAW_MAX_VALUE_BYTES = 256 * 1024
+
+# Layout tags used to locate embedded previews in RAW files
+NEW_SUBFILE_TYPE = 254
+IMAGE_WIDTH, IMAGE_LENGTH = 256, 257
+COMPRESSION = 259
+STRIP_OFFSETS, STRIP_BYTE_COUNTS = 273, 279
+SUB_IFDS = 330
+JPEG_IF_OFFSET, JPEG_IF_LENGTH = 513, 514
+CR2_SLICE = 0xC640       # marks the sensor-data IFD of a CR2
+RW2_JPG_FROM_RAW = 0x2E  # Panasonic: full-size preview JPEG stored as a tag value
+MAX_IFDS = 32
+
+
+class TiffEntry:
+    """One IFD entry: tag, type, count and where its value lives."""
+
+    __slots__ = ('tag', 'type', 'count', 'raw', 'entry_pos', 'value_pos', 'inline')
+
+    def __init__(self, tag: int, type_: int, count: int, raw: bytes, entry_pos: int,
+                 value_pos: int, inline: bool):
+        self.tag = tag
+        self.type = type_
+        self.count = count
+        self.raw = raw              # the 4/8 byte value-or-offset field as stored
+        self.entry_pos = entry_pos  # absolute file offset of the entry
+        self.value_pos = value_pos  # absolute file offset of the value data
+        self.inline = inline
+
+    @property
+    def size(self) -> int:
+        return TYPE_SIZES.get(self.type, 1) * self.count
+
+
+class TiffFile:
+    """Reader for a TIFF structure starting at `base` in an open binary file."""
+
+    def __init__(self, f, base: int = 0):
+        self.f = f
+        self.base = base
+        f.seek(base)
+        header = f.read(16)
+        if header[:2] == b'II':
+            self.endian = '<'
+        elif header[:2] == b'MM':
+            self.endian = '>'
+        else:
+            raise ValueError("Not a TIFF structure")
+        magic = struct.unpack(self.endian + 'H', header[2:4])[0]
+        self.raw_format = MAGIC_RAW.get(magic)
+        if magic == MAGIC_BIGTIFF:
+            self.bigtiff = True
+            self.header_ifd_pos = base + 8
+            self.first_ifd = struct.unpack(self.endian + 'Q', header[8:16])[0]
+        elif magic == MAGIC_CLASSIC or self.raw_format:
+            self.bigtiff = False
+            self.header_ifd_pos = base + 4
+            self.first_ifd = struct.unpack(self.endian + 'I', header[4:8])[0]
+        else:
+            raise ValueError(f"Unknown TIFF magic number: {magic}")
+
+    @property
+    def offset_size(self) -> int:
+        return 8 if self.bigtiff else 4
+
+    def read_ifd(self, offset: int) -> Tuple[Dict[int, TiffEntry], int]:
+        """Read the IFD at a (base-relative) offset. Returns (entries by tag, next IFD offset)."""
+        e = self.endian
+        f = self.f
+        f.seek(self.base + offset)
+        if self.bigtiff:
+            count = struct.unpack(e + 'Q', f.read(8))[0]
+            entry_size, head, value_field = 20, 8, 8
+        else:
+            count = struct.unpack(e + 'H', f.read(2))[0]
+            entry_size, head, value_field = 12, 2, 4
+        if count > 10000:
+            raise ValueError(f"Implausible IFD entry count {count} at offset {offset}")
+        block = f.read(count * entry_size + value_field)
+        if len(block) < count * entry_size + value_field:
+            raise ValueError("Truncated IFD")
+
+        entries: Dict[int, TiffEntry] = {}
+        for i in range(count):
+            chunk = block[i * entry_size:(i + 1) * entry_size]
+            if self.bigtiff:
+                tag, type_, n = struct.unpack(e + 'HHQ', chunk[:12])
+            else:
+                tag, type_, n = struct.unpack(e + 'HHI', chunk[:8])
+            raw = chunk[entry_size - value_field:]
+            entry_pos = self.base + offset + head + i * entry_size
+            size = TYPE_SIZES.get(type_, 1) * n
+            if size <= value_field:
+                value_pos, inline = entry_pos + entry_size - value_field, True
+            else:
+                rel = struct.unpack(e + ('Q' if self.bigtiff else 'I'), raw)[0]
+                value_pos, inline = self.base + rel, False
+            entries[tag] = TiffEntry(tag, type_, n, raw, entry_pos, value_pos, inline)
+        next_offset = struct.unpack(e + ('Q' if self.bigtiff else 'I'), block[count * entry_size:])[0]
+        return entries, next_offset
+
+    def read_raw(self, entry: TiffEntry, max_bytes: Optional[int] = None) -> Optional[bytes]:
+        """Return the raw value bytes of an entry (None if larger than max_bytes)."""
+        size = entry.size
+        if max_bytes is not None and size > max_bytes:
+            return None
+        if entry.inline:
+            return entry.raw[:size]
+        self.f.seek(entry.value_pos)
+        data = self.f.read(size)
+        if len(data) < size:
+            raise ValueError(f"Truncated value for tag 0x{entry.tag:04X}")
+        return data
+
+    def read_value(self, entry: TiffEntry, max_bytes: Optional[int] = DEFAULT_MAX_VALUE_BYTES) -> Any:
+        """Decode an entry's value using piexif's conventions (None if too large)."""
+        data = self.read_raw(entry, max_bytes)
+        if data is None:
+            return None
+        return decode_value(entry.type, entry.count, data, self.endian)
+
+    def pointer(self, entries: Dict[int, TiffEntry], tag: int) -> Optional[int]:
+        """Return the sub-IFD offset stored under a pointer tag, if present."""
+        entry = entries.get(tag)
+        if entry is None:
+            return None
+        value = self.read_value(entry)
+        if isinstance(value, tuple):
+            value = value[0] if value else None
+        return value or None
+
+    def read_tags(self, entries: Dict[int, TiffEntry],
+                  max_bytes: Optional[int] = DEFAULT_MAX_VALUE_BYTES) -> Dict[int, Any]:
+        """Decode all entries of an IFD, skipping values larger than max_bytes."""
+        out: Dict[int, Any] = {}
+        for tag, entry in entries.items():
+            try:
+                value = self.read_value(entry, max_bytes)
+            except Exception:
+                continue
+            if value is not None:
+                out[tag] = value
+        return out
+
+
+def decode_value(type_: int, count: int, data: bytes, endian: str) -> Any:
+    """Decode raw TIFF value bytes the way piexif.load() does."""
+    if type_ == ASCII:
+        return data.split(b'\x00', 1)[0] if b'\x00' in data else data
+    if type_ == UNDEFINED:
+        return data
+    if type_ in (RATIONAL, SRATIONAL):
+        code = 'I' if type_ == RATIONAL else 'i'
+        nums = struct.unpack(endian + code * (2 * count), data[:8 * count])
+        pairs = tuple((nums[i], nums[i + 1]) for i in range(0, len(nums), 2))
+        return pairs[0] if count == 1 else pairs
+    code = TYPE_CODES.get(type_)
+    if code is None:
+        return data
+    values = struct.unpack(endian + code * count, data[:TYPE_SIZES[type_] * count])
+    return values[0] if count == 1 else values
+
+
+def encode_value(type_: int, value: Any, endian: str) -> Tuple[int, bytes]:
+    """Encode a Python value as (count, bytes) for the given TIFF type."""
+    if type_ == ASCII:
+        data = value if isinstance(value, (bytes, bytearray)) else str(value).encode('utf-8', errors='replace')
+        data = bytes(data)
+        if not data.endswith(b'\x00'):
+            data += b'\x00'
+        return len(data), data
+    if type_ in (UNDEFINED, 1) and isinstance(value, (bytes, bytearray)):
+        return len(value), bytes(value)
+    if type_ in (RATIONAL, SRATIONAL):
+        pairs = [value] if value and isinstance(value[0], int) else list(value)
+        code = 'I' if type_ == RATIONAL else 'i'
+        flat = [n for pair in pairs for n in pair]
+        return len(pairs), struct.pack(endian + code * len(flat), *flat)
+    code = TYPE_CODES.get(type_)
+    if code is None:
+        raise ValueError(f"Cannot encode TIFF type {type_}")
+    values = list(value) if isinstance(value, (list, tuple)) else [value]
+    return len(values), struct.pack(endian + code * len(values), *values)
+
+
+def read_tiff_tags(file_path: str, base: int = 0,
+                   max_bytes: Optional[int] = DEFAULT_MAX_VALUE_BYTES) -> Dict[str, Any]:
+    """
+    Header-only read of IFD0, Exif, GPS, Interop and IFD1 as a piexif-style dict
+    ({'0th': {tag: value}, 'Exif': ..., 'GPS': ..., 'Interop': ..., '1st': ...}).
+    """
+    with open(file_path, 'rb') as f:
+        return read_tiff_tags_from(f, base, max_bytes)
+
+
+def read_tiff_tags_from(f, base: int = 0,
+                        max_bytes: Optional[int] = DEFAULT_MAX_VALUE_BYTES) -> Dict[str, Any]:
+    """Like read_tiff_tags() for an already open file."""
+    tf = TiffFile(f, base)
+    result: Dict[str, Any] = {'0th': {}, 'Exif': {}, 'GPS': {}, 'Interop': {}, '1st': {}, 'thumbnail': None}
+    ifd0, next_offset = tf.read_ifd(tf.first_ifd)
+    result['0th'] = tf.read_tags(ifd0, max_bytes)
+
+    exif_offset = tf.pointer(ifd0, EXIF_IFD_POINTER)
+    if exif_offset:
+        exif_entries, _ = tf.read_ifd(exif_offset)
+        result['Exif'] = tf.read_tags(exif_entries, max_bytes)
+        interop_offset = tf.pointer(exif_entries, INTEROP_IFD_POINTER)
+        if interop_offset:
+            try:
+                result['Interop'] = tf.read_tags(tf.read_ifd(interop_offset)[0], max_bytes)
+            except Exception:
+                pass
+    gps_offset = tf.pointer(ifd0, GPS_IFD_POINTER)
+    if gps_offset:
+        try:
+            result['GPS'] = tf.read_tags(tf.read_ifd(gps_offset)[0], max_bytes)
+        except Exception:
+            pass
+    if next_offset:
+        try:
+            result['1st'] = tf.read_tags(tf.read_ifd(next_offset)[0], max_bytes)
+        except Exception:
+            pass
+    return result
+
+
+def find_jpeg_exif_base(f, start: int = 0) -> Optional[int]:
+    """
+    Return the file offset of the TIFF header inside a JPEG's Exif APP1 segment
+    (for use as TiffFile base), or None. Only segment headers are read.
+    start: file offset of the JPEG (for JPEGs embedded in other files).
+    """
+    f.seek(start)
+    if f.read(2) != b'\xff\xd8':
+        return None
+    pos = start + 2
+    while True:
+        f.seek(pos)
+        head = f.read(4)
+        if len(head) < 4 or head[0] != 0xFF:
+            return None
+        marker = head[1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            pos += 2
+            continue
+        if marker in (0xDA, 0xD9):
+            return None
+        seg_len = struct.unpack('>H', head[2:4])[0]
+        if marker == 0xE1 and f.read(6) == b'Exif\x00\x00':
+            return pos + 10
+        pos += 2 + seg_len
+
+
+def read_jpeg_exif_tags(file_path: str,
+                        max_bytes: Optional[int] = DEFAULT_MAX_VALUE_BYTES) -> Dict[str, Any]:
+    """Header-only EXIF read of a JPEG as a piexif-style dict ({} if it has none)."""
+    with open(file_path, 'rb') as f:
+        base = find_jpeg_exif_base(f)
+        if base is None:
+            return {}
+        return read_tiff_tags_from(f, base, max_bytes)
+
+
+# -------------------- RAW files --------------------
+
+def iter_ifds(tf: TiffFile) -> Iterator[Tuple[str, Dict[int, TiffEntry]]]:
+    """
+    Yield (name, entries) for the IFD chain ("IFD0", "IFD1", ...) and any
+    SubIFDs ("IFD0.Sub0", ...). Loops and runaway chains are cut off.
+    """
+    seen = set()
+    # (name, offset, position in the main chain or None for SubIFDs)
+    queue: List[Tuple[str, int, Optional[int]]] = [('IFD0', tf.first_ifd, 0)]
+    while queue and len(seen) < MAX_IFDS:
+        name, offset, chain = queue.pop(0)
+        if not offset or offset in seen:
+            continue
+        seen.add(offset)
+        try:
+            entries, next_offset = tf.read_ifd(offset)
+        except (ValueError, struct.error):
+            continue
+        yield name, entries
+        if chain is not None and next_offset:
+            queue.append((f"IFD{chain + 1}", next_offset, chain + 1))
+        if SUB_IFDS in entries:
+            try:
+                subs = tf.read_value(entries[SUB_IFDS])
+            except (ValueError, struct.error):
+                subs = None
+            if isinstance(subs, int):
+                subs = (subs,)
+            for n, sub in enumerate(subs or ()):
+                queue.append((f"{name}.Sub{n}", sub, None))
+
+
+def _int_value(tf: TiffFile, entries: Dict[int, TiffEntry], tag: int) -> Optional[int]:
+    entry = entries.get(tag)
+    if entry is None:
+        return None
+    value = tf.read_value(entry)
+    if isinstance(value, tuple):
+        value = value[0] if len(value) == 1 else None
+    return value if isinstance(value, int) else None
+
+
+def read_raw_layout(file_path: str) -> Dict[str, Any]:
+    """
+    Walk the IFDs of a TIFF-based RAW file without touching sensor data.
+    Returns {'format': 'CR2'/'ORF'/'RW2'/None, 'dimensions': (w, h) or None,
+    'previews': [(offset, length), ...]} with embedded JPEG previews largest first.
+    """
+    previews: List[Tuple[int, int]] = []
+    largest = (0, 0)
+    with open(file_path, 'rb') as f:
+        tf = TiffFile(f)
+        raw_format = tf.raw_format
+        f.seek(8)
+        if f.read(2) == b'CR':
+            raw_format = 'CR2'
+        for name, entries in iter_ifds(tf):
+            width = _int_value(tf, entries, IMAGE_WIDTH) or 0
+            height = _int_value(tf, entries, IMAGE_LENGTH) or 0
+            if width * height > largest[0] * largest[1]:
+                largest = (width, height)
+            offset = _int_value(tf, entries, JPEG_IF_OFFSET)
+            length = _int_value(tf, entries, JPEG_IF_LENGTH)
+            if offset and length:
+                previews.append((tf.base + offset, length))
+                continue
+            jpg = entries.get(RW2_JPG_FROM_RAW)
+            if jpg is not None and not jpg.inline:
+                previews.append((jpg.value_pos, jpg.size))
+            # Old-style JPEG strips (CR2 IFD0), or reduced-resolution JPEG strips (DNG)
+            compression = _int_value(tf, entries, COMPRESSION)
+            subfile = _int_value(tf, entries, NEW_SUBFILE_TYPE) or 0
+            offset = _int_value(tf, entries, STRIP_OFFSETS)
+            length = _int_value(tf, entries, STRIP_BYTE_COUNTS)
+            if offset and length and CR2_SLICE not in entries and (
+                    compression == 6 or (compression == 7 and subfile & 1)):
+                previews.append((tf.base + offset, length))
+    previews = sorted(set(previews), key=lambda p: p[1], reverse=True)
+    return {'format': raw_format, 'dimensions': largest if largest[0] else None, 'previews': previews}
+
+
+def read_raw_tags(file_path: str, max_bytes: Optional[int] = RAW_MAX_VALUE_BYTES) -> Dict[str, Any]:
+    """
+    Header-only EXIF read of a TIFF-based RAW file (CR2, NEF, ARW, DNG, ORF,
+    RW2) as a piexif-style dict. Panasonic RW2 files keep Exif/GPS inside the
+    embedded preview JPEG; those IFDs are read from there.
+    """
+    with open(file_path, 'rb') as f:
+        result = read_tiff_tags_from(f, 0, max_bytes)
+        if not result['Exif']:
+            tf = TiffFile(f)
+            jpg = tf.read_ifd(tf.first_ifd)[0].get(RW2_JPG_FROM_RAW)
+            base = find_jpeg_exif_base(f, jpg.value_pos) if jpg is not None and not jpg.inline else None
+            if base is not None:
+                embedded = read_tiff_tags_from(f, base, max_bytes)
+                for ifd in ('Exif', 'GPS', 'Interop', '1st'):
+                    result[ifd] = result[ifd] or embedded[ifd]
+                for tag, value in embedded['0th'].items():
+                    result['0th'].setdefault(tag, value)
+    return result
+
+
+def read_raw_preview(file_path: str) -> Optional[bytes]:
+    """Bytes of the largest embedded JPEG preview of a RAW file, or None."""
+    layout = read_raw_layout(file_path)
+    with open(file_path, 'rb') as f:
+        for offset, length in layout['previews']:
+            f.seek(offset)
+            if f.read(2) != b'\xff\xd8':
+                continue
+            f.seek(offset)
+            return f.read(length)
+    return None
+
+
+# -------------------- In-place patching --------------------
+
+def _build_ifd(tf: TiffFile, entries: List[Tuple[int, int, int, Optional[bytes], Optional[bytes]]],
+               ifd_pos: int, next_offset: int) -> bytes:
+    """
+    Serialize an IFD placed at base-relative ifd_pos followed by its out-of-line data.
+    entries: (tag, type, count, raw_field or None, data or None) sorted by tag; raw_field
+    is reused as-is for kept entries, data is laid out after the IFD for new ones.
+    """
+    e = tf.endian
+    off_code = 'Q' if tf.bigtiff else 'I'
+    field = tf.offset_size
+    if tf.bigtiff:
+        head = struct.pack(e + 'Q', len(entries))
+        entry_size = 20
+    else:
+        head = struct.pack(e + 'H', len(entries))
+        entry_size = 12
+    table_size = len(head) + entry_size * len(entries) + field
+    data_pos = ifd_pos + table_size
+
+    table = bytearray(head)
+    blob = bytearray()
+    for tag, type_, count, raw, data in entries:
+        if raw is None:
+            if len(data) <= field:
+                raw = data.ljust(field, b'\x00')
+            else:
+                if (data_pos + len(blob)) % 2:
+                    blob += b'\x00'
+                raw = struct.pack(e + off_code, data_pos + len(blob))
+                blob += data
+        if tf.bigtiff:
+            table += struct.pack(e + 'HHQ', tag, type_, count) + raw
+        else:
+            table += struct.pack(e + 'HHI', tag, type_, count) + raw
+    table += struct.pack(e + off_code, next_offset)
+    return bytes(table) + bytes(blob)
+
+
+def patch_tiff_metadata(file_path: str, set_0th: Dict[int, Tuple[int, Any]],
+                        set_exif: Dict[int, Tuple[int, Any]],
+                        remove_0th: Iterable[int] = (),
+                        keep_exif: Optional[Iterable[int]] = None,
+                        output_path: Optional[str] = None) -> int:
+    """
+    Update IFD0/Exif tags by appending new IFDs and re-pointing the header.
+    set_0th / set_exif: tag -> (TIFF type, value) to add or replace.
+    remove_0th: IFD0 tags to drop. keep_exif: if given, Exif tags not listed (and
+    not in set_exif) are dropped. Strip/tile and other existing data are not moved.
+    If output_path differs from file_path the file is copied first.
+    Returns the number of bytes appended.
+    """
+    save_path = output_path or file_path
+    if os.path.abspath(save_path) != os.path.abspath(file_path):
+        shutil.copyfile(file_path, save_path)
+
+    remove_0th = set(remove_0th)
+    keep_exif = set(keep_exif) if keep_exif is not None else None
+    with open(save_path, 'r+b') as f:
+        tf = TiffFile(f)
+        ifd0, next_offset = tf.read_ifd(tf.first_ifd)
+        exif_offset = tf.pointer(ifd0, EXIF_IFD_POINTER)
+        exif_entries: Dict[int, TiffEntry] = tf.read_ifd(exif_offset)[0] if exif_offset else {}
+
+        def merge(existing: Dict[int, TiffEntry], updates: Dict[int, Tuple[int, Any]], keep) -> list:
+            rows = {}
+            for tag, entry in existing.items():
+                if keep(tag):
+                    rows[tag] = (tag, entry.type, entry.count, entry.raw, None)
+            for tag, (type_, value) in updates.items():
+                count, data = encode_value(type_, value, tf.endian)
+                rows[tag] = (tag, type_, count, None, data)
+            return [rows[t] for t in sorted(rows)]
+
+        exif_rows = merge(exif_entries, set_exif, lambda t: keep_exif is None or t in keep_exif)
+
+        f.seek(0, os.SEEK_END)
+        end = f.tell() - tf.base
+        pad = b'\x00' * (end % 2)
+        pos = end + len(pad)
+        limit = 1 << (64 if tf.bigtiff else 32)
+
+        appended = bytearray(pad)
+        ifd0_updates = dict(set_0th)
+        if exif_rows:
+            exif_block = _build_ifd(tf, exif_rows, pos, 0)
+            appended += exif_block
+            pointer_type = 16 if tf.bigtiff else 4
+            ifd0_updates[EXIF_IFD_POINTER] = (pointer_type, pos)
+            pos += len(exif_block)
+            if pos % 2:
+                appended += b'\x00'
+                pos += 1
+        ifd0_rows = merge(ifd0, ifd0_updates,
+                          lambda t: t not in remove_0th and not (t == EXIF_IFD_POINTER and not exif_rows))
+        ifd0_block = _build_ifd(tf, ifd0_rows, pos, next_offset)
+        appended += ifd0_block
+        if pos + len(ifd0_block) >= limit:
+            raise ValueError("File too large for classic TIFF offsets; convert to BigTIFF")
+
+        # Append the new IFDs first, then flip the header offset as the last write
+        f.seek(tf.base + end)
+        f.write(appended)
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(tf.header_ifd_pos)
+        f.write(struct.pack(tf.endian + ('Q' if tf.bigtiff else 'I'), pos))
+        f.flush()
+    return len(appended)
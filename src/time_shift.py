@@ -0,0 +1,376 @@
+"""
+Time Shift Module
+Shift the capture time of many files in place, e.g. to correct a camera clock.
+
+EXIF DateTime, DateTimeOriginal and DateTimeDigitized are fixed-width
+"YYYY:MM:DD HH:MM:SS" ASCII values. plan_time_shift() walks the TIFF
+structure of a JPEG's Exif segment or of a TIFF file to find where they are
+stored, and finds xmp:CreateDate, xmp:ModifyDate, photoshop:DateCreated,
+exif:DateTimeOriginal and exif:DateTimeDigitized in the embedded XMP packet.
+Shifted values keep their width (XMP values also keep their precision and
+time zone), so apply_time_shift() overwrites only those bytes with
+os.pwrite and nothing else in the file moves. Should an XMP value change
+length, the whitespace padding after the packet absorbs the difference;
+without enough padding the XMP dates are left alone and reported.
+
+An existing XMP sidecar is shifted too (it is small and rewritten whole).
+Other formats are only shifted through their sidecar: RAW originals are never
+modified, and PNG chunks and HEIC/AVIF/WebP boxes cannot be patched without
+rewriting checksums or sizes. Their embedded capture dates that the sidecar
+lacks are copied into it shifted (as exif:DateTimeOriginal,
+exif:DateTimeDigitized and xmp:CreateDate, creating the sidecar if needed),
+and read_fields() prefers those sidecar values.
+"""
+
+import datetime
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from io_scheduler import HEADER_READAHEAD_BYTES, ordered_parallel_map, with_readahead
+from metadata_handler import MetadataHandler
+from tiff_metadata import ASCII, EXIF_IFD_POINTER, TiffFile, find_jpeg_exif_base
+from xmp_scan import XMP_END, XMP_START, find_xmp_span
+from xmp_sidecar import (NS_RDF, NS_X, PACKET_BEGIN, PACKET_END, find_sidecar, merge_xmp_packets,
+                         replace_sidecar_text, sidecar_path)
+
+# (IFD, tag, name) of the fixed-width EXIF dates
+EXIF_DATE_TAGS = [('0th', 0x0132, 'DateTime'), ('Exif', 0x9003, 'DateTimeOriginal'),
+                  ('Exif', 0x9004, 'DateTimeDigitized')]
+XMP_DATE_PROPERTIES = ['xmp:CreateDate', 'xmp:ModifyDate', 'photoshop:DateCreated',
+                       'exif:DateTimeOriginal', 'exif:DateTimeDigitized']
+# (sidecar property, fields read from the file, first present wins) copied into
+# the sidecar of formats whose embedded dates are not patched
+SIDECAR_DATE_SOURCES = [('exif:DateTimeOriginal', ['DateTimeOriginal']),
+                        ('exif:DateTimeDigitized', ['DateTimeDigitized']),
+                        ('xmp:CreateDate', ['CreateDate', 'DateTimeOriginal'])]
+XMP_TAG = 700  # TIFF tag holding the XMP packet
+EXIF_DATE_LEN = 19
+# Most whitespace padding looked at after an embedded packet
+MAX_PADDING = 64 * 1024
+
+_EXIF_DATE_RE = re.compile(rb'(\d{4})([:-])(\d{2})\2(\d{2})([ T])(\d{2}):(\d{2}):(\d{2})$')
+_XMP_DATE_RE = re.compile(
+    rb'\b(' + b'|'.join(re.escape(p.encode()) for p in XMP_DATE_PROPERTIES) + rb')(\s*=\s*["\']|>)'
+    rb'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2})(?::(\d{2}))?')
+_ISO_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:\d{2})?$')
+_OFFSET_RE = re.compile(r'^\s*([+-])?\s*(?:(\d+)\s*d(?:ays?)?\s*|(\d+)\s+(?=\d+:))?(?:(\d+):(\d{1,2})(?::(\d{1,2}))?)?\s*$',
+                        re.IGNORECASE)
+
+
+def parse_time_offset(text: str) -> int:
+    """
+    Seconds from an offset such as "+1:00", "-0:30:15", "2d", "-1 03:00" or
+    "+3 days 00:30" (hours:minutes[:seconds], optionally preceded by days).
+    Raises ValueError for anything else.
+    """
+    match = _OFFSET_RE.match(text or '')
+    if not match or not any(match.group(n) for n in (2, 3, 4)):
+        raise ValueError(f"Not a time offset: '{text}' (use [-][days] HH:MM[:SS])")
+    sign, days_word, days_plain, hours, minutes, seconds = match.groups()
+    days = int(days_word or days_plain or 0)
+    if minutes is not None and int(minutes) > 59 or seconds is not None and int(seconds) > 59:
+        raise ValueError(f"Not a time offset: '{text}' (minutes and seconds go up to 59)")
+    total = ((days * 24 + int(hours or 0)) * 60 + int(minutes or 0)) * 60 + int(seconds or 0)
+    return -total if sign == '-' else total
+
+
+def format_time_offset(seconds: int) -> str:
+    """'+1d 02:30:00' style text for an offset in seconds."""
+    sign = '-' if seconds < 0 else '+'
+    days, rest = divmod(abs(seconds), 86400)
+    text = f"{rest // 3600:02d}:{rest // 60 % 60:02d}:{rest % 60:02d}"
+    return f"{sign}{days}d {text}" if days else sign + text
+
+
+def shift_exif_date(value: bytes, seconds: int) -> Optional[bytes]:
+    """
+    The first 19 bytes of an EXIF date shifted by seconds, or None if they are
+    not a valid date. ISO-style "YYYY-MM-DDTHH:MM:SS" values (as some editors
+    store them) keep their separators.
+    """
+    match = _EXIF_DATE_RE.match(value[:EXIF_DATE_LEN])
+    if not match:
+        return None
+    year, dsep, month, day, tsep, hour, minute, second = match.groups()
+    try:
+        when = datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+        when += datetime.timedelta(seconds=seconds)
+    except (ValueError, OverflowError):
+        return None
+    fmt = f"%Y{dsep.decode()}%m{dsep.decode()}%d{tsep.decode()}%H:%M:%S"
+    shifted = when.strftime(fmt).encode('ascii')
+    return shifted if len(shifted) == EXIF_DATE_LEN else None
+
+
+def shift_xmp_dates(packet: bytes, seconds: int) -> List[Tuple[int, bytes, bytes, str]]:
+    """
+    (offset in packet, old, new, property) for every XMP date with a time of
+    day. Only the date-time digits are replaced, so fractions and time zones
+    are kept; date-only values are left alone.
+    """
+    edits = []
+    for match in _XMP_DATE_RE.finditer(packet):
+        year, month, day, hour, minute, second = (int(g) if g else 0 for g in match.groups()[2:])
+        try:
+            when = datetime.datetime(year, month, day, hour, minute, second)
+            when += datetime.timedelta(seconds=seconds)
+        except (ValueError, OverflowError):
+            continue
+        start = match.start(3)
+        old = packet[start:match.end()]
+        new = when.strftime('%Y-%m-%dT%H:%M' + (':%S' if match.group(8) else '')).encode('ascii')
+        if new != old:
+            edits.append((start, old, new, match.group(1).decode('ascii')))
+    return edits
+
+
+def _apply_edits(packet: bytes, edits: List[Tuple[int, bytes, bytes, str]]) -> bytes:
+    out, pos = [], 0
+    for offset, old, new, _name in edits:
+        out.extend((packet[pos:offset], new))
+        pos = offset + len(old)
+    out.append(packet[pos:])
+    return b''.join(out)
+
+
+class TimeShiftPlan:
+    """The byte patches and sidecar rewrite that shift one file's dates."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.patches: List[Tuple[int, bytes, bytes]] = []  # (file offset, old bytes, new bytes)
+        self.fields: List[str] = []
+        self.sidecar: Optional[Tuple[str, str]] = None     # (sidecar path, shifted text)
+        self.notes: List[str] = []
+
+    @property
+    def empty(self) -> bool:
+        return not self.patches and self.sidecar is None
+
+
+def _pread(fd: int, size: int, offset: int) -> bytes:
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def _pwrite(fd: int, data: bytes, offset: int) -> int:
+    if hasattr(os, 'pwrite'):
+        return os.pwrite(fd, data, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.write(fd, data)
+
+
+def _plan_exif(plan: TimeShiftPlan, f, base: int, seconds: int) -> Optional[Tuple[int, int]]:
+    """Patch the EXIF dates of the TIFF structure at base; returns the XMP tag's (start, end) if any."""
+    tf = TiffFile(f, base)
+    ifds = {'0th': tf.read_ifd(tf.first_ifd)[0]}
+    exif_offset = tf.pointer(ifds['0th'], EXIF_IFD_POINTER)
+    if exif_offset:
+        ifds['Exif'] = tf.read_ifd(exif_offset)[0]
+    for ifd, tag, name in EXIF_DATE_TAGS:
+        entry = ifds.get(ifd, {}).get(tag)
+        if entry is None or entry.type != ASCII or entry.count < EXIF_DATE_LEN:
+            continue
+        old = tf.read_raw(entry)[:EXIF_DATE_LEN]
+        new = shift_exif_date(old, seconds)
+        if new is None:
+            plan.notes.append(f"{name} is not a valid date")
+        elif new != old:
+            plan.patches.append((entry.value_pos, old, new))
+            plan.fields.append(name)
+    entry = ifds['0th'].get(XMP_TAG)
+    if entry is not None and not entry.inline:
+        return entry.value_pos, entry.value_pos + entry.size
+    return None
+
+
+def _plan_xmp(plan: TimeShiftPlan, f, span: Tuple[int, int], seconds: int, limit: Optional[int] = None):
+    """Patch the XMP dates of the packet at span; limit bounds the padding that may be used."""
+    start, end = span
+    f.seek(start)
+    packet = f.read(end - start)
+    edits = shift_xmp_dates(packet, seconds)
+    if not edits:
+        return
+    names = [name for _o, _old, _new, name in edits]
+    if all(len(old) == len(new) for _o, old, new, _n in edits):
+        plan.patches.extend((start + offset, old, new) for offset, old, new, _n in edits)
+        plan.fields.extend(names)
+        return
+    # Lengths changed: rewrite the packet and let its trailing padding absorb the difference
+    f.seek(end)
+    tail = f.read(min(MAX_PADDING, (limit - end) if limit is not None else MAX_PADDING))
+    padding = len(tail) - len(tail.lstrip(b' \t\r\n'))
+    old = packet + tail[:padding]
+    new = _apply_edits(packet, edits)
+    if len(new) > len(old):
+        plan.notes.append("XMP dates not shifted: not enough padding in the packet")
+        return
+    plan.patches.append((start, old, new + b' ' * (len(old) - len(new))))
+    plan.fields.extend(names)
+
+
+def _iso_date(value: Any) -> Optional[str]:
+    """An EXIF "YYYY:MM:DD HH:MM:SS" or XMP date read from a file as XMP date text, or None."""
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if _ISO_DATE_RE.match(value):
+        return value
+    match = _EXIF_DATE_RE.match(value[:EXIF_DATE_LEN].encode('ascii', 'replace'))
+    if not match:
+        return None
+    year, _d, month, day, _t, hour, minute, second = (g.decode('ascii') for g in match.groups())
+    return f"{year}-{month}-{day}T{hour}:{minute}:{second}"
+
+
+def _plan_sidecar_dates(plan: TimeShiftPlan, handler: MetadataHandler, text: Optional[str], seconds: int):
+    """
+    Copy the file's embedded dates that the sidecar (text, already shifted;
+    None if there is none) lacks into it, shifted.
+    """
+    missing = [(prop, sources) for prop, sources in SIDECAR_DATE_SOURCES
+               if text is None or prop not in text]
+    if not missing:
+        return
+    values = handler.read_fields(plan.path, sorted({name for _p, sources in missing for name in sources}))
+    attrs = []
+    for prop, sources in missing:
+        date = next((d for d in (_iso_date(values.get(name)) for name in sources) if d), None)
+        if date is not None:
+            attrs.append(f'{prop}="{date}"')
+    if not attrs:
+        return
+    update = (f'<x:xmpmeta xmlns:x="{NS_X}"><rdf:RDF xmlns:rdf="{NS_RDF}">'
+              '<rdf:Description rdf:about="" xmlns:exif="http://ns.adobe.com/exif/1.0/" '
+              f'xmlns:xmp="http://ns.adobe.com/xap/1.0/" {" ".join(attrs)}/></rdf:RDF></x:xmpmeta>').encode('utf-8')
+    edits = shift_xmp_dates(update, seconds)
+    if not edits:
+        return
+    packet = f"{PACKET_BEGIN}\n{_apply_edits(update, edits).decode('utf-8')}\n{PACKET_END}\n"
+    path = plan.sidecar[0] if plan.sidecar else find_sidecar(plan.path) or sidecar_path(plan.path)
+    plan.sidecar = (path, merge_xmp_packets(text, packet))
+    plan.fields.extend(f"sidecar {name}" for _o, _old, _new, name in edits)
+
+
+def plan_time_shift(path: str, seconds: int, handler: Optional[MetadataHandler] = None) -> TimeShiftPlan:
+    """
+    Find every date of a file (and its sidecar) and work out the shifted bytes,
+    without writing. handler reads the embedded dates of sidecar-only formats
+    (one per worker thread; a new one if None).
+    """
+    plan = TimeShiftPlan(path)
+    ext = os.path.splitext(path)[1].lower()
+    sidecar_only = False
+    with open(path, 'rb') as f:
+        if ext in ('.jpg', '.jpeg'):
+            base = find_jpeg_exif_base(f)
+            if base is not None:
+                _plan_exif(plan, f, base, seconds)
+            span = find_xmp_span(path)
+            if span is not None:
+                _plan_xmp(plan, f, span, seconds)
+        elif ext in ('.tif', '.tiff'):
+            # The XMP packet is the value of tag 700; an older copy may precede it in the file
+            tag_span = _plan_exif(plan, f, 0, seconds)
+            if tag_span is not None:
+                f.seek(tag_span[0])
+                value = f.read(tag_span[1] - tag_span[0])
+                lo, hi = value.find(XMP_START), value.find(XMP_END)
+                if 0 <= lo < hi:
+                    _plan_xmp(plan, f, (tag_span[0] + lo, tag_span[0] + hi + len(XMP_END)), seconds,
+                              limit=tag_span[1])
+        else:
+            sidecar_only = True
+
+    text = None
+    sidecar = find_sidecar(path)
+    if sidecar is not None:
+        try:
+            with open(sidecar, 'r', encoding='utf-8') as sf:
+                text = sf.read()
+        except (OSError, UnicodeDecodeError) as e:
+            plan.notes.append(f"sidecar not read: {e}")
+            return plan
+        data = text.encode('utf-8')
+        edits = shift_xmp_dates(data, seconds)
+        if edits:
+            text = _apply_edits(data, edits).decode('utf-8')
+            plan.sidecar = (sidecar, text)
+            plan.fields.extend(f"sidecar {name}" for _o, _old, _new, name in edits)
+    if sidecar_only:
+        _plan_sidecar_dates(plan, handler or MetadataHandler(), text, seconds)
+        if plan.empty:
+            plan.notes.append("no capture date to shift")
+    return plan
+
+
+def apply_time_shift(plan: TimeShiftPlan) -> int:
+    """
+    Write a plan: each patch with pwrite after checking the old bytes are
+    still in place (ValueError if the file changed since planning). Returns
+    the number of bytes written.
+    """
+    written = 0
+    if plan.patches:
+        fd = os.open(plan.path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+        try:
+            for offset, old, _new in plan.patches:
+                if _pread(fd, len(old), offset) != old:
+                    raise ValueError("File changed while shifting its dates")
+            for offset, _old, new in plan.patches:
+                written += _pwrite(fd, new, offset)
+        finally:
+            os.close(fd)
+    if plan.sidecar is not None:
+        replace_sidecar_text(*plan.sidecar)
+        written += len(plan.sidecar[1].encode('utf-8'))
+    return written
+
+
+def shift_capture_times(paths: Iterable[str], seconds: int, max_workers: Optional[int] = None,
+                        progress: Optional[Callable[[int], None]] = None,
+                        cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Shift the dates of every path by seconds, in place. Returns stats:
+    files, shifted, unchanged, skipped (nothing could be shifted, see
+    problems), failed, bytes written, and problems as (path, message) pairs
+    for failures and dates that could not be shifted. progress(n) gets the
+    files done so far.
+    """
+    local = threading.local()
+
+    def shift(path: str):
+        handler = getattr(local, 'handler', None)
+        if handler is None:
+            handler = local.handler = MetadataHandler()
+        try:
+            plan = plan_time_shift(path, seconds, handler)
+            return plan, apply_time_shift(plan), None
+        except Exception as e:
+            return None, 0, str(e)
+
+    stats: Dict[str, Any] = {'files': 0, 'shifted': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0, 'bytes': 0,
+                             'problems': []}
+    workers = max_workers or min(16, (os.cpu_count() or 4) * 2)
+    hinted = with_readahead(paths, nbytes=HEADER_READAHEAD_BYTES)
+    for path, (plan, written, error) in ordered_parallel_map(shift, hinted, workers, cancel=cancel):
+        stats['files'] += 1
+        if error is not None:
+            stats['failed'] += 1
+            stats['problems'].append((path, error))
+        else:
+            stats['shifted' if not plan.empty else 'skipped' if plan.notes else 'unchanged'] += 1
+            stats['bytes'] += written
+            stats['problems'].extend((path, note) for note in plan.notes)
+        if progress is not None and stats['files'] % 100 == 0:
+            progress(stats['files'])
+    if progress is not None:
+        progress(stats['files'])
+    return stats
@@ -0,0 +1,97 @@
+"""
+XMP Scan Module
+Bounded, copy-free search for an embedded XMP packet.
+
+Used as the last-resort XMP reader when neither libxmp nor a format-specific
+reader applies. The file is memory-mapped rather than read: JPEG APP1
+segments are checked first, then the first megabyte, and only then the rest
+of the file. Only the matched packet is copied out, so peak memory does not
+depend on file size. find_xmp_span() returns the packet's file offsets
+instead, for patching it in place.
+"""
+
+import mmap
+import os
+from typing import Optional, Tuple
+
+XMP_START = b'<x:xmpmeta'
+XMP_END = b'</x:xmpmeta>'
+JPEG_XMP_NAMESPACE = b'http://ns.adobe.com/xap/1.0/\x00'
+
+# Window searched before falling back to the whole file
+HEAD_WINDOW = 1024 * 1024
+# Packets larger than this are not considered (guards against a stray start tag)
+MAX_PACKET = 16 * 1024 * 1024
+
+
+def _jpeg_xmp_span(mm) -> Optional[Tuple[int, int]]:
+    """Return the (start, end) payload range of the XMP APP1 segment of a JPEG, if any."""
+    size = len(mm)
+    if size < 4 or mm[0] != 0xFF or mm[1] != 0xD8:
+        return None
+    pos = 2
+    while pos + 4 <= size:
+        if mm[pos] != 0xFF:
+            return None
+        marker = mm[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            pos += 2
+            continue
+        if marker in (0xDA, 0xD9):
+            # Start of scan / end of image: no more header segments
+            return None
+        seg_len = (mm[pos + 2] << 8) | mm[pos + 3]
+        payload = pos + 4
+        if marker == 0xE1 and mm[payload:payload + len(JPEG_XMP_NAMESPACE)] == JPEG_XMP_NAMESPACE:
+            return payload + len(JPEG_XMP_NAMESPACE), min(size, pos + 2 + seg_len)
+        pos += 2 + seg_len
+    return None
+
+
+def _span_in(mm, lo: int, hi: int) -> Optional[Tuple[int, int]]:
+    start = mm.find(XMP_START, lo, hi)
+    if start == -1:
+        return None
+    end = mm.find(XMP_END, start, min(len(mm), start + MAX_PACKET))
+    if end == -1:
+        return None
+    return start, end + len(XMP_END)
+
+
+def _find_span(mm) -> Optional[Tuple[int, int]]:
+    span = _jpeg_xmp_span(mm)
+    if span:
+        found = _span_in(mm, span[0], span[1])
+        if found:
+            return found
+    size = len(mm)
+    head = min(size, HEAD_WINDOW)
+    found = _span_in(mm, 0, head)
+    if found or head == size:
+        return found
+    return _span_in(mm, max(0, head - len(XMP_START)), size)
+
+
+def find_xmp_span(file_path: str) -> Optional[Tuple[int, int]]:
+    """File offsets (start, end) of the <x:xmpmeta> packet, for in-place patching; None if absent."""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _find_span(mm)
+
+
+def find_xmp_packet(file_path: str) -> Optional[bytes]:
+    """
+    Locate the <x:xmpmeta> packet in a file without reading it into memory.
+    Returns the packet bytes (start tag through end tag) or None.
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            span = _find_span(mm)
+            return mm[span[0]:span[1]] if span else None
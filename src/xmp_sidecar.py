@@ -0,0 +1,143 @@
+"""
+XMP Sidecar Module
+Reading and writing <basename>.xmp sidecar files next to images.
+
+Sidecars let metadata be edited without touching the image bytes at all. A
+new packet is merged into an existing sidecar property by property: only the
+properties present in the new packet are replaced, so anything else another
+application stored there (develop settings, ratings, ...) is preserved.
+Writes go to a temporary file in the same folder and are moved into place.
+"""
+
+import os
+import tempfile
+from typing import Optional
+from xml.etree import ElementTree as ET
+
+SIDECAR_EXT = '.xmp'
+NS_X = 'adobe:ns:meta/'
+NS_RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+PACKET_BEGIN = '<?xpacket begin="﻿" id="W5M0MpCehiHzreSzNTczkc9d"?>'
+PACKET_END = '<?xpacket end="w"?>'
+
+# Conventional prefixes, so rewritten sidecars stay readable by other tools
+_PREFIXES = {
+    'x': NS_X,
+    'rdf': NS_RDF,
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'xmp': 'http://ns.adobe.com/xap/1.0/',
+    'photoshop': 'http://ns.adobe.com/photoshop/1.0/',
+    'xmpMM': 'http://ns.adobe.com/xap/1.0/mm/',
+    'stEvt': 'http://ns.adobe.com/xap/1.0/sType/ResourceEvent#',
+    'tiff': 'http://ns.adobe.com/tiff/1.0/',
+    'exif': 'http://ns.adobe.com/exif/1.0/',
+    'aux': 'http://ns.adobe.com/exif/1.0/aux/',
+    'crs': 'http://ns.adobe.com/camera-raw-settings/1.0/',
+    'lr': 'http://ns.adobe.com/lightroom/1.0/',
+    'Iptc4xmpCore': 'http://iptc.org/std/Iptc4xmpCore/1.0/xmlns/',
+}
+for _prefix, _uri in _PREFIXES.items():
+    ET.register_namespace(_prefix, _uri)
+
+_DESCRIPTION = '{%s}Description' % NS_RDF
+_RDF = '{%s}RDF' % NS_RDF
+
+
+def sidecar_path(image_path: str) -> str:
+    """Sidecar location for an image: the same name with an .xmp extension."""
+    return os.path.splitext(image_path)[0] + SIDECAR_EXT
+
+
+def find_sidecar(image_path: str) -> Optional[str]:
+    """Existing sidecar for an image ("IMG.xmp", else "IMG.CR2.xmp"), or None."""
+    for candidate in (sidecar_path(image_path), image_path + SIDECAR_EXT):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def read_sidecar(image_path: str) -> Optional[str]:
+    """Text of the image's sidecar packet, or None if there is no sidecar."""
+    path = find_sidecar(image_path)
+    if path is None:
+        return None
+    return read_sidecar_file(path)
+
+
+def read_sidecar_file(path: str) -> str:
+    """Text of a sidecar already located with find_sidecar()."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def _parse(packet: str) -> ET.Element:
+    return ET.fromstring(packet.lstrip('\ufeff \t\r\n'))
+
+
+def _descriptions(root: ET.Element):
+    return root.findall('.//' + _DESCRIPTION)
+
+
+def merge_xmp_packets(existing: Optional[str], update: str) -> str:
+    """
+    Merge the properties of packet `update` into packet `existing`.
+    Properties in `update` replace same-named ones (attributes or elements)
+    anywhere in `existing`; all other content of `existing` is kept. An
+    unparsable or missing `existing` is replaced by `update`.
+    """
+    new_root = _parse(update)
+    root = None
+    if existing:
+        try:
+            root = _parse(existing)
+        except ET.ParseError:
+            pass
+    if root is None or not _descriptions(root):
+        root = new_root
+    else:
+        target = _descriptions(root)[0]
+        for desc in _descriptions(new_root):
+            names = set(desc.attrib) | {child.tag for child in desc}
+            for old in _descriptions(root):
+                for name in names:
+                    old.attrib.pop(name, None)
+                for child in [c for c in old if c.tag in names]:
+                    old.remove(child)
+            target.attrib.update(desc.attrib)
+            target.extend(list(desc))
+    if root.tag == _RDF:
+        wrapper = ET.Element('{%s}xmpmeta' % NS_X)
+        wrapper.append(root)
+        root = wrapper
+    body = ET.tostring(root, encoding='unicode')
+    return f"{PACKET_BEGIN}\n{body}\n{PACKET_END}\n"
+
+
+def write_sidecar(image_path: str, packet: str) -> str:
+    """
+    Merge packet into the image's sidecar (creating it if needed) and return
+    the sidecar path. The image file itself is never opened.
+    """
+    path = find_sidecar(image_path) or sidecar_path(image_path)
+    existing = None
+    if os.path.isfile(path):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            existing = f.read()
+    replace_sidecar_text(path, merge_xmp_packets(existing, packet))
+    return path
+
+
+def replace_sidecar_text(path: str, text: str):
+    """Write a sidecar's full text via a temporary file in the same folder, then move it into place."""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=folder)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except Exception:
+            pass
+        raise
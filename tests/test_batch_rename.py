@@ -0,0 +1,165 @@
+"""
+Unit tests for batch_rename.py
+"""
+
+import unittest
+import tempfile
+import time
+import os
+import sys
+from unittest import mock
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+import piexif
+
+from metadata_handler import MetadataHandler
+from batch_rename import (RenameOptions, RenamePattern, RenamePlan, RenamePlanner, compute_new_names, prefetch_fields,
+                          required_fields)
+
+
+class TestBatchRename(unittest.TestCase):
+    """Test cases for rename name computation and metadata tokens."""
+
+    def setUp(self):
+        """Create JPEGs with capture time and camera model."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for i, (model, taken) in enumerate([(b'X100', b'2024:05:01 10:00:00'),
+                                            (b'GR III', b'2024:05:02 11:30:05')]):
+            path = os.path.join(self.temp_dir, f"IMG_{i}.jpg")
+            exif = piexif.dump({'0th': {piexif.ImageIFD.Model: model},
+                                'Exif': {piexif.ExifIFD.DateTimeOriginal: taken}})
+            Image.new('RGB', (16, 16)).save(path, exif=exif)
+            self.paths.append(path)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_pattern_tokens(self):
+        """Patterns split into index and metadata tokens."""
+        pattern = RenamePattern("{DateTimeOriginal:%Y%m%d}_{Model}_{index:03d}")
+        self.assertEqual(pattern.fields, ['DateTimeOriginal', 'Model'])
+        self.assertEqual(required_fields(RenameOptions(mode='prefix', pattern="{Model}")), [])
+
+    def test_names_from_prefetched_metadata(self):
+        """Prefetched EXIF fields drive the computed names."""
+        options = RenameOptions(pattern="{DateTimeOriginal:%Y%m%d_%H%M%S}_{Model}_{index}", pad=2)
+        values = prefetch_fields(MetadataHandler(), self.paths, required_fields(options), max_workers=2)
+        names = compute_new_names(self.paths, options, values)
+        self.assertEqual(names, ['20240501_100000_X100_01.jpg', '20240502_113005_GR III_02.jpg'])
+
+    def test_prefetch_readahead_stays_bounded(self):
+        """Hints are issued as results drain, not for the whole queue up front."""
+        paths = [self.paths[i % 2] for i in range(200)]
+        hints = []
+        first_read = []
+
+        class Handler:
+            def read_fields(self, path, fields):
+                if not first_read:
+                    # Give an eager submitter time to run ahead before counting
+                    time.sleep(0.1)
+                    first_read.append(len(hints))
+                return {}
+
+        with mock.patch('io_scheduler.advise_willneed', side_effect=lambda p, n=0: hints.append(p)):
+            prefetch_fields(Handler(), paths, ['Model'], max_workers=2)
+        self.assertEqual(len(hints), 200)
+        self.assertLess(first_read[0], 50)
+
+    def test_simple_modes(self):
+        """Prefix, find/replace and case modes keep the extension."""
+        names = compute_new_names(["/a/IMG_1.JPG"], RenameOptions(mode='prefix', prefix="trip_", case='lower'))
+        self.assertEqual(names, ["trip_img_1.JPG"])
+        names = compute_new_names(["/a/IMG_1.jpg"], RenameOptions(mode='replace', find="IMG", replace="DSC"))
+        self.assertEqual(names, ["DSC_1.jpg"])
+
+    def test_unsafe_token_values(self):
+        """Metadata values cannot inject path separators."""
+        options = RenameOptions(pattern="{Model}")
+        names = compute_new_names(["/a/x.jpg"], options, {"/a/x.jpg": {"Model": "A/B:C"}})
+        self.assertEqual(names, ["A_B_C.jpg"])
+
+
+class TestRenamePlanner(unittest.TestCase):
+    """Test cases for whole-queue rename planning and execution."""
+
+    def setUp(self):
+        """Create a few small files."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _files(self, *names):
+        paths = []
+        for name in names:
+            path = os.path.join(self.temp_dir, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            paths.append(path)
+        return paths
+
+    def _contents(self, name):
+        with open(os.path.join(self.temp_dir, name)) as f:
+            return f.read()
+
+    def test_swap_uses_two_phase_move(self):
+        """a->b and b->a succeed and contents follow their files."""
+        paths = self._files("a.jpg", "b.jpg")
+        plan = RenamePlan(paths, [paths[1], paths[0]], {})
+        renamed = RenamePlanner(paths, RenameOptions()).execute(plan)
+        self.assertEqual(renamed, {0: paths[1], 1: paths[0]})
+        self.assertEqual(self._contents("a.jpg"), "b.jpg")
+        self.assertEqual(self._contents("b.jpg"), "a.jpg")
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["a.jpg", "b.jpg"])
+
+    def test_sidecars_follow_images(self):
+        """XMP sidecars are renamed along with their images, swaps included."""
+        paths = self._files("a.jpg", "b.jpg", "a.xmp", "b.xmp")[:2]
+        plan = RenamePlan(paths, [paths[1], paths[0]], {})
+        RenamePlanner(paths, RenameOptions()).execute(plan)
+        self.assertEqual(self._contents("a.xmp"), "b.xmp")
+        self.assertEqual(self._contents("b.xmp"), "a.xmp")
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["a.jpg", "a.xmp", "b.jpg", "b.xmp"])
+
+    def test_shift_chain(self):
+        """Renaming photo_1..3 to photo_2..4 works although targets overlap sources."""
+        paths = self._files("photo_1.jpg", "photo_2.jpg", "photo_3.jpg")
+        planner = RenamePlanner(paths, RenameOptions(pattern="photo_{index}", start=2))
+        plan = planner.plan()
+        self.assertTrue(plan.ok, plan.problems)
+        planner.execute(plan)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["photo_2.jpg", "photo_3.jpg", "photo_4.jpg"])
+        self.assertEqual(self._contents("photo_4.jpg"), "photo_3.jpg")
+
+    def test_collisions_detected_before_renaming(self):
+        """Duplicate targets and existing files are reported; nothing is touched."""
+        paths = self._files("a.jpg", "b.jpg")
+        self._files("fixed.jpg")
+        plan = RenamePlanner(paths, RenameOptions(pattern="same")).plan()
+        self.assertEqual(set(plan.problems), {0, 1})
+        plan = RenamePlanner(paths[:1], RenameOptions(pattern="fixed")).plan()
+        self.assertIn("exists", plan.problems[0])
+        with self.assertRaises(ValueError):
+            RenamePlanner(paths, RenameOptions(pattern="same")).execute(plan)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["a.jpg", "b.jpg", "fixed.jpg"])
+
+    def test_invalid_names(self):
+        """Invalid characters and empty names are flagged."""
+        paths = self._files("a.jpg", "b.jpg")
+        plan = RenamePlanner(paths, RenameOptions(mode='prefix', prefix='x?')).plan()
+        self.assertIn("invalid characters", plan.problems[0])
+        plan = RenamePlanner(paths[:1], RenameOptions(pattern="")).plan()
+        self.assertEqual(plan.problems[0], "empty name")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Unit tests for bulk_metadata.py
+"""
+
+import unittest
+import tempfile
+import csv
+import json
+import os
+import sys
+import time
+from unittest import mock
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+import piexif
+
+from bulk_metadata import export_metadata_bulk, import_metadata_bulk, iter_image_paths, ordered_parallel_map
+from metadata_handler import MetadataHandler
+
+
+class TestBulkExport(unittest.TestCase):
+    """Test cases for streaming bulk export."""
+
+    def setUp(self):
+        """Create a small folder tree of JPEGs."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.temp_dir, "photos")
+        os.makedirs(os.path.join(self.src, "sub"))
+        self.paths = []
+        for i, folder in enumerate([self.src, self.src, os.path.join(self.src, "sub")]):
+            path = os.path.join(folder, f"IMG_{i}.jpg")
+            exif = piexif.dump({'0th': {piexif.ImageIFD.Model: f"Cam{i}".encode()}})
+            Image.new('RGB', (16, 8)).save(path, exif=exif)
+            self.paths.append(path)
+        with open(os.path.join(self.src, "notes.txt"), 'w') as f:
+            f.write("not an image")
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_iter_image_paths(self):
+        """Only supported images are listed, recursively and in stable order."""
+        self.assertEqual(list(iter_image_paths(self.src)), self.paths)
+        self.assertEqual(list(iter_image_paths(self.src, recursive=False)), self.paths[:2])
+
+    def test_ordered_parallel_map(self):
+        """Results come back in input order with a bounded window."""
+        out = list(ordered_parallel_map(lambda x: x * 2, range(50), max_workers=4, window=3))
+        self.assertEqual(out, [(i, i * 2) for i in range(50)])
+
+    def test_jsonl_and_csv(self):
+        """JSONL holds full records in order; CSV holds the chosen columns."""
+        jsonl = os.path.join(self.temp_dir, "out.jsonl")
+        missing = os.path.join(self.src, "missing.jpg")
+        stats = export_metadata_bulk(self.paths + [missing], jsonl, max_workers=3)
+        self.assertEqual(stats, {'written': 4, 'errors': 1})
+        with open(jsonl, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r['path'] for r in records], self.paths + [missing])
+        self.assertEqual(records[1]['exif']['Model'], 'Cam1')
+        self.assertIn('error', records[3])
+
+        out_csv = os.path.join(self.temp_dir, "out.csv")
+        export_metadata_bulk(self.paths, out_csv, columns=['path', 'exif.Model', 'format'])
+        with open(out_csv, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ['path', 'exif.Model', 'format', 'error'])
+        self.assertEqual(rows[3], [self.paths[2], 'Cam2', 'JPEG', ''])
+
+
+class TestBulkImport(unittest.TestCase):
+    """Test cases for manifest import."""
+
+    def setUp(self):
+        """Create two JPEGs next to a manifest."""
+        self.temp_dir = tempfile.mkdtemp()
+        for name in ("a.jpg", "b.jpg"):
+            Image.new('RGB', (16, 8)).save(os.path.join(self.temp_dir, name))
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_csv_manifest(self):
+        """CSV rows are applied per file; bad rows are reported, not raised."""
+        manifest = os.path.join(self.temp_dir, "captions.csv")
+        with open(manifest, 'w', newline='', encoding='utf-8') as f:
+            w = csv.writer(f)
+            w.writerow(['Path', 'Headline', 'Creator', 'Subject'])
+            w.writerow(['a.jpg', 'Harbour at dawn', 'Ann Lee', 'boats; sea'])
+            w.writerow(['missing.jpg', 'Nothing', '', ''])
+            w.writerow(['b.jpg', '', '', ''])
+        results = os.path.join(self.temp_dir, "results.csv")
+        stats = import_metadata_bulk(manifest, results_path=results, max_workers=2)
+        self.assertEqual(stats, {'applied': 1, 'failed': 2})
+
+        exif = MetadataHandler().read_metadata(os.path.join(self.temp_dir, "a.jpg"))['exif']
+        self.assertEqual(exif.get('ImageDescription'), 'Harbour at dawn')
+        self.assertEqual(exif.get('Artist'), 'Ann Lee')
+        with open(results, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual([r[2] for r in rows[1:]], ['ok', 'error', 'error'])
+        self.assertEqual(rows[2][0], '3')
+
+    def test_jsonl_manifest(self):
+        """JSON Lines rows accept list subjects and report invalid lines."""
+        manifest = os.path.join(self.temp_dir, "captions.jsonl")
+        with open(manifest, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'path': 'b.jpg', 'description': 'Quay', 'subject': ['a', 'b']}) + '\n')
+            f.write('{not json\n')
+        stats = import_metadata_bulk(manifest)
+        self.assertEqual(stats, {'applied': 1, 'failed': 1})
+        exif = MetadataHandler().read_metadata(os.path.join(self.temp_dir, "b.jpg"))['exif']
+        self.assertEqual(exif.get('UserComment'), 'Quay')
+
+    def test_rows_for_one_file_apply_in_manifest_order(self):
+        """Earlier rows for a file finish before later ones start, so the last row wins."""
+        manifest = os.path.join(self.temp_dir, "captions.csv")
+        with open(manifest, 'w', newline='', encoding='utf-8') as f:
+            w = csv.writer(f)
+            w.writerow(['path', 'headline'])
+            for i in range(6):
+                w.writerow(['a.jpg' if i % 3 else 'b.jpg', f"Take {i}"])
+        applied = []
+        calls = []
+
+        def slow_check(path):
+            # Earlier rows are delayed longest, so without ordering later rows would overtake them
+            calls.append(path)
+            time.sleep(0.03 * max(0, 6 - len(calls)))
+            return True
+
+        def edit(path, updates, sidecar=False):
+            applied.append((os.path.basename(path), updates['headline']))
+            return True
+
+        with mock.patch.object(MetadataHandler, 'is_supported', side_effect=slow_check), \
+                mock.patch.object(MetadataHandler, 'edit_metadata', side_effect=edit):
+            stats = import_metadata_bulk(manifest, max_workers=4)
+        self.assertEqual(stats, {'applied': 6, 'failed': 0})
+        self.assertEqual([h for name, h in applied if name == 'a.jpg'], ['Take 1', 'Take 2', 'Take 4', 'Take 5'])
+        self.assertEqual([h for name, h in applied if name == 'b.jpg'], ['Take 0', 'Take 3'])
+
+        import_metadata_bulk(manifest, max_workers=4)
+        xmp = MetadataHandler().read_metadata(os.path.join(self.temp_dir, "a.jpg"))['xmp']
+        self.assertEqual(xmp.get('Headline'), 'Take 5')
+
+
+if __name__ == '__main__':
+    unittest.main()
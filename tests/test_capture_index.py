@@ -0,0 +1,103 @@
+"""
+Unit tests for capture_index.py
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+from unittest import mock
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+import piexif
+
+from capture_index import build_capture_index, format_capture_time, parse_capture_time
+from catalog import MetadataCatalog
+from metadata_handler import MetadataHandler
+
+
+class TestCaptureIndex(unittest.TestCase):
+    """Test cases for date parsing, chronological order, event gaps and ranges."""
+
+    # name -> (DateTimeOriginal, SubSecTimeOriginal)
+    SHOTS = {
+        'c.jpg': ('2024:06:01 18:30:00', None),
+        'a.jpg': ('2024:06:01 09:00:00', '50'),
+        'b.jpg': ('2024:06:01 09:00:00', '25'),
+        'undated.jpg': None,
+        'd.jpg': ('2024:06:02 07:15:00', None),
+        'zero.jpg': ('0000:00:00 00:00:00', None),
+    }
+
+    def setUp(self):
+        """Create JPEGs shot over two days, plus undated ones."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for name, shot in self.SHOTS.items():
+            path = os.path.join(self.temp_dir, name)
+            exif = {'0th': {piexif.ImageIFD.Model: b'X100V'}, 'Exif': {}}
+            if shot:
+                exif['Exif'][piexif.ExifIFD.DateTimeOriginal] = shot[0].encode()
+                if shot[1]:
+                    exif['Exif'][piexif.ExifIFD.SubSecTimeOriginal] = shot[1].encode()
+            Image.new('RGB', (16, 8)).save(path, exif=piexif.dump(exif))
+            self.paths.append(path)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _names(self, paths):
+        return [os.path.basename(p) for p in paths]
+
+    def test_parse_capture_time(self):
+        """EXIF and XMP dates parse to the same wall-clock seconds; offsets are ignored."""
+        exif = parse_capture_time('2024:06:01 09:00:00', '5')
+        self.assertEqual(exif, parse_capture_time('2024-06-01T09:00:00.5+02:00'))
+        self.assertEqual(format_capture_time(exif), '2024-06-01 09:00:00')
+        self.assertEqual(parse_capture_time('2024-06-01'), parse_capture_time('2024:06:01 00:00:00'))
+        self.assertIsNone(parse_capture_time('0000:00:00 00:00:00'))
+        self.assertIsNone(parse_capture_time('yesterday'))
+        self.assertIsNone(parse_capture_time(None))
+
+    def test_sort_group_and_range(self):
+        """Sub-seconds break ties, undated files go last, and gaps split events."""
+        index = build_capture_index(self.paths, max_workers=2)
+        self.assertEqual(index.dated_count, 4)
+        self.assertEqual(self._names(index.sorted_paths()),
+                         ['b.jpg', 'a.jpg', 'c.jpg', 'd.jpg', 'undated.jpg', 'zero.jpg'])
+
+        events = index.group_events()
+        self.assertEqual([self._names(index.select_paths(e.indices)) for e in events],
+                         [['b.jpg', 'a.jpg'], ['c.jpg'], ['d.jpg']])
+        self.assertEqual(events[0].label, '2024-06-01 09:00:00 - 09:00:00 (2 photos)')
+        self.assertEqual(len(index.group_events(gap_seconds=24 * 3600)), 1)
+
+        start = parse_capture_time('2024:06:01 12:00:00')
+        self.assertEqual(self._names(index.select_paths(index.select_range(start))), ['c.jpg', 'd.jpg'])
+        end = parse_capture_time('2024:06:01 18:30:00')
+        self.assertEqual(self._names(index.select_paths(index.select_range(None, end))),
+                         ['b.jpg', 'a.jpg', 'c.jpg'])
+
+    def test_xmp_fallback_and_catalog(self):
+        """XMP CreateDate is used without EXIF dates; unchanged files come from the catalog."""
+        path = self.paths[3]
+        catalog = MetadataCatalog(':memory:')
+        with mock.patch.object(MetadataHandler, 'read_fields',
+                               return_value={'CreateDate': '2024-06-01T05:00:00Z',
+                                             'DateTimeDigitized': '2024:06:01 05:00:09'}):
+            index = build_capture_index([path], catalog=catalog)
+        self.assertEqual(format_capture_time(index.times[0]), '2024-06-01 05:00:00')
+
+        with mock.patch.object(MetadataHandler, 'read_fields', side_effect=AssertionError):
+            again = build_capture_index([path], catalog=catalog)
+        self.assertEqual(again.times[0], index.times[0])
+        catalog.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Unit tests for container_metadata.py
+"""
+
+import unittest
+import tempfile
+import struct
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+import piexif
+
+from container_metadata import read_container_metadata
+from metadata_handler import MetadataHandler
+
+XMP = (b'<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+       b'<rdf:Description xmlns:photoshop="http://ns.adobe.com/photoshop/1.0/" photoshop:Headline="Boxed"/>'
+       b'</rdf:RDF></x:xmpmeta>')
+
+
+def _box(btype, payload, full=None):
+    if full is not None:
+        payload = struct.pack('>I', full) + payload
+    return struct.pack('>I4s', 8 + len(payload), btype) + payload
+
+
+def _heic(exif_tiff, xmp, pixels=b'\x00' * 4096):
+    """Minimal HEIC: Exif and XMP items stored in mdat, located by iloc (version 1)."""
+    exif_item = b'\x00\x00\x00\x00' + exif_tiff
+    infe = (_box(b'infe', struct.pack('>HH4s', 1, 0, b'hvc1') + b'\x00', full=2 << 24)
+            + _box(b'infe', struct.pack('>HH4s', 2, 0, b'Exif') + b'\x00', full=2 << 24)
+            + _box(b'infe', struct.pack('>HH4s', 3, 0, b'mime') + b'\x00application/rdf+xml\x00', full=2 << 24))
+    iinf = _box(b'iinf', struct.pack('>H', 3) + infe, full=0)
+    ispe = _box(b'ispe', struct.pack('>II', 4032, 3024), full=0)
+    iprp = _box(b'iprp', _box(b'ipco', ispe))
+    ftyp = _box(b'ftyp', b'heic' + b'\x00\x00\x00\x00' + b'mif1heic')
+
+    def meta_with(offsets):
+        rows = b''.join(struct.pack('>HHHHII', item_id, 0, 0, 1, off, length)
+                        for item_id, (off, length) in offsets.items())
+        iloc = _box(b'iloc', bytes([0x44, 0x00]) + struct.pack('>H', len(offsets)) + rows, full=1 << 24)
+        return _box(b'meta', _box(b'hdlr', b'\x00' * 4 + b'pict' + b'\x00' * 13, full=0) + iinf + iloc + iprp, full=0)
+
+    sizes = {1: len(pixels), 2: len(exif_item), 3: len(xmp)}
+    head_len = len(ftyp) + len(meta_with({k: (0, n) for k, n in sizes.items()})) + 8
+    offsets, pos = {}, head_len
+    for item_id in (1, 2, 3):
+        offsets[item_id] = (pos, sizes[item_id])
+        pos += sizes[item_id]
+    return ftyp + meta_with(offsets) + _box(b'mdat', pixels + exif_item + xmp)
+
+
+class TestContainerMetadata(unittest.TestCase):
+    """Test cases for HEIC/AVIF/WebP metadata location."""
+
+    def setUp(self):
+        """Create a WebP and a synthetic HEIC carrying the same Exif and XMP."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.exif = piexif.dump({'0th': {piexif.ImageIFD.Model: b'Pixel 9'},
+                                 'Exif': {piexif.ExifIFD.DateTimeOriginal: b'2024:06:01 08:30:00'}})
+        self.webp = os.path.join(self.temp_dir, "web.webp")
+        Image.new('RGB', (40, 30), (1, 2, 3)).save(self.webp, 'WEBP', exif=self.exif, xmp=XMP)
+        self.heic = os.path.join(self.temp_dir, "phone.heic")
+        with open(self.heic, 'wb') as f:
+            f.write(_heic(self.exif[6:], XMP))
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_locates_exif_and_xmp(self):
+        """Exif items/chunks yield TIFF bytes; XMP is returned as-is."""
+        for path, fmt, size in ((self.webp, 'WEBP', (40, 30)), (self.heic, 'HEIC', (4032, 3024))):
+            result = read_container_metadata(path)
+            self.assertEqual(result['format'], fmt)
+            self.assertEqual(result['dimensions'], size)
+            self.assertEqual(result['exif'][:2], self.exif[6:8])
+            self.assertIn(b'photoshop:Headline="Boxed"', result['xmp'])
+
+    def test_handler_reads_without_decoding(self):
+        """read_metadata fills EXIF and XMP; edits go to a sidecar."""
+        handler = MetadataHandler()
+        for path in (self.webp, self.heic):
+            metadata = handler.read_metadata(path)
+            self.assertEqual(metadata['exif']['Model'], 'Pixel 9')
+            self.assertEqual(metadata['exif']['DateTimeOriginal'], '2024:06:01 08:30:00')
+            self.assertEqual(metadata['xmp']['Headline'], 'Boxed')
+
+        with open(self.heic, 'rb') as f:
+            before = f.read()
+        self.assertTrue(handler.edit_metadata(self.heic, {'headline': 'Edited'}))
+        with open(self.heic, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(handler.read_metadata(self.heic)['xmp']['Headline'], 'Edited')
+
+
+if __name__ == '__main__':
+    unittest.main()
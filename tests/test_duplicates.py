@@ -0,0 +1,78 @@
+"""
+Unit tests for duplicates.py and catalog.py
+"""
+
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from catalog import MetadataCatalog
+from duplicates import content_hash, find_duplicates
+from metadata_handler import MetadataHandler
+from png_metadata import write_png_metadata
+
+XMP = b'<x:xmpmeta xmlns:x="adobe:ns:meta/"></x:xmpmeta>'
+
+
+class TestDuplicates(unittest.TestCase):
+    """Test cases for payload hashing and duplicate grouping."""
+
+    def setUp(self):
+        """Create an original JPEG, a renamed copy with different metadata, and another shot."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.handler = MetadataHandler()
+        self.original = os.path.join(self.temp_dir, "IMG_0001.jpg")
+        Image.new('RGB', (32, 24), (10, 20, 30)).save(self.original, 'JPEG')
+        self.copy = os.path.join(self.temp_dir, "holiday.jpg")
+        shutil.copyfile(self.original, self.copy)
+        self.handler._inject_xmp_into_jpeg(self.copy, XMP)
+        self.other = os.path.join(self.temp_dir, "IMG_0002.jpg")
+        Image.new('RGB', (32, 24), (200, 20, 30)).save(self.other, 'JPEG')
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_metadata_does_not_change_hash(self):
+        """JPEG, PNG and TIFF hashes ignore metadata changes."""
+        self.assertEqual(content_hash(self.original), content_hash(self.copy))
+        self.assertNotEqual(content_hash(self.original), content_hash(self.other))
+
+        png = os.path.join(self.temp_dir, "a.png")
+        Image.new('RGB', (8, 8), (1, 2, 3)).save(png)
+        before = content_hash(png)
+        write_png_metadata(png, xmp=XMP, text={'Comment': 'x'})
+        self.assertEqual(content_hash(png), before)
+
+        tiff = os.path.join(self.temp_dir, "a.tif")
+        Image.new('RGB', (8, 8), (1, 2, 3)).save(tiff)
+        before = content_hash(tiff)
+        self.handler.edit_metadata(tiff, {'headline': 'changed'})
+        self.assertEqual(content_hash(tiff), before)
+
+    def test_groups_and_catalog_cache(self):
+        """Duplicates are grouped in queue order and hashes are cached by size/mtime."""
+        catalog = MetadataCatalog(':memory:')
+        paths = [self.original, self.other, self.copy]
+        groups = find_duplicates(paths, catalog, max_workers=2)
+        self.assertEqual(groups, [[self.original, self.copy]])
+        self.assertIsNotNone(catalog.get_hash(self.copy))
+        # A second run is served from the catalog
+        self.assertEqual(find_duplicates(paths, catalog, max_workers=2), groups)
+
+        # A changed file invalidates its cached hash
+        with open(self.copy, 'ab') as f:
+            f.write(b'\x00')
+        self.assertIsNone(catalog.get_hash(self.copy))
+        catalog.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
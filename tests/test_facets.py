@@ -0,0 +1,91 @@
+"""
+Unit tests for facets.py
+"""
+
+import unittest
+import tempfile
+import csv
+import json
+import os
+import sys
+from unittest import mock
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+import piexif
+
+from capture_index import build_capture_index
+from catalog import MetadataCatalog
+from facets import build_facet_report, write_facet_report
+from metadata_handler import MetadataHandler
+
+
+class TestFacetReport(unittest.TestCase):
+    """Test cases for value counts, missing fields, conflicts and export."""
+
+    def setUp(self):
+        """Three JPEGs: two agree on the artist, one lacks copyright, one disagrees with itself."""
+        self.temp_dir = tempfile.mkdtemp()
+        handler = MetadataHandler()
+        self.paths = []
+        for i, artist in enumerate(['Ann Lee', 'Ann Lee', 'Bob Roe']):
+            path = os.path.join(self.temp_dir, f"IMG_{i}.jpg")
+            exif = piexif.dump({'0th': {piexif.ImageIFD.Artist: artist.encode(),
+                                        piexif.ImageIFD.Model: b'X100V'}})
+            Image.new('RGB', (16, 8)).save(path, exif=exif)
+            self.paths.append(path)
+        handler.edit_metadata(self.paths[0], {'creator': 'Ann Lee', 'rights': 'CC-BY', 'subject': 'sea, boats'})
+        handler.edit_metadata(self.paths[1], {'creator': 'Ann Lee', 'rights': 'CC-BY', 'subject': 'sea'})
+        # XMP written through the sidecar, so the embedded Artist still says Bob Roe
+        handler.edit_metadata(self.paths[2], {'creator': 'Carl Poe'}, sidecar=True)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_counts_missing_and_conflicts(self):
+        """Distinct values, missing files and XMP/EXIF disagreements are reported."""
+        report = build_facet_report(self.paths + [os.path.join(self.temp_dir, "gone.jpg")])
+        self.assertEqual(report.total, 4)
+        self.assertEqual(len(report.errors), 1)
+        artist = report.facets['Artist']
+        self.assertEqual(dict(artist.counts), {'Ann Lee': 2, 'Bob Roe': 1})
+        self.assertFalse(artist.consistent)
+        self.assertTrue(report.facets['Model'].consistent)
+        self.assertEqual(report.facets['rights'].missing, [self.paths[2]])
+        self.assertEqual(report.facets['subject'].counts['sea'], 2)
+        self.assertEqual([row[0] for row in report.conflicts['creator/Artist']], [self.paths[2]])
+        self.assertTrue(any(line.startswith('Artist: 2 distinct') for line in report.summary_lines()))
+
+        csv_path = os.path.join(self.temp_dir, "report.csv")
+        write_facet_report(report, csv_path)
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertIn({'kind': 'value', 'field': 'Artist', 'value': 'Ann Lee', 'count': '2', 'path': ''}, rows)
+        self.assertTrue(any(r['kind'] == 'conflict' and r['path'] == self.paths[2] for r in rows))
+        json_path = os.path.join(self.temp_dir, "report.json")
+        write_facet_report(report, json_path)
+        with open(json_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['files'], 4)
+
+    def test_catalog_serves_unchanged_files(self):
+        """A second report over unchanged files does not read them again."""
+        catalog = MetadataCatalog(':memory:')
+        first = build_facet_report(self.paths, catalog=catalog)
+        with mock.patch.object(MetadataHandler, 'read_fields', side_effect=AssertionError):
+            second = build_facet_report(self.paths, catalog=catalog)
+        self.assertEqual(second.to_dict(), first.to_dict())
+
+        # Another reader of the same files adds its fields to the entries instead of evicting them
+        build_capture_index(self.paths, catalog=catalog)
+        with mock.patch.object(MetadataHandler, 'read_fields', side_effect=AssertionError):
+            self.assertEqual(build_facet_report(self.paths, catalog=catalog).to_dict(), first.to_dict())
+            build_capture_index(self.paths, catalog=catalog)
+        catalog.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Unit tests for geo.py
+"""
+
+import unittest
+import tempfile
+import json
+import math
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+import piexif
+
+from geo import collect_gps
+from metadata_handler import MetadataHandler
+
+
+def _dms(value):
+    value = abs(value)
+    d = int(value)
+    m = int((value - d) * 60)
+    s = round(((value - d) * 60 - m) * 60 * 100)
+    return ((d, 1), (m, 1), (s, 100))
+
+
+class TestGeo(unittest.TestCase):
+    """Test cases for signed GPS positions, filters and GeoJSON."""
+
+    PLACES = {
+        'paris.jpg': (48.8584, 2.2945, 35.0),
+        'sydney.jpg': (-33.8568, 151.2153, None),
+        'rio.jpg': (-22.9519, -43.2105, 700.0),
+        'nofix.jpg': None,
+    }
+
+    def setUp(self):
+        """Create JPEGs with GPS in each hemisphere, and one without."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for name, place in self.PLACES.items():
+            path = os.path.join(self.temp_dir, name)
+            exif = {'0th': {piexif.ImageIFD.Model: b'X100V'}}
+            if place:
+                lat, lon, alt = place
+                gps = {piexif.GPSIFD.GPSLatitudeRef: b'S' if lat < 0 else b'N',
+                       piexif.GPSIFD.GPSLatitude: _dms(lat),
+                       piexif.GPSIFD.GPSLongitudeRef: b'W' if lon < 0 else b'E',
+                       piexif.GPSIFD.GPSLongitude: _dms(lon)}
+                if alt is not None:
+                    gps[piexif.GPSIFD.GPSAltitudeRef] = 0
+                    gps[piexif.GPSIFD.GPSAltitude] = (int(alt * 10), 10)
+                exif['GPS'] = gps
+            Image.new('RGB', (16, 8)).save(path, exif=piexif.dump(exif))
+            self.paths.append(path)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_signed_positions_and_filters(self):
+        """Refs give the sign; boxes and radii select the right files."""
+        table = collect_gps(self.paths)
+        for i, place in enumerate(self.PLACES.values()):
+            if place is None:
+                self.assertTrue(math.isnan(table.lat[i]))
+                continue
+            self.assertAlmostEqual(table.lat[i], place[0], places=3)
+            self.assertAlmostEqual(table.lon[i], place[1], places=3)
+        self.assertEqual(int(table.has_fix.sum()), 3)
+        self.assertAlmostEqual(table.alt[0], 35.0)
+
+        southern = table.select(table.within_bbox(-90, -180, 0, 180))
+        self.assertEqual([os.path.basename(p) for p in southern], ['sydney.jpg', 'rio.jpg'])
+        # A box crossing the antimeridian (150E .. 170W) only holds Sydney
+        self.assertEqual(len(table.select(table.within_bbox(-40, 150, -30, -170))), 1)
+        near_paris = table.select(table.within_radius(48.8566, 2.3522, 10))
+        self.assertEqual([os.path.basename(p) for p in near_paris], ['paris.jpg'])
+
+        out = os.path.join(self.temp_dir, "fixes.geojson")
+        table.write_geojson(out)
+        with open(out, encoding='utf-8') as f:
+            features = json.load(f)['features']
+        self.assertEqual(len(features), 3)
+        lon, lat = features[2]['geometry']['coordinates'][:2]
+        self.assertLess(lon, 0)
+        self.assertLess(lat, 0)
+
+    def test_read_metadata_applies_refs(self):
+        """read_metadata reports southern/western coordinates as negative."""
+        exif = MetadataHandler().read_metadata(self.paths[2])['exif']
+        self.assertAlmostEqual(exif['GPSLatitude'], -22.9519, places=3)
+        self.assertAlmostEqual(exif['GPSLongitude'], -43.2105, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
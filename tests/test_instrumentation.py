@@ -0,0 +1,58 @@
+"""
+Unit tests for instrumentation.py
+"""
+
+import unittest
+import tempfile
+import io
+import json
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from instrumentation import PhaseTracer, NULL_TRACER, make_tracer
+from metadata_handler import MetadataHandler
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test cases for per-phase tracing."""
+
+    def setUp(self):
+        """Create a small JPEG to trace."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.jpg = os.path.join(self.temp_dir, "photo.jpg")
+        Image.new('RGB', (32, 24), (10, 20, 30)).save(self.jpg, 'JPEG')
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_disabled_by_default(self):
+        """Without a flag or PMM_TRACE the handler uses the null tracer."""
+        os.environ.pop('PMM_TRACE', None)
+        self.assertIs(MetadataHandler().tracer, NULL_TRACER)
+        self.assertIs(make_tracer(False), NULL_TRACER)
+
+    def test_edit_emits_json_line_per_file(self):
+        """An edit produces one JSON line with its phases and a histogram entry per phase."""
+        stream = io.StringIO()
+        handler = MetadataHandler(trace=stream)
+        self.assertTrue(handler.edit_metadata(self.jpg, {'headline': 'Traced'}))
+
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['op'], 'edit')
+        phases = records[0]['phases']
+        for name in ('Image.open', 'piexif.load', 'piexif.dump', 'Image.save'):
+            self.assertIn(name, phases)
+        self.assertGreater(phases['piexif.dump']['bytes'], 0)
+        self.assertEqual(handler.tracer.histograms()['Image.save']['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
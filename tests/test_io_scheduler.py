@@ -0,0 +1,82 @@
+"""
+Unit tests for io_scheduler.py
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+from unittest import mock
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import io_scheduler
+from io_scheduler import iter_scheduled, schedule, with_readahead
+
+
+class TestIOScheduler(unittest.TestCase):
+    """Test cases for locality ordering and bounded readahead."""
+
+    def setUp(self):
+        """Create files in two folders, queued interleaved."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for folder in ("a", "b"):
+            os.makedirs(os.path.join(self.temp_dir, folder))
+        for i in range(4):
+            for folder in ("a", "b"):
+                path = os.path.join(self.temp_dir, folder, f"{i}.jpg")
+                with open(path, 'wb') as f:
+                    f.write(b'\xff\xd8' + bytes(1000 * (i + 1)))
+                self.paths.append(path)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_schedule_groups_and_keeps_missing_last(self):
+        """Every index is scheduled once; unreadable paths go last in queue order."""
+        missing = [os.path.join(self.temp_dir, "gone1.jpg"), os.path.join(self.temp_dir, "gone2.jpg")]
+        paths = missing[:1] + self.paths + missing[1:]
+        order = schedule(paths)
+        self.assertEqual(sorted(order), list(range(len(paths))))
+        self.assertEqual(order[-2:], [0, len(paths) - 1])
+
+        # Without physical offsets, files of one folder are contiguous
+        with mock.patch.object(io_scheduler, 'physical_offset', return_value=None):
+            order = schedule(self.paths)
+        folders = [os.path.dirname(self.paths[i]) for i in order]
+        self.assertEqual(sum(1 for x, y in zip(folders, folders[1:]) if x != y), 1)
+
+        pairs = list(iter_scheduled(self.paths))
+        self.assertEqual(sorted(i for i, _ in pairs), list(range(len(self.paths))))
+        self.assertTrue(all(self.paths[i] == p for i, p in pairs))
+
+    def test_readahead_is_bounded_and_ordered(self):
+        """with_readahead preserves order and pulls at most depth items ahead."""
+        pulled = []
+
+        def source():
+            for p in self.paths:
+                pulled.append(p)
+                yield p
+
+        out = []
+        for item in with_readahead(source(), depth=3):
+            out.append(item)
+            self.assertLessEqual(len(pulled) - len(out), 3)
+        self.assertEqual(out, self.paths)
+
+    def test_readahead_size_per_path(self):
+        """A callable nbytes is asked once per path for its hint size."""
+        sizes = {p: i for i, p in enumerate(self.paths)}
+        with mock.patch.object(io_scheduler, 'advise_willneed') as advise:
+            out = list(with_readahead(self.paths, nbytes=sizes.get))
+        self.assertEqual(out, self.paths)
+        self.assertEqual([c.args for c in advise.call_args_list], list(sizes.items()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,6 +11,7 @@ import sys
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+from io_scheduler import HEADER_READAHEAD_BYTES
 from metadata_handler import MetadataHandler
 
 
@@ -36,6 +37,16 @@ class TestMetadataHandler(unittest.TestCase):
         self.assertEqual(self.handler.get_file_extension("photo.JPEG"), ".jpeg")
         self.assertEqual(self.handler.get_file_extension("/path/to/image.png"), ".png")
 
+    def test_readahead_bytes(self):
+        """Only files that are rewritten in full get a whole-file readahead hint."""
+        header = HEADER_READAHEAD_BYTES
+        self.assertEqual(self.handler.readahead_bytes("a.jpg"), 0)
+        self.assertEqual(self.handler.readahead_bytes("a.gif", delete=True), 0)
+        self.assertEqual(self.handler.readahead_bytes("a.jpg", sidecar=True), header)
+        self.assertEqual(self.handler.readahead_bytes("a.tif"), header)
+        self.assertEqual(self.handler.readahead_bytes("a.tif", delete=True), 0)
+        self.assertEqual(self.handler.readahead_bytes("a.CR2", delete=True), header)
+
     def test_nonexistent_file(self):
         """Test handling of nonexistent files."""
         result = self.handler.read_metadata("/nonexistent/path/image.jpg")
@@ -48,6 +59,66 @@ class TestMetadataHandler(unittest.TestCase):
         self.assertEqual(result, {})
         self.assertIn("Unsupported file format", self.handler.last_error)
 
+    def test_read_fields_matches_full_read(self):
+        """Header-only read_fields() decodes UserComment, XP* and signed GPS fields like read_metadata()."""
+        from PIL import Image
+        import piexif
+        import shutil
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "comment.jpg")
+            exif = {'0th': {piexif.ImageIFD.XPKeywords: 'boats;sea'.encode('utf-16le'),
+                            piexif.ImageIFD.Artist: b'Ann Lee'},
+                    'Exif': {piexif.ExifIFD.UserComment: b'ASCII\x00\x00\x00Hello world'},
+                    'GPS': {piexif.GPSIFD.GPSLatitudeRef: b'S',
+                            piexif.GPSIFD.GPSLatitude: ((33, 1), (52, 1), (0, 1)),
+                            piexif.GPSIFD.GPSLongitudeRef: b'W',
+                            piexif.GPSIFD.GPSLongitude: ((70, 1), (30, 1), (0, 1))}}
+            Image.new('RGB', (8, 8)).save(path, exif=piexif.dump(exif))
+            names = ['UserComment', 'XPKeywords', 'Artist', 'GPSLatitude', 'GPSLongitude']
+            full = self.handler.read_metadata(path)['exif']
+            fields = self.handler.read_fields(path, names)
+            self.assertEqual(fields['UserComment'], 'Hello world')
+            self.assertAlmostEqual(fields['GPSLongitude'], -70.5)
+            self.assertEqual(fields, {name: full[name] for name in names})
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_strip_jpeg_keeps_pixels(self):
+        """delete_all_metadata drops a JPEG's EXIF and keeps its size and pixels."""
+        from PIL import Image
+        import piexif
+        import shutil
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, "strip.jpg")
+            exif = {'0th': {piexif.ImageIFD.Artist: b'Ann Lee'}}
+            Image.new('RGB', (24, 16), (200, 40, 90)).save(path, exif=piexif.dump(exif), quality=95)
+            self.assertTrue(self.handler.delete_all_metadata(path))
+            self.assertEqual(self.handler.read_metadata(path)['exif'], {})
+            with Image.open(path) as img:
+                self.assertEqual(img.size, (24, 16))
+                r, g, b = img.convert('RGB').getpixel((12, 8))
+                self.assertTrue(abs(r - 200) < 8 and abs(g - 40) < 8 and abs(b - 90) < 8)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_writer_failure_returns_false(self):
+        """A failing TIFF or PNG writer makes edit_metadata() return False with last_error set."""
+        from unittest import mock
+        from PIL import Image
+        import shutil
+        temp_dir = tempfile.mkdtemp()
+        try:
+            for name, writer in (("a.tif", 'patch_tiff_metadata'), ("a.png", 'write_png_metadata')):
+                path = os.path.join(temp_dir, name)
+                Image.new('RGB', (8, 8)).save(path)
+                with mock.patch(f'metadata_handler.{writer}', side_effect=OSError("disk full")):
+                    self.assertFalse(self.handler.edit_metadata(path, {'headline': 'x'}))
+                self.assertIn("disk full", self.handler.last_error)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
 
 class TestTemplateManager(unittest.TestCase):
     """Test cases for TemplateManager class."""
@@ -87,6 +158,101 @@ class TestTemplateManager(unittest.TestCase):
         self.assertTrue(result)
         self.assertNotIn("ToDelete", self.manager.list_templates())
 
+    def test_load_served_from_index(self):
+        """Loads return copies from the index and pick up external changes."""
+        self.manager.create_template("Indexed", {"creator": "A"})
+        loaded = self.manager.load_template("Indexed")
+        loaded['metadata']['creator'] = "mutated"
+        self.assertEqual(self.manager.get_template_metadata("Indexed"), {"creator": "A"})
+
+        # Another process writes a new template and rewrites an existing one
+        import json
+        with open(os.path.join(self.temp_dir, "External.json"), 'w', encoding='utf-8') as f:
+            json.dump({'name': 'External', 'metadata': {'creator': 'B'}}, f)
+        with open(os.path.join(self.temp_dir, "Indexed.json"), 'w', encoding='utf-8') as f:
+            json.dump({'name': 'Indexed', 'metadata': {'creator': 'C, edited'}}, f)
+        self.assertIn("External", self.manager.list_templates())
+        self.assertEqual(self.manager.get_template_metadata("Indexed"), {"creator": "C, edited"})
+
+    def test_export_and_atomic_save(self):
+        """Export reads the index; saves leave no temp files behind."""
+        self.manager.create_template("One", {"rights": "1"})
+        self.manager.create_template("Two", {"rights": "2"})
+        export_path = os.path.join(self.temp_dir, "export.out")
+        self.assertTrue(self.manager.export_templates(export_path))
+        import json
+        with open(export_path, encoding='utf-8') as f:
+            exported = json.load(f)
+        self.assertEqual(sorted(exported), ["One", "Two"])
+        self.assertEqual([n for n in os.listdir(self.temp_dir) if n.endswith('.tmp')], [])
+
+
+class TestTemplatePlaceholders(unittest.TestCase):
+    """Test cases for per-file template placeholders."""
+
+    def setUp(self):
+        """Create a JPEG with camera EXIF."""
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+        from PIL import Image
+        import piexif
+        from metadata_handler import MetadataHandler
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.jpg = os.path.join(self.temp_dir, "IMG_0001.jpg")
+        exif = piexif.dump({'0th': {piexif.ImageIFD.Model: b'X100'},
+                            'Exif': {piexif.ExifIFD.DateTimeOriginal: b'2024:05:01 10:00:00'}})
+        Image.new('RGB', (16, 16)).save(self.jpg, exif=exif)
+        self.handler = MetadataHandler()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_render_per_file(self):
+        """Placeholders are rendered from the file's own EXIF."""
+        from templates import CompiledTemplate
+        template = CompiledTemplate({'headline': '{exif.Model} #{index:03d}',
+                                     'description': '{filename} at {exif.DateTimeOriginal}',
+                                     'rights': 'static'})
+        self.assertEqual(template.fields('exif'), {'Model', 'DateTimeOriginal'})
+        self.assertTrue(self.handler.edit_metadata(self.jpg, template, index=7))
+        exif = self.handler.read_metadata(self.jpg)['exif']
+        self.assertEqual(exif.get('ImageDescription'), 'X100 #007')
+        self.assertEqual(exif.get('UserComment'), 'IMG_0001.jpg at 2024:05:01 10:00:00')
+        self.assertEqual(exif.get('Copyright'), 'static')
+
+    def test_invalid_placeholder(self):
+        """Unknown placeholders next to known ones are rejected at compile time."""
+        from templates import CompiledTemplate
+        with self.assertRaises(ValueError):
+            CompiledTemplate({'headline': '{filename} on {camera}'})
+        with self.assertRaises(ValueError):
+            CompiledTemplate({'headline': '{filename} {index!x}'})
+        with self.assertRaises(ValueError):
+            CompiledTemplate({'headline': '{exif.Model.x}'})
+        with self.assertRaises(ValueError):
+            CompiledTemplate({'headline': '{exif.Model[0]}'})
+        template = CompiledTemplate({'headline': '{{literal}}'})
+        self.assertTrue(template.is_static)
+        self.assertEqual(template.render('a.jpg')['headline'], '{{literal}}')
+
+    def test_literal_braces(self):
+        """Values without a known placeholder, or with unbalanced braces, are kept as written."""
+        from templates import CompiledTemplate
+        metadata = {'headline': 'Set {A} vs {B}', 'description': 'open {brace', 'rights': 'x}', 'creator': '{}',
+                    'title': 'Set {{A}}'}
+        template = CompiledTemplate(metadata)
+        self.assertTrue(template.is_static)
+        self.assertEqual(template.render('a.jpg'), metadata)
+        self.assertTrue(self.handler.edit_metadata(self.jpg, template))
+        self.assertEqual(self.handler.read_metadata(self.jpg)['exif'].get('ImageDescription'), 'Set {A} vs {B}')
+
+    def test_conversion(self):
+        """!r and !s conversions are applied before the format spec."""
+        from templates import CompiledTemplate
+        template = CompiledTemplate({'headline': '{stem!r:>12}|{index!s}'})
+        self.assertEqual(template.render('IMG_1.jpg', 3)['headline'], "     'IMG_1'|3")
 
 if __name__ == '__main__':
     unittest.main()
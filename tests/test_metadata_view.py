@@ -0,0 +1,103 @@
+"""
+Unit tests for metadata_view.py
+"""
+
+import unittest
+import json
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metadata_view import LiveMetadataDocument, MetadataRowModel, group_metadata
+
+
+class TestMetadataRowModel(unittest.TestCase):
+    """Test cases for grouping, lazy truncation, collapse and search."""
+
+    def setUp(self):
+        """A record with a few thousand tags and one huge MakerNote."""
+        self.metadata = {
+            'exif': {'Model': 'X100V', 'DateTimeOriginal': '2024:06:01 08:30:00',
+                     'GPSLatitude': 48.85, 'MakerNote': b'\x01' * 200000, 'Vendor0001': 'odd'},
+            'xmp': {'Headline': 'Harbour', 'subject': ['boats', 'sea'], 'Exposure2012': '+0.50'},
+        }
+        for i in range(3000):
+            self.metadata['xmp'][f'Custom{i:04d}'] = f'value {i}'
+
+    def test_groups_and_lazy_rows(self):
+        """Fields are grouped by IFD / schema and cells are truncated."""
+        labels = [label for label, _ in group_metadata(self.metadata)]
+        self.assertEqual(labels, ["EXIF: Image (IFD0)", "EXIF: Exif IFD", "EXIF: GPS IFD", "EXIF: Other",
+                                  "XMP: dc", "XMP: photoshop", "XMP: Other"])
+
+        model = MetadataRowModel(self.metadata, max_chars=100)
+        self.assertEqual(model.field_count(), 3008)
+        self.assertEqual(len(model), 3008 + len(labels))
+        row = next(r for r in range(len(model)) if model.cell_text(r, 0).strip() == 'MakerNote')
+        self.assertLess(len(model.cell_text(row, 1)), 200)
+        self.assertIn('200000 bytes', model.cell_text(row, 1))
+        self.assertGreater(len(model.full_value(row)), 200000)
+
+        # Collapsing a header hides its rows
+        header = next(r for r in range(len(model)) if 'XMP: Other' in model.cell_text(r, 0))
+        model.toggle(header)
+        self.assertEqual(len(model), 7 + len(labels))
+        self.assertTrue(model.cell_text(header, 0).startswith('▸'))
+
+    def test_incremental_search(self):
+        """Search narrows on extended queries and clears back to every row."""
+        model = MetadataRowModel(self.metadata)
+        model.search('custom2')
+        self.assertEqual(model.match_count(), 1000)
+        model.search('custom29')
+        self.assertEqual(model.match_count(), 100)
+        model.search('BOATS')
+        self.assertEqual(model.match_count(), 1)
+        self.assertEqual(model.cell_text(1, 0).strip(), 'subject')
+        self.assertEqual(model.cell_text(1, 1), 'boats, sea')
+        model.search('')
+        self.assertEqual(model.match_count(), model.field_count())
+
+
+def _apply(text, edits):
+    lines = text.splitlines(keepends=True)
+    for first, count, new_text in reversed(edits):
+        lines[first:first + count] = new_text.splitlines(keepends=True)
+    return ''.join(lines)
+
+
+class TestLiveMetadataDocument(unittest.TestCase):
+    """Test cases for the line edits behind the live metadata panel."""
+
+    def test_edits_reproduce_json_and_stay_local(self):
+        """Applying the edits always yields json.dumps output; unchanged keys produce no edits."""
+        states = [
+            {},
+            {'EXIF': {'Model': 'X100V', 'Make': 'Fuji'}, 'XMP': {}},
+            {'EXIF': {'Model': 'X100V', 'Make': 'Fuji'}, 'XMP': {'subject': ['a', 'b'], 'Headline': 'Ünïcode'}},
+            {'EXIF': {'Model': 'X100V', 'Make': 'Fuji', 'Zoom': '2'}, 'XMP': {'subject': ['a'], 'Headline': 'x'}},
+            {'EXIF': {f'Tag{i:04d}': str(i) for i in range(2000)}, 'XMP': {'Headline': 'x'}},
+            {'EXIF': {}, 'XMP': {}},
+        ]
+        doc = LiveMetadataDocument()
+        text = ''
+        for data in states:
+            text = _apply(text, doc.update(data))
+            expected = json.dumps({'EXIF': data.get('EXIF', {}), 'XMP': data.get('XMP', {})},
+                                  indent=2, ensure_ascii=False, sort_keys=True)
+            self.assertEqual(text, expected)
+            self.assertEqual(doc.text(), expected)
+
+        doc.update(states[4])
+        self.assertEqual(doc.update(states[4]), [])
+        changed = dict(states[4], EXIF=dict(states[4]['EXIF'], Tag1000='changed'))
+        edits = doc.update(changed)
+        self.assertEqual(len(edits), 1)
+        self.assertEqual(edits[0][1], 1)
+        self.assertIn('"Tag1000": "changed"', edits[0][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
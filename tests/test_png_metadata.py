@@ -0,0 +1,82 @@
+"""
+Unit tests for png_metadata.py
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image, PngImagePlugin
+
+from metadata_handler import MetadataHandler
+from png_metadata import iter_chunks, read_png_metadata, write_png_metadata
+
+
+def _idat_bytes(path):
+    with open(path, 'rb') as f:
+        chunks = [(start, length) for ctype, length, start in iter_chunks(f) if ctype == b'IDAT']
+        out = b''
+        for start, length in chunks:
+            f.seek(start)
+            out += f.read(length + 12)
+        return out
+
+
+class TestPngMetadata(unittest.TestCase):
+    """Test cases for chunk-level PNG metadata."""
+
+    def setUp(self):
+        """Create a PNG with a text chunk."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.png = os.path.join(self.temp_dir, "photo.png")
+        info = PngImagePlugin.PngInfo()
+        info.add_text("Comment", "original")
+        Image.new('RGB', (40, 30), (200, 100, 50)).save(self.png, 'PNG', pnginfo=info)
+        self.handler = MetadataHandler()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_edit_writes_exif_and_xmp(self):
+        """edit_metadata writes eXIf and XMP that read_metadata returns."""
+        idat_before = _idat_bytes(self.png)
+        ok = self.handler.edit_metadata(self.png, {'headline': 'PNG Headline', 'creator': 'Ann', 'rights': '© Ann'})
+        self.assertTrue(ok)
+
+        metadata = self.handler.read_metadata(self.png)
+        self.assertEqual(metadata['exif'].get('Artist'), 'Ann')
+        self.assertEqual(metadata['xmp'].get('Headline'), 'PNG Headline')
+        self.assertEqual(metadata['general']['text'].get('Comment'), 'original')
+        self.assertEqual(_idat_bytes(self.png), idat_before)
+        with Image.open(self.png) as img:
+            img.load()
+
+    def test_replaces_existing_chunks(self):
+        """Repeated writes replace rather than accumulate metadata chunks."""
+        write_png_metadata(self.png, xmp=b'<x:xmpmeta xmlns:x="adobe:ns:meta/"/>', text={'Comment': 'one'})
+        write_png_metadata(self.png, text={'Comment': 'two'})
+        with open(self.png, 'rb') as f:
+            types = [ctype for ctype, _, _ in iter_chunks(f)]
+        self.assertEqual(types.count(b'iTXt') + types.count(b'tEXt'), 2)
+        meta = read_png_metadata(self.png)
+        self.assertEqual(meta['text'], {'Comment': 'two'})
+        self.assertIn('xmpmeta', meta['xmp'])
+
+    def test_delete_strips_metadata_chunks(self):
+        """delete_all_metadata keeps the PNG a PNG and drops text/XMP/EXIF."""
+        self.handler.edit_metadata(self.png, {'headline': 'gone'})
+        self.assertTrue(self.handler.delete_all_metadata(self.png))
+        meta = read_png_metadata(self.png)
+        self.assertEqual(meta, {'exif': None, 'xmp': None, 'text': {}})
+        with Image.open(self.png) as img:
+            self.assertEqual(img.format, 'PNG')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Unit tests for prefetch.py
+"""
+
+import unittest
+import tempfile
+import threading
+import time
+import os
+import sys
+from unittest import mock
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from catalog import MetadataCatalog
+from metadata_handler import MetadataHandler
+from prefetch import NeighbourPrefetcher, editor_fields, load_scaled_preview, read_editor_fields
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestNeighbourPrefetcher(unittest.TestCase):
+    """Test cases for the neighbour window, cancellation and staleness checks."""
+
+    def setUp(self):
+        """Create a queue of small JPEGs."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(12):
+            path = os.path.join(self.temp_dir, f"IMG_{i:04d}.jpg")
+            Image.new('RGB', (64, 48), (i, i, i)).save(path)
+            self.paths.append(path)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_window_jump_and_staleness(self):
+        """Neighbours are loaded; a jump drops queued work and evicts old rows."""
+        loaded = []
+        gate = threading.Event()
+
+        def load(path):
+            gate.wait(5)
+            loaded.append(path)
+            return os.path.basename(path)
+
+        notified = []
+        prefetcher = NeighbourPrefetcher(load, radius=2, on_loaded=lambda key, value: notified.append(key))
+        try:
+            prefetcher.focus(self.paths, 1)
+            prefetcher.focus(self.paths, 9)
+            gate.set()
+            window = self.paths[7:12]
+            self.assertTrue(_wait_for(lambda: all(prefetcher.get(p) for p in window)
+                                      and set(window) <= set(notified)))
+            # Only the load already running for the first selection escaped cancellation
+            self.assertLessEqual(len(set(loaded) - set(window)), 1)
+            self.assertIsNone(prefetcher.get(self.paths[1]))
+            self.assertEqual(prefetcher.get(self.paths[10]), "IMG_0010.jpg")
+
+            # A changed file is not served from the cache
+            Image.new('RGB', (80, 60)).save(self.paths[10])
+            os.utime(self.paths[10], ns=(0, 0))
+            self.assertIsNone(prefetcher.get(self.paths[10]))
+        finally:
+            prefetcher.close()
+
+    def test_editor_fields_fast_path(self):
+        """Header-only fields match the full read and are then served from the catalog."""
+        handler = MetadataHandler()
+        path = self.paths[0]
+        handler.edit_metadata(path, {'headline': 'Harbour', 'creator': 'Ann Lee',
+                                     'subject': 'boats, sea', 'rights': 'CC-BY'})
+        full = handler.read_metadata(path)
+        expected = editor_fields({**full['exif'], **full['xmp']})
+        self.assertEqual(expected['headline'], 'Harbour')
+        self.assertEqual(expected['subject'], 'boats, sea')
+
+        catalog = MetadataCatalog(':memory:')
+        self.assertEqual(read_editor_fields(handler, path, catalog), expected)
+        with mock.patch.object(handler, 'read_fields', side_effect=AssertionError):
+            self.assertEqual(read_editor_fields(handler, path, catalog), expected)
+        self.assertIsNone(read_editor_fields(handler, os.path.join(self.temp_dir, "missing.jpg"), catalog))
+        catalog.close()
+
+    def test_scaled_preview(self):
+        """Previews are decoded and scaled to the thumbnail box with Pillow."""
+        path = os.path.join(self.temp_dir, "large.jpg")
+        Image.new('RGB', (1600, 800), (200, 10, 10)).save(path)
+        w, h, rgb = load_scaled_preview(MetadataHandler(), path)
+        self.assertEqual((w, h), (320, 160))
+        self.assertEqual(len(rgb), w * h * 3)
+        self.assertIsNone(load_scaled_preview(MetadataHandler(), os.path.join(self.temp_dir, "missing.jpg")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Scale benchmark regression gate (scripts/scale_benchmark.py)
+
+The full run is opt-in: set PMM_BENCHMARK=1 (and optionally PMM_BENCH_FILES and
+PMM_BENCH_THRESHOLD) to run every scenario and fail on regressions.
+"""
+
+import unittest
+import os
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import scale_benchmark
+
+
+class TestRegressionCompare(unittest.TestCase):
+    """Test cases for the baseline comparison."""
+
+    def _metrics(self, wall):
+        return {'wall_s': wall, 'cpu_s': wall, 'io_read_bytes': None,
+                'io_write_bytes': None, 'peak_mem_bytes': 10 * 1024 * 1024}
+
+    def test_within_threshold(self):
+        """Small slowdowns are not regressions."""
+        baseline = {'read_all': self._metrics(10.0)}
+        results = {'read_all': self._metrics(11.0)}
+        self.assertEqual(scale_benchmark.compare(results, baseline, 0.25), [])
+
+    def test_beyond_threshold(self):
+        """Slowdowns beyond the threshold are reported per metric."""
+        baseline = {'read_all': self._metrics(10.0)}
+        results = {'read_all': self._metrics(14.0)}
+        regressions = scale_benchmark.compare(results, baseline, 0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('read_all.wall_s'))
+
+
+@unittest.skipUnless(os.environ.get('PMM_BENCHMARK'), "set PMM_BENCHMARK=1 to run the scale benchmark")
+class TestScaleBenchmark(unittest.TestCase):
+    """Run all scenarios and compare against the stored baseline."""
+
+    def test_no_regressions(self):
+        files = int(os.environ.get('PMM_BENCH_FILES', scale_benchmark.DEFAULT_FILES))
+        threshold = float(os.environ.get('PMM_BENCH_THRESHOLD', scale_benchmark.DEFAULT_THRESHOLD))
+        baseline = scale_benchmark.load_baseline(files)
+        if baseline is None:
+            self.skipTest(f"No stored baseline for {files} files")
+
+        results = scale_benchmark.run_benchmark(files)
+        regressions = scale_benchmark.compare(results, baseline, threshold)
+        self.assertEqual(regressions, [], "\n" + scale_benchmark.format_results(results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+Unit tests for tiff_metadata.py
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+import piexif
+
+from metadata_handler import MetadataHandler
+import io
+from unittest import mock
+
+import tiff_metadata
+from tiff_metadata import TiffFile, read_tiff_tags, patch_tiff_metadata, read_raw_layout, read_raw_tags
+
+
+def _strip_bytes(path):
+    """Return the raw strip data of IFD0."""
+    with open(path, 'rb') as f:
+        tf = TiffFile(f)
+        entries, _ = tf.read_ifd(tf.first_ifd)
+        offsets = tf.read_value(entries[273])
+        counts = tf.read_value(entries[279])
+        if isinstance(offsets, int):
+            offsets, counts = (offsets,), (counts,)
+        out = b''
+        for off, n in zip(offsets, counts):
+            f.seek(off)
+            out += f.read(n)
+        return out
+
+
+class TestTiffMetadata(unittest.TestCase):
+    """Test cases for in-place TIFF metadata patching."""
+
+    def setUp(self):
+        """Create classic and BigTIFF files with some EXIF."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.handler = MetadataHandler()
+        exif = Image.Exif()
+        exif[piexif.ImageIFD.Make] = 'TestCam'
+        exif[piexif.ImageIFD.Software] = 'Scanner 1.0'
+        img = Image.new('RGB', (64, 48), (10, 120, 200))
+        self.tiff = os.path.join(self.temp_dir, "scan.tif")
+        img.save(self.tiff, exif=exif)
+        self.bigtiff = os.path.join(self.temp_dir, "scan_big.tiff")
+        img.save(self.bigtiff, big_tiff=True, exif=exif)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_edit_appends_without_moving_strips(self):
+        """Edits only append IFDs; strips and the file prefix are untouched."""
+        with open(self.tiff, 'rb') as f:
+            before = f.read()
+        strips = _strip_bytes(self.tiff)
+
+        ok = self.handler.edit_metadata(self.tiff, {'headline': 'Scan 1', 'creator': 'Ann',
+                                                    'description': 'Box 4'})
+        self.assertTrue(ok)
+        with open(self.tiff, 'rb') as f:
+            after = f.read()
+        # Only the header offset changes within the original bytes
+        self.assertEqual(after[8:len(before)], before[8:])
+        self.assertLess(len(after) - len(before), 8192)
+        self.assertEqual(_strip_bytes(self.tiff), strips)
+
+        metadata = self.handler.read_metadata(self.tiff)
+        self.assertEqual(metadata['exif'].get('ImageDescription'), 'Scan 1')
+        self.assertEqual(metadata['exif'].get('Artist'), 'Ann')
+        self.assertEqual(metadata['exif'].get('Make'), 'TestCam')
+        self.assertNotIn('Software', metadata['exif'])
+        self.assertEqual(metadata['xmp'].get('Headline'), 'Scan 1')
+        with Image.open(self.tiff) as img:
+            img.load()
+            self.assertEqual(img.size, (64, 48))
+
+    def test_bigtiff_edit(self):
+        """BigTIFF files are patched with 64-bit offsets."""
+        strips = _strip_bytes(self.bigtiff)
+        output = os.path.join(self.temp_dir, "out.tiff")
+        self.assertTrue(self.handler.edit_metadata(self.bigtiff, {'creator': 'Bob'}, output))
+        tags = read_tiff_tags(output)
+        self.assertEqual(tags['0th'][piexif.ImageIFD.Artist], b'Bob')
+        self.assertEqual(_strip_bytes(output), strips)
+        with Image.open(output) as img:
+            img.load()
+
+    def test_repeated_edits_keep_reading(self):
+        """Each edit re-points the header; the latest values win."""
+        self.handler.edit_metadata(self.tiff, {'creator': 'First', 'purge_non_camera': False})
+        self.handler.edit_metadata(self.tiff, {'creator': 'Second', 'purge_non_camera': False})
+        tags = read_tiff_tags(self.tiff)
+        self.assertEqual(tags['0th'][piexif.ImageIFD.Artist], b'Second')
+        self.assertEqual(tags['0th'][piexif.ImageIFD.Software], b'Scanner 1.0')
+
+
+class TestRawMetadata(unittest.TestCase):
+    """Test cases for header-only RAW reads."""
+
+    def setUp(self):
+        """Build a NEF-like file: big sensor strips, EXIF, and a JPEG preview at the end."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.raw = os.path.join(self.temp_dir, "DSC_0001.nef")
+        exif = Image.Exif()
+        exif[piexif.ImageIFD.Make] = 'NIKON'
+        exif[piexif.ImageIFD.Model] = 'D850'
+        Image.new('L', (2000, 1500), 128).save(self.raw, format='TIFF', exif=exif)
+        preview = io.BytesIO()
+        Image.new('RGB', (160, 120), (200, 10, 10)).save(preview, 'JPEG')
+        self.preview = preview.getvalue()
+        self.preview_offset = os.path.getsize(self.raw)
+        with open(self.raw, 'ab') as f:
+            f.write(self.preview)
+        patch_tiff_metadata(self.raw, {513: (4, self.preview_offset), 514: (4, len(self.preview))},
+                            {piexif.ExifIFD.DateTimeOriginal: (2, '2024:05:01 10:00:00')})
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_reads_touch_only_headers(self):
+        """Tags and preview offsets are found without reading sensor data."""
+        read_bytes = []
+        real_open = open
+
+        def counting_open(*args, **kwargs):
+            f = real_open(*args, **kwargs)
+            read = f.read
+            f.read = lambda n=-1: read_bytes.append(len(data := read(n))) or data
+            return f
+
+        with mock.patch.object(tiff_metadata, 'open', counting_open, create=True):
+            tags = read_raw_tags(self.raw)
+            layout = read_raw_layout(self.raw)
+        self.assertTrue(read_bytes)
+        self.assertLess(sum(read_bytes), 64 * 1024)
+        self.assertEqual(tags['0th'][piexif.ImageIFD.Model], b'D850')
+        self.assertEqual(tags['Exif'][piexif.ExifIFD.DateTimeOriginal], b'2024:05:01 10:00:00')
+        self.assertEqual(layout['dimensions'], (2000, 1500))
+        self.assertEqual(layout['previews'], [(self.preview_offset, len(self.preview))])
+
+    def test_handler_reads_raw_and_edits_sidecar(self):
+        """RAW files are supported read-only; edits land in a sidecar."""
+        handler = MetadataHandler()
+        with open(self.raw, 'rb') as f:
+            before = f.read()
+        metadata = handler.read_metadata(self.raw)
+        self.assertEqual(metadata['exif']['Model'], 'D850')
+        self.assertEqual(metadata['general']['size'], (2000, 1500))
+        self.assertEqual(handler.read_preview(self.raw), self.preview)
+
+        self.assertTrue(handler.edit_metadata(self.raw, {'headline': 'Summit'}))
+        self.assertFalse(handler.delete_all_metadata(self.raw))
+        with open(self.raw, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(handler.read_metadata(self.raw)['xmp']['Headline'], 'Summit')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Unit tests for time_shift.py
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+import piexif
+
+from capture_index import build_capture_index, format_capture_time
+from catalog import MetadataCatalog
+from metadata_handler import MetadataHandler
+from time_shift import (apply_time_shift, format_time_offset, parse_time_offset, plan_time_shift,
+                        shift_capture_times, shift_xmp_dates)
+from xmp_sidecar import find_sidecar
+
+DATE_FIELDS = ['DateTime', 'DateTimeOriginal', 'DateTimeDigitized', 'CreateDate', 'DateCreated']
+
+
+class TestTimeShift(unittest.TestCase):
+    """Test cases for in-place EXIF/XMP date shifting."""
+
+    def setUp(self):
+        """Create a JPEG and a TIFF with EXIF dates and an embedded XMP packet."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.handler = MetadataHandler()
+        self.paths = []
+        for name in ('a.jpg', 'b.tif'):
+            path = os.path.join(self.temp_dir, name)
+            exif = {'0th': {piexif.ImageIFD.DateTime: b'2024:06:01 23:30:00'},
+                    'Exif': {piexif.ExifIFD.DateTimeDigitized: b'2024:06:01 23:30:00'}}
+            Image.new('RGB', (32, 16), (10, 20, 30)).save(path, exif=piexif.dump(exif))
+            self.handler.edit_metadata(path, {'headline': 'Night', 'date_created': '2024-06-01T23:30:00.5+02:00'})
+            self.paths.append(path)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_parse_time_offset(self):
+        """Offsets accept days and hours:minutes[:seconds] and round-trip through format_time_offset()."""
+        self.assertEqual(parse_time_offset("+1:00"), 3600)
+        self.assertEqual(parse_time_offset("-0:30:15"), -1815)
+        self.assertEqual(parse_time_offset("2d"), 2 * 86400)
+        self.assertEqual(parse_time_offset(format_time_offset(-97215)), -97215)
+        for bad in ("", "90", "1:75", "soon"):
+            with self.assertRaises(ValueError):
+                parse_time_offset(bad)
+
+    def test_shift_in_place(self):
+        """EXIF and XMP dates move by the offset; only their bytes are written and the size is unchanged."""
+        for path in self.paths:
+            with open(path, 'rb') as f:
+                before = f.read()
+            stats = shift_capture_times([path], parse_time_offset("+1:00"))
+            self.assertEqual((stats['shifted'], stats['failed']), (1, 0), stats['problems'])
+            with open(path, 'rb') as f:
+                after = f.read()
+            self.assertEqual(len(after), len(before))
+            changed = sum(1 for x, y in zip(before, after) if x != y)
+            self.assertLessEqual(changed, stats['bytes'])
+            self.assertLess(stats['bytes'], 150)
+
+            values = self.handler.read_fields(path, DATE_FIELDS)
+            self.assertEqual(values['DateTimeDigitized'], '2024:06:02 00:30:00')
+            # Editor-written ISO dates keep their form; XMP keeps fraction and time zone
+            self.assertEqual(values['DateTimeOriginal'][:19], '2024-06-02T00:30:00')
+            self.assertEqual(values['CreateDate'], '2024-06-02T00:30:00.5+02:00')
+            self.assertEqual(values['DateCreated'], '2024-06-02T00:30:00.5+02:00')
+            with Image.open(path) as img:
+                self.assertEqual(img.convert('RGB').getpixel((0, 0))[2] // 10, 3)
+
+    def test_sidecar_and_stale_plan(self):
+        """Sidecar dates are shifted; a plan is refused once the file has changed."""
+        path = self.paths[0]
+        self.handler.edit_metadata(path, {'date_created': '2024-06-01T08:00:00'}, sidecar=True)
+        plan = plan_time_shift(path, -3600)
+        self.assertIn('sidecar xmp:CreateDate', plan.fields)
+        apply_time_shift(plan)
+        with open(find_sidecar(path), encoding='utf-8') as f:
+            self.assertIn('2024-06-01T07:00:00', f.read())
+
+        plan = plan_time_shift(path, 60)
+        offset, old, _new = plan.patches[0]
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            f.write(b'1999')
+        with self.assertRaises(ValueError):
+            apply_time_shift(plan)
+
+    def test_raw_without_sidecar(self):
+        """A RAW file is left untouched; its shifted date goes into a new sidecar that readers prefer."""
+        path = os.path.join(self.temp_dir, 'c.dng')
+        exif = {'Exif': {piexif.ExifIFD.DateTimeOriginal: b'2024:06:01 23:30:00'}}
+        Image.new('RGB', (8, 8)).save(path, format='TIFF', exif=piexif.dump(exif))
+        catalog = MetadataCatalog(os.path.join(self.temp_dir, 'catalog.sqlite'))
+        self.assertEqual(format_capture_time(build_capture_index([path], catalog).times[0]), '2024-06-01 23:30:00')
+        with open(path, 'rb') as f:
+            before = f.read()
+
+        stats = shift_capture_times([path], parse_time_offset("+1:00"))
+        self.assertEqual((stats['shifted'], stats['unchanged'], stats['skipped']), (1, 0, 0), stats['problems'])
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertIsNotNone(find_sidecar(path))
+        values = self.handler.read_fields(path, ['DateTimeOriginal', 'CreateDate'])
+        self.assertEqual(values, {'DateTimeOriginal': '2024-06-02T00:30:00', 'CreateDate': '2024-06-02T00:30:00'})
+        # The new sidecar invalidates the cached capture time
+        self.assertEqual(format_capture_time(build_capture_index([path], catalog).times[0]), '2024-06-02 00:30:00')
+
+        shift_capture_times([path], -60)
+        self.assertEqual(self.handler.read_fields(path, ['DateTimeOriginal'])['DateTimeOriginal'], '2024-06-02T00:29:00')
+
+        undated = os.path.join(self.temp_dir, 'd.dng')
+        Image.new('RGB', (8, 8)).save(undated, format='TIFF')
+        stats = shift_capture_times([undated], 60)
+        self.assertEqual((stats['skipped'], stats['unchanged']), (1, 0))
+        self.assertIsNone(find_sidecar(undated))
+
+    def test_xmp_date_only_values_are_kept(self):
+        """Date-only XMP values have no time to shift."""
+        packet = b'<x:xmpmeta xmp:CreateDate="2024-06-01" photoshop:DateCreated="2024-06-01T10:15"/>'
+        edits = shift_xmp_dates(packet, 3600)
+        self.assertEqual([(old, new) for _o, old, new, _n in edits], [(b'2024-06-01T10:15', b'2024-06-01T11:15')])
+
+
+if __name__ == '__main__':
+    unittest.main()
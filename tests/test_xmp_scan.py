@@ -0,0 +1,65 @@
+"""
+Unit tests for xmp_scan.py
+"""
+
+import unittest
+import tempfile
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from metadata_handler import MetadataHandler
+from xmp_scan import find_xmp_packet, HEAD_WINDOW
+
+PACKET = (b'<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF '
+          b'xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+          b'<rdf:Description xmlns:photoshop="http://ns.adobe.com/photoshop/1.0/" '
+          b'photoshop:Headline="Found"/></rdf:RDF></x:xmpmeta>')
+
+
+class TestXmpScan(unittest.TestCase):
+    """Test cases for the bounded XMP packet scan."""
+
+    def setUp(self):
+        """Create temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_jpeg_app1_segment(self):
+        """The XMP APP1 segment of a JPEG is found; a decoy in the scan data is ignored."""
+        path = os.path.join(self.temp_dir, "photo.jpg")
+        Image.new('RGB', (32, 32), (0, 0, 0)).save(path, 'JPEG')
+        MetadataHandler()._inject_xmp_into_jpeg(path, PACKET)
+        with open(path, 'ab') as f:
+            f.write(b'<x:xmpmeta decoy></x:xmpmeta>')
+        self.assertEqual(find_xmp_packet(path), PACKET)
+
+    def test_packet_beyond_head_window(self):
+        """Packets past the head window are still found, and only the packet is returned."""
+        path = os.path.join(self.temp_dir, "blob.bin")
+        with open(path, 'wb') as f:
+            f.write(b'\x00' * (HEAD_WINDOW + 100))
+            f.write(PACKET)
+            f.write(b'\x00' * 100)
+        self.assertEqual(find_xmp_packet(path), PACKET)
+
+    def test_no_packet(self):
+        """Files without a packet (including empty files) return None."""
+        path = os.path.join(self.temp_dir, "empty.bin")
+        open(path, 'wb').close()
+        self.assertIsNone(find_xmp_packet(path))
+        with open(path, 'wb') as f:
+            f.write(b'<x:xmpmeta unterminated')
+        self.assertIsNone(find_xmp_packet(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
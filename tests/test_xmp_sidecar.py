@@ -0,0 +1,68 @@
+"""
+Unit tests for xmp_sidecar.py
+"""
+
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+from metadata_handler import MetadataHandler
+from xmp_sidecar import merge_xmp_packets, sidecar_path
+
+FOREIGN = (
+    '<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+    '<rdf:Description xmlns:crs="http://ns.adobe.com/camera-raw-settings/1.0/" '
+    'xmlns:photoshop="http://ns.adobe.com/photoshop/1.0/" crs:Exposure2012="+0.50" photoshop:Headline="Old"/>'
+    '</rdf:RDF></x:xmpmeta>'
+)
+
+
+class TestXmpSidecar(unittest.TestCase):
+    """Test cases for sidecar merge and the handler's sidecar mode."""
+
+    def setUp(self):
+        """Create a JPEG with an embedded headline."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.handler = MetadataHandler()
+        self.image = os.path.join(self.temp_dir, "IMG_0001.jpg")
+        Image.new('RGB', (16, 8)).save(self.image)
+        self.handler.edit_metadata(self.image, {'headline': 'Embedded', 'creator': 'Ann Lee'})
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_merge_keeps_foreign_properties(self):
+        """Only properties present in the update are replaced."""
+        update = self.handler._build_xmp_packet({'headline': 'New', 'subject': 'a, b'})
+        merged = self.handler._parse_xmp_packet(merge_xmp_packets(FOREIGN, update))
+        self.assertEqual(merged['Headline'], 'New')
+        self.assertEqual(merged['Exposure2012'], '+0.50')
+        self.assertEqual(merged['subject'], ['a', 'b'])
+
+    def test_sidecar_mode_leaves_image_untouched(self):
+        """Sidecar edits never modify the image, and reads prefer sidecar values."""
+        with open(self.image, 'rb') as f:
+            before = f.read()
+        self.assertTrue(self.handler.edit_metadata(self.image, {'headline': 'From sidecar'}, sidecar=True))
+        self.assertTrue(self.handler.edit_metadata(self.image, {'rights': 'CC-BY'}, sidecar=True))
+        with open(self.image, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertTrue(os.path.exists(sidecar_path(self.image)))
+
+        metadata = self.handler.read_metadata(self.image)
+        self.assertEqual(metadata['xmp']['Headline'], 'From sidecar')
+        self.assertEqual(metadata['xmp']['rights'], 'CC-BY')
+        self.assertEqual(metadata['xmp']['creator'], ['Ann Lee'])
+        self.assertEqual(metadata['general']['xmp_sidecar'], 'IMG_0001.xmp')
+
+
+if __name__ == '__main__':
+    unittest.main()